@@ -0,0 +1,59 @@
+"""
+Per-request cost of the Front Page / Back Page, full build vs. template stamp.
+
+    python -m bench.bench_page_templates [--runs 50]
+"""
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from reports.catalog.front_page_fn import add_front_page_fn
+from reports.catalog.back_page_fn import add_back_page_fn
+
+ASSETS_DIR = Path(__file__).resolve().parent.parent / "assets"
+
+REPORT_DATA = {
+    "teacher_name": "श्री. पाटील",
+    "class_name_mr": "५ वी",
+    "division_name_mr": "अ",
+    "division": "A",
+    "selected_month": 6,
+    "selected_year": 2025,
+}
+SUBJECTS = [{"nameMr": name, "order": i} for i, name in enumerate(
+    ["मराठी", "हिंदी", "इंग्रजी", "गणित", "विज्ञान", "इतिहास", "भूगोल", "कला"])]
+
+
+def _time_ms(fn, runs: int) -> float:
+    fn(Workbook())  # warm-up; builds the template on the first templated call
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(Workbook())
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = {
+        "front_page": lambda use_template: (
+            lambda wb: add_front_page_fn(wb, REPORT_DATA, assets_dir=ASSETS_DIR, use_template=use_template)),
+        "back_page": lambda use_template: (
+            lambda wb: add_back_page_fn(wb, "5", "A", SUBJECTS, {"classTeacher": "श्री. पाटील"},
+                                        use_template=use_template)),
+    }
+    baseline = _time_ms(lambda wb: None, args.runs)  # cost of Workbook() itself
+    print(f"{'stage':<12}{'full build':>14}{'template':>14}{'speed-up':>10}")
+    for name, make in cases.items():
+        full = _time_ms(make(False), args.runs) - baseline
+        stamped = _time_ms(make(True), args.runs) - baseline
+        print(f"{name:<12}{full:>11.2f} ms{stamped:>11.2f} ms{full / max(stamped, 1e-6):>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
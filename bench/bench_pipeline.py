@@ -0,0 +1,192 @@
+"""
+Stage-level timings and peak memory of the report pipeline on synthetic rosters.
+
+    python -m bench.bench_pipeline [--sizes 40,200,1000,5000] [--runs 3]
+                                   [--out results.json] [--compare baseline.json]
+
+Each stage is timed on its own (min/median/mean over --runs after one
+warm-up), then run once more under tracemalloc for its peak allocation.
+End-to-end runs go through generate_catalog_report against the in-memory
+Firestore stand-in with the report cache and incremental patching off.
+Results are written as JSON; --compare prints the change per stage against
+an earlier file and exits non-zero past --threshold.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import openpyxl
+from openpyxl import Workbook
+
+from bench.fake_firestore import FakeFirestore
+from bench.synthetic_roster import seed_firestore
+from reports.catalog import firestore_clients_fn
+from reports.catalog.back_page_fn import add_back_page_fn
+from reports.catalog.excel_generator_fn import generate_catalog_excel_fn
+from reports.catalog.front_page_fn import add_front_page_fn
+from reports.catalog.generate_full_report_fn import generate_catalog_report, render_catalog_workbook
+from reports.catalog.package_template_fn import write_report_package
+from reports.catalog.report_data_fn import assemble_report_inputs, attach_attendance, _student_row
+
+ROOT = Path(__file__).resolve().parent.parent
+ASSETS_DIR = ROOT / "assets"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+YEAR, MONTH = 2025, 6
+
+
+def _measure(fn: Callable[[], Any], setup: Callable[[], Any], runs: int) -> Dict[str, float]:
+    """fn(state) timed over runs after a warm-up; setup() builds a fresh state outside the clock."""
+    fn(setup())
+    samples = []
+    for _ in range(runs):
+        state = setup()
+        start = time.perf_counter()
+        fn(state)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    state = setup()
+    tracemalloc.start()
+    try:
+        fn(state)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "ms_min": round(min(samples), 3),
+        "ms_median": round(statistics.median(samples), 3),
+        "ms_mean": round(statistics.fmean(samples), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _stages(size: int, db: FakeFirestore) -> Dict[str, tuple]:
+    """stage name -> (setup, fn) for one roster size."""
+    cd = f"{size}-A"  # one class per size keeps the seeded collections apart
+    students = seed_firestore(db, cd, size, YEAR, MONTH)
+    inputs = assemble_report_inputs(str(size), "A", db.collection("catalog").document(cd).get().to_dict(),
+                                     [_student_row(s) for s in students])
+    class_no, division = inputs["class_no"], inputs["division"]
+    att_snap = db.collection("attendance").document(f"{cd}_{YEAR}-{MONTH:02d}").get()
+    filled = attach_attendance(dict(inputs, report_data=dict(inputs["report_data"])), att_snap, YEAR, MONTH)
+
+    def full_workbook():
+        return render_catalog_workbook(inputs, assets_dir=ASSETS_DIR, streaming=False)
+
+    def save(wb):
+        buf = BytesIO()
+        wb.save(buf)
+        return buf
+
+    return {
+        "catalog_sheet": (lambda: None,
+                          lambda _: generate_catalog_excel_fn(class_no, division, inputs["students"])),
+        "attendance_summary": (lambda: None, lambda _: attach_attendance(
+            dict(inputs, report_data=dict(inputs["report_data"])), att_snap, YEAR, MONTH)),
+        "catalog_sheet_attendance": (lambda: None, lambda _: generate_catalog_excel_fn(
+            class_no, division, inputs["students"], attendance=filled["attendance"])),
+        "front_page": (Workbook,
+                       lambda wb: add_front_page_fn(wb, inputs["report_data"], assets_dir=ASSETS_DIR)),
+        "back_page": (Workbook,
+                      lambda wb: add_back_page_fn(wb, class_no=class_no, division=division,
+                                                  subjects=inputs["subjects"], catalog_doc=inputs["catalog_doc"])),
+        "save": (full_workbook, save),
+        "render_streaming": (lambda: None,
+                             lambda _: save(render_catalog_workbook(inputs, assets_dir=ASSETS_DIR, streaming=True))),
+        "render_streaming_attendance": (lambda: None, lambda _: save(
+            render_catalog_workbook(filled, assets_dir=ASSETS_DIR, streaming=True))),
+        "render_package": (BytesIO, lambda buf: write_report_package(inputs, buf, ASSETS_DIR)),
+        "render_package_attendance": (BytesIO, lambda buf: write_report_package(filled, buf, ASSETS_DIR)),
+        "end_to_end_live": (lambda: None, lambda _: _check(generate_catalog_report(
+            class_no, division, assets_dir=ASSETS_DIR, use_cache=False, incremental=False))),
+        "end_to_end_historical": (lambda: None, lambda _: _check(generate_catalog_report(
+            class_no, division, assets_dir=ASSETS_DIR, selected_month=MONTH, selected_year=YEAR,
+            use_cache=False))),
+    }
+
+
+def _check(out: Dict[str, Any]) -> Dict[str, Any]:
+    if not out.get("ok"):
+        raise RuntimeError(out.get("error"))
+    return out
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "openpyxl": openpyxl.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _compare(results: List[Dict[str, Any]], baseline_path: Path, threshold: float) -> bool:
+    baseline = {(r["stage"], r["students"]): r for r in json.loads(baseline_path.read_text())["results"]}
+    regressed = False
+    print(f"\nvs {baseline_path} (median time, peak memory)")
+    for r in results:
+        old = baseline.get((r["stage"], r["students"]))
+        if old is None:
+            continue
+        dt = r["ms_median"] / old["ms_median"] - 1 if old["ms_median"] else 0.0
+        dm = r["peak_kib"] / old["peak_kib"] - 1 if old["peak_kib"] else 0.0
+        flag = "  REGRESSION" if dt > threshold or dm > threshold else ""
+        regressed |= bool(flag)
+        print(f"{r['stage']:<24}{r['students']:>6}{dt:>+10.1%}{dm:>+10.1%}{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="40,200,1000,5000")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--stages", default="", help="comma-separated subset of stages")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="default: bench/results/pipeline-<timestamp>.json")
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slow-down for --compare")
+    args = parser.parse_args()
+
+    db = FakeFirestore()
+    firestore_clients_fn.set_clients(db=db, async_db=db.async_client())
+    wanted = {s for s in args.stages.split(",") if s}
+
+    results = []
+    print(f"{'stage':<24}{'students':>8}{'median':>12}{'min':>12}{'peak':>12}")
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        for name, (setup, fn) in _stages(size, db).items():
+            if wanted and name not in wanted:
+                continue
+            m = _measure(fn, setup, args.runs)
+            results.append({"stage": name, "students": size, "runs": args.runs, **m})
+            print(f"{name:<24}{size:>8}{m['ms_median']:>9.1f} ms{m['ms_min']:>9.1f} ms"
+                  f"{m['peak_kib'] / 1024:>8.1f} MiB")
+
+    out = args.out or RESULTS_DIR / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"environment": _environment(), "results": results}, indent=2) + "\n")
+    print(f"\nwrote {out}")
+
+    if args.compare and _compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Cold start of the HTTP service against the startup budget.
+
+    pip install -r requirements-dev.txt
+    python -m bench.cold_start [--runs 3] [--server uvicorn|gunicorn]
+                               [--workers 1] [--check] [--out results.json]
+
+Each run starts a fresh server over bench.loadtest_app (in-memory Firestore,
+no FIREBASE_KEY needed) and measures, from the client's side, how long the
+process took to answer /health (the worker is ready only after its warm-up)
+and the latency of its first and second report. /startup-stats adds the
+worker's own phases (import, warm-up steps, first request) and which of
+them went over the budget (CATALOG_STARTUP_BUDGET). The heaviest imports
+of the app, from python -X importtime, are listed once.
+
+With --check the exit status is 1 when any run went over budget.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from bench.bench_pipeline import RESULTS_DIR, ROOT, _environment
+from bench.loadtest import _free_port, start_server, stop_server, wait_ready
+
+
+def import_profile(top: int = 12) -> List[Dict[str, Any]]:
+    """Heaviest modules (cumulative ms) when the app is imported in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOADTEST_GRADES="1", LOADTEST_DIVISIONS="A")
+    env.pop("FIREBASE_KEY", None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import bench.loadtest_app"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            rows.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1000, 1)})
+        except ValueError:
+            continue  # header line
+    # Top-level packages only: their cumulative time includes their submodules
+    roots = [r for r in rows if "." not in r["module"]]
+    return sorted(roots, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+
+def cold_start(args) -> Dict[str, Any]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOADTEST_LATENCY_MS=str(args.latency_ms),
+               LOADTEST_GRADES=str(args.grades), LOADTEST_DIVISIONS=args.divisions)
+    env.pop("FIREBASE_KEY", None)
+    if args.render_workers:
+        env["CATALOG_RENDER_WORKERS"] = str(args.render_workers)
+    started = time.perf_counter()
+    proc = start_server(args.server, args.workers, port, env)
+    try:
+        wait_ready(base_url, proc)
+        ready = time.perf_counter() - started
+        latencies = []
+        with httpx.Client(base_url=base_url, timeout=300.0) as http:
+            for class_no in (1, 2):  # the second report shows the warm steady state
+                t = time.perf_counter()
+                r = http.post("/generate", json={"class_no": class_no, "division": "A"})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - t) * 1000)
+            stats = http.get("/startup-stats").json()
+    finally:
+        stop_server(proc)
+    return {
+        "ready_ms": round(ready * 1000, 1),
+        "first_request_ms": round(latencies[0], 1),
+        "second_request_ms": round(latencies[1], 1),
+        "worker": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="CATALOG_RENDER_WORKERS (default: the service's own)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="added to every async Firestore call")
+    parser.add_argument("--grades", type=int, default=2)
+    parser.add_argument("--divisions", default="A")
+    parser.add_argument("--check", action="store_true", help="exit 1 when a run is over the startup budget")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="default: bench/results/cold-start-<timestamp>.json")
+    args = parser.parse_args()
+
+    imports = import_profile()
+    print("heaviest imports (cumulative ms):")
+    for row in imports:
+        print(f"  {row['cumulative_ms']:>8.1f}  {row['module']}")
+
+    print(f"\n{'run':>4}{'ready ms':>10}{'1st ms':>9}{'2nd ms':>9}{'import':>9}{'warmup':>9}  over budget")
+    runs = []
+    for i in range(args.runs):
+        run = cold_start(args)
+        stages = run["worker"]["stages_ms"]
+        print(f"{i + 1:>4}{run['ready_ms']:>10.0f}{run['first_request_ms']:>9.0f}{run['second_request_ms']:>9.0f}"
+              f"{stages.get('import', 0):>9.0f}{stages.get('warmup', 0):>9.0f}  "
+              f"{', '.join(run['worker']['over_budget']) or '-'}")
+        runs.append(run)
+
+    summary = {k: round(statistics.median(r[k] for r in runs), 1)
+               for k in ("ready_ms", "first_request_ms", "second_request_ms")}
+    over = sorted({name for r in runs for name in r["worker"]["over_budget"]})
+    print(f"\nmedian: {json.dumps(summary)}  budget: {json.dumps(runs[0]['worker']['budget_ms'])}")
+    out = args.out or RESULTS_DIR / f"cold-start-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    out.write_text(json.dumps({"environment": _environment(), "config": config, "imports": imports,
+                               "median": summary, "over_budget": over, "runs": runs}, indent=2) + "\n")
+    print(f"wrote {out}")
+    if args.check and over:
+        print(f"over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
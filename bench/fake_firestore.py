@@ -0,0 +1,415 @@
+"""
+In-memory stand-in for the parts of the Firestore client the service uses:
+documents, where/select/order_by/limit queries, get_all, write batches,
+on_snapshot listeners and an AsyncClient twin with optional simulated
+latency. Reads and writes are
+counted per document like Firestore bills them.
+
+    db = FakeFirestore()
+    firestore_clients_fn.set_clients(db=db, async_db=db.async_client())
+"""
+from __future__ import annotations
+import asyncio
+import copy
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+_MISSING = object()
+
+
+def _now() -> DatetimeWithNanoseconds:
+    n = datetime.now(timezone.utc)
+    return DatetimeWithNanoseconds(n.year, n.month, n.day, n.hour, n.minute, n.second, n.microsecond, tzinfo=timezone.utc)
+
+
+def _get_field(data: Dict[str, Any], path: str) -> Any:
+    cur: Any = data
+    for part in path.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return _MISSING
+        cur = cur[part]
+    return cur
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]], update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+        self.create_time = update_time
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        v = _get_field(self._data or {}, field_path)
+        if v is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(v)
+
+
+class DocumentReference:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, **_kw) -> DocumentSnapshot:
+        return self._client._read(self, field_paths)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._write(self.path, data, merge)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        if self._client._peek(self.path) is None:
+            raise KeyError(f"No document to update: {self.path}")
+        self._client._write(self.path, data, True)
+
+    def delete(self) -> None:
+        self._client._delete(self.path)
+
+
+class Query:
+    def __init__(self, client: "FakeFirestore", path: str, filters=(), fields=None, orders=(), limit=None):
+        self._client = client
+        self._path = path
+        self._filters: Tuple = tuple(filters)
+        self._fields = fields
+        self._orders: Tuple = tuple(orders)
+        self._limit = limit
+
+    def _copy(self, **kw) -> "Query":
+        args = dict(filters=self._filters, fields=self._fields, orders=self._orders, limit=self._limit)
+        args.update(kw)
+        return Query(self._client, self._path, **args)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def select(self, field_paths: Iterable[str]) -> "Query":
+        return self._copy(fields=list(field_paths))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction == "DESCENDING"),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit=count)
+
+    def stream(self, **_kw) -> Iterator[DocumentSnapshot]:
+        return iter(self._client._query(self))
+
+    def get(self, **_kw) -> List[DocumentSnapshot]:
+        return self._client._query(self)
+
+    def on_snapshot(self, callback) -> "Watch":
+        return self._client._listen(self, callback)
+
+
+class Watch:
+    """
+    Listener of Query.on_snapshot: callback(docs, changes, read_time) runs
+    once with every matching document ADDED, then on the writer's thread
+    after each write that adds, changes or removes a match.
+    """
+
+    def __init__(self, client: "FakeFirestore", query: Query, callback):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        self._matched: set = set()
+        self.is_active = True
+
+    def unsubscribe(self) -> None:
+        self.is_active = False
+        with self._client._lock:
+            if self in self._client._watches:
+                self._client._watches.remove(self)
+
+    def _initial(self) -> None:
+        docs = self._client._snapshots(self._query, self._client._matching(self._query))
+        self._matched = {d.reference.path for d in docs}
+        self._client._count(max(1, len(docs)))
+        self._callback(docs, [DocumentChange(ChangeType.ADDED, d, -1, i) for i, d in enumerate(docs)], _now())
+
+    def _changed(self, path: str) -> None:
+        rows = self._client._matching(self._query)
+        hit = [r for r in rows if r[0] == path]
+        if hit:
+            kind = ChangeType.MODIFIED if path in self._matched else ChangeType.ADDED
+            self._matched.add(path)
+            doc = self._client._snapshots(self._query, hit)[0]
+        elif path in self._matched:
+            kind = ChangeType.REMOVED
+            self._matched.discard(path)
+            doc = DocumentSnapshot(DocumentReference(self._client, path), None)
+        else:
+            return
+        self._client._count(1)
+        self._callback(self._client._snapshots(self._query, rows), [DocumentChange(kind, doc, -1, -1)], _now())
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "FakeFirestore", path: str):
+        super().__init__(client, path.strip("/"))
+        self.id = self._path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: str) -> DocumentReference:
+        return DocumentReference(self._client, f"{self._path}/{document_id}")
+
+
+class WriteBatch:
+    MAX_WRITES = 500  # Firestore's limit per batch/commit
+
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._ops: List[Tuple[str, DocumentReference, Any, bool]] = []
+
+    def _add(self, op) -> None:
+        if len(self._ops) >= self.MAX_WRITES:
+            raise ValueError(f"A write batch can contain at most {self.MAX_WRITES} writes")
+        self._ops.append(op)
+
+    def set(self, reference: DocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._add(("set", reference, copy.deepcopy(data), merge))
+
+    def create(self, reference: DocumentReference, data: Dict[str, Any]) -> None:
+        self._add(("create", reference, copy.deepcopy(data), False))
+
+    def update(self, reference: DocumentReference, data: Dict[str, Any]) -> None:
+        self._add(("set", reference, copy.deepcopy(data), True))
+
+    def delete(self, reference: DocumentReference) -> None:
+        self._add(("delete", reference, None, False))
+
+    def commit(self) -> List[Any]:
+        with self._client._lock:
+            self._client.commits += 1
+        # All or nothing, like Firestore: a create over an existing doc fails the batch
+        for op, ref, _data, _merge in self._ops:
+            if op == "create" and self._client._peek(ref.path) is not None:
+                self._ops.clear()
+                raise ValueError(f"Document already exists: {ref.path}")
+        for op, ref, data, merge in self._ops:
+            if op in ("set", "create"):
+                self._client._write(ref.path, data, merge)
+            else:
+                self._client._delete(ref.path)
+        self._ops.clear()
+        return []
+
+
+def _merge(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    # set(merge=True) merges nested maps field by field, like Firestore
+    out = dict(old)
+    for k, v in new.items():
+        out[k] = _merge(out[k], v) if isinstance(v, dict) and isinstance(out.get(k), dict) else v
+    return out
+
+
+class FakeFirestore:
+    """Sync client. `reads`, `writes` and `commits` count what a real project would bill."""
+
+    def __init__(self):
+        self._docs: Dict[str, Tuple[Dict[str, Any], DatetimeWithNanoseconds]] = {}
+        self._lock = threading.Lock()
+        self._watches: List[Watch] = []
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+
+    # -- client API --------------------------------------------------
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path)
+
+    def document(self, path: str) -> DocumentReference:
+        return DocumentReference(self, path.strip("/"))
+
+    def get_all(self, references: Iterable[DocumentReference], field_paths=None, **_kw) -> Iterator[DocumentSnapshot]:
+        for ref in references:
+            yield self._read(ref, field_paths)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def async_client(self, latency: float = 0.0) -> "FakeAsyncFirestore":
+        return FakeAsyncFirestore(self, latency)
+
+    # -- storage -------------------------------------------------------
+    def _peek(self, path: str):
+        return self._docs.get(path)
+
+    def _read(self, ref: DocumentReference, field_paths=None) -> DocumentSnapshot:
+        with self._lock:
+            self.reads += 1
+            entry = self._docs.get(ref.path)
+        if entry is None:
+            return DocumentSnapshot(ref, None)
+        data, ut = entry
+        return DocumentSnapshot(ref, self._project(data, field_paths), ut)
+
+    def _write(self, path: str, data: Dict[str, Any], merge: bool) -> None:
+        data = copy.deepcopy(data)
+        with self._lock:
+            self.writes += 1
+            if merge and path in self._docs:
+                data = _merge(self._docs[path][0], data)
+            self._docs[path] = (data, _now())
+        self._notify(path)
+
+    def _delete(self, path: str) -> None:
+        with self._lock:
+            self.writes += 1
+            self._docs.pop(path, None)
+        self._notify(path)
+
+    def _listen(self, q: Query, callback) -> Watch:
+        watch = Watch(self, q, callback)
+        watch._initial()
+        with self._lock:
+            self._watches.append(watch)
+        return watch
+
+    def _notify(self, path: str) -> None:
+        parent = path.rsplit("/", 1)[0]
+        with self._lock:
+            watches = [w for w in self._watches if w._query._path == parent]
+        for w in watches:
+            w._changed(path)
+
+    def _count(self, n: int) -> None:
+        with self._lock:
+            self.reads += n
+
+    @staticmethod
+    def _project(data: Dict[str, Any], field_paths) -> Dict[str, Any]:
+        if field_paths is None:
+            return copy.deepcopy(data)
+        out = {}
+        for f in field_paths:
+            v = _get_field(data, f)
+            if v is not _MISSING:
+                out[f] = copy.deepcopy(v)
+        return out
+
+    def _query(self, q: Query) -> List[DocumentSnapshot]:
+        rows = self._matching(q)
+        self._count(max(1, len(rows)))  # an empty result still costs one read
+        return self._snapshots(q, rows)
+
+    def _matching(self, q: Query) -> List[Tuple[str, Dict[str, Any], DatetimeWithNanoseconds]]:
+        prefix = q._path + "/"
+        with self._lock:
+            items = [(p, d, ut) for p, (d, ut) in self._docs.items()
+                     if p.startswith(prefix) and "/" not in p[len(prefix):]]
+        rows = []
+        for path, data, ut in items:
+            ok = True
+            for field, op, value in q._filters:
+                v = _get_field(data, field)
+                if v is _MISSING or not _OPS[op](v, value):
+                    ok = False
+                    break
+            # Ordered queries leave out documents without the order field
+            if ok and all(_get_field(data, f) is not _MISSING for f, _desc in q._orders):
+                rows.append((path, data, ut))
+        for field, desc in reversed(q._orders):
+            rows.sort(key=lambda r: _get_field(r[1], field), reverse=desc)
+        if not q._orders:
+            rows.sort(key=lambda r: r[0])  # Firestore's default: document ID
+        if q._limit is not None:
+            rows = rows[:q._limit]
+        return rows
+
+    def _snapshots(self, q: Query, rows) -> List[DocumentSnapshot]:
+        return [DocumentSnapshot(DocumentReference(self, p), self._project(d, q._fields), ut) for p, d, ut in rows]
+
+
+# -- async twin ------------------------------------------------------------
+class _AsyncDocumentReference:
+    def __init__(self, ref: DocumentReference, latency: float):
+        self._ref = ref
+        self._latency = latency
+        self.id = ref.id
+        self.path = ref.path
+
+    def collection(self, name: str) -> "_AsyncQuery":
+        return _AsyncQuery(self._ref.collection(name), self._latency)
+
+    async def get(self, field_paths=None, **_kw) -> DocumentSnapshot:
+        await asyncio.sleep(self._latency)
+        return self._ref.get(field_paths)
+
+    async def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        await asyncio.sleep(self._latency)
+        self._ref.set(data, merge)
+
+
+class _AsyncQuery:
+    def __init__(self, query: Query, latency: float):
+        self._query = query
+        self._latency = latency
+
+    def where(self, *args, **kw) -> "_AsyncQuery":
+        return _AsyncQuery(self._query.where(*args, **kw), self._latency)
+
+    def select(self, field_paths) -> "_AsyncQuery":
+        return _AsyncQuery(self._query.select(field_paths), self._latency)
+
+    def order_by(self, *args, **kw) -> "_AsyncQuery":
+        return _AsyncQuery(self._query.order_by(*args, **kw), self._latency)
+
+    def limit(self, count: int) -> "_AsyncQuery":
+        return _AsyncQuery(self._query.limit(count), self._latency)
+
+    def document(self, document_id: str) -> _AsyncDocumentReference:
+        return _AsyncDocumentReference(self._query.document(document_id), self._latency)
+
+    async def stream(self, **_kw):
+        await asyncio.sleep(self._latency)
+        for snap in self._query.stream():
+            yield snap
+
+    async def get(self, **_kw) -> List[DocumentSnapshot]:
+        await asyncio.sleep(self._latency)
+        return self._query.get()
+
+
+class FakeAsyncFirestore:
+    """AsyncClient over the same data; every call waits `latency` seconds first."""
+
+    def __init__(self, sync: FakeFirestore, latency: float = 0.0):
+        self.sync = sync
+        self.latency = latency
+
+    def collection(self, path: str) -> _AsyncQuery:
+        return _AsyncQuery(self.sync.collection(path), self.latency)
+
+    def document(self, path: str) -> _AsyncDocumentReference:
+        return _AsyncDocumentReference(self.sync.document(path), self.latency)
+
+    async def get_all(self, references, field_paths=None, **_kw):
+        await asyncio.sleep(self.latency)
+        for ref in references:
+            yield self.sync._read(getattr(ref, "_ref", ref), field_paths)
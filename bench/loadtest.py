@@ -0,0 +1,290 @@
+"""
+Throughput, tail latency and memory of the HTTP service under a month-end traffic mix.
+
+    pip install -r requirements-dev.txt
+    python -m bench.loadtest [--workers 1,2,4] [--concurrency 1,8,32]
+                             [--duration 20] [--server uvicorn|gunicorn]
+                             [--render-workers N] [--out results.json]
+
+For each worker count, bench.loadtest_app (main.py over the in-memory
+Firestore stand-in, no FIREBASE_KEY needed) is started as a real server on
+a free local port. Closed-loop clients then drive it at each concurrency
+for --duration seconds after a short warm-up. The mix is what month end
+looks like: mostly this month's catalogs (/generate), a share of
+re-downloads revalidated with If-None-Match, last month's snapshots and
+the odd older month (/generate-historical-report), half with attendance.
+
+Per step: completed (200/304) requests/s and their p50/p95/p99 latency,
+status counts (503 = shed by the render queue) and the peak RSS of the
+server's whole process tree (server workers plus their render pools),
+total and per server worker. Results are written as JSON next to
+bench_pipeline's.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.bench_pipeline import RESULTS_DIR, ROOT, _environment
+from bench.synthetic_roster import months_before, school_layout
+
+# kind -> share of requests
+MONTH_END_MIX = {
+    "live": 0.55,          # this month's catalog
+    "revalidate": 0.15,    # same again with If-None-Match: 304 unless the roster changed
+    "last_month": 0.25,    # last month's snapshot
+    "older_month": 0.05,   # two or three months back
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# -- process tree memory (Linux /proc) ----------------------------------
+def _children() -> Dict[int, List[int]]:
+    tree: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        tree.setdefault(ppid, []).append(int(entry))
+    return tree
+
+
+def _rss_kib(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_mib(root_pid: int) -> Optional[float]:
+    """RSS of root_pid and all its descendants; None where /proc is not available."""
+    if not os.path.isdir("/proc"):
+        return None
+    tree, total, stack = _children(), 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += _rss_kib(pid)
+        stack += tree.get(pid, [])
+    return total / 1024
+
+
+class _RssSampler(threading.Thread):
+    """Peak tree RSS, sampled every interval seconds until stopped."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak: Optional[float] = None
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.is_set():
+            rss = tree_rss_mib(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+            self._done.wait(self.interval)
+
+    def stop(self) -> Optional[float]:
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+# -- server -------------------------------------------------------------
+def start_server(server: str, workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    if server == "gunicorn":
+        # The service's own config (preload_app, uvicorn workers); the flags override bind and workers
+        cmd = [sys.executable, "-m", "gunicorn", "-c", str(ROOT / "gunicorn.conf.py"), "bench.loadtest_app:app",
+               "-w", str(workers), "-b", f"127.0.0.1:{port}", "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "bench.loadtest_app:app", "--workers", str(workers),
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+def wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# -- traffic ------------------------------------------------------------
+class MonthEndTraffic:
+    """Picks the next request of the mix; remembers ETags for revalidation."""
+
+    def __init__(self, layout: Dict[str, int], seed: int = 0):
+        self.classes = sorted(layout)
+        self.rnd = random.Random(seed)
+        today = date.today()
+        self.history = months_before(today.year, today.month, 3)
+        self.etags: Dict[str, str] = {}
+        self._kinds, self._weights = zip(*MONTH_END_MIX.items())
+
+    def next(self) -> Tuple[str, str, Dict[str, Any], Dict[str, str]]:
+        """(kind, path, json body, headers)"""
+        kind = self.rnd.choices(self._kinds, self._weights)[0]
+        cd = self.rnd.choice(self.classes)
+        class_no, division = cd.split("-")
+        body: Dict[str, Any] = {"class_no": int(class_no), "division": division,
+                                "with_attendance": self.rnd.random() < 0.5}
+        headers: Dict[str, str] = {}
+        if kind in ("live", "revalidate"):
+            path = "/generate"
+            etag = self.etags.get(f"{cd}:{body['with_attendance']}")
+            if kind == "revalidate" and etag:
+                headers["If-None-Match"] = etag
+        else:
+            path = "/generate-historical-report"
+            year, month = self.history[0] if kind == "last_month" else self.rnd.choice(self.history[1:])
+            body.update(selected_year=year, selected_month=month)
+        return kind, path, body, headers
+
+    def remember(self, kind: str, body: Dict[str, Any], response: httpx.Response) -> None:
+        if kind == "live" and response.status_code == 200 and response.headers.get("etag"):
+            self.etags[f"{body['class_no']}-{body['division']}:{body['with_attendance']}"] = response.headers["etag"]
+
+
+async def drive(base_url: str, traffic: MonthEndTraffic, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Closed loop: concurrency clients, each sending its next request as soon as the last one finishes."""
+    latencies: List[float] = []
+    status: Dict[str, int] = {}
+    deadline = time.monotonic() + duration
+
+    async def client(http: httpx.AsyncClient) -> None:
+        while time.monotonic() < deadline:
+            kind, path, body, headers = traffic.next()
+            start = time.perf_counter()
+            try:
+                r = await http.post(path, json=body, headers=headers)
+                code = str(r.status_code)
+            except httpx.HTTPError as e:
+                r, code = None, type(e).__name__
+            if code in ("200", "304"):  # 503s (render queue full) come back at once and would flatter the tail
+                latencies.append((time.perf_counter() - start) * 1000)
+            status[code] = status.get(code, 0) + 1
+            if r is not None:
+                traffic.remember(kind, body, r)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=300.0, limits=limits) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    out: Dict[str, Any] = {"requests": sum(status.values()), "status": status, "seconds": round(elapsed, 2),
+                           "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0}
+    if len(latencies) >= 2:
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+        out.update(p50_ms=round(q[49], 1), p95_ms=round(q[94], 1), p99_ms=round(q[98], 1))
+    return out
+
+
+def run_workers(args, workers: int, layout: Dict[str, int]) -> List[Dict[str, Any]]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOADTEST_LATENCY_MS=str(args.latency_ms),
+               LOADTEST_GRADES=str(args.grades), LOADTEST_DIVISIONS=args.divisions)
+    env.pop("FIREBASE_KEY", None)
+    if args.render_workers:
+        env["CATALOG_RENDER_WORKERS"] = str(args.render_workers)
+    proc = start_server(args.server, workers, port, env)
+    results = []
+    try:
+        wait_ready(base_url, proc)
+        traffic = MonthEndTraffic(layout, seed=workers)
+        # Warm-up: every server worker builds its templates and render pool
+        asyncio.run(drive(base_url, traffic, max(2, workers * 2), args.warmup))
+        for concurrency in args.concurrency:
+            sampler = _RssSampler(proc.pid)
+            sampler.start()
+            step = asyncio.run(drive(base_url, traffic, concurrency, args.duration))
+            peak = sampler.stop()
+            step.update(workers=workers, concurrency=concurrency,
+                        peak_rss_mib=round(peak, 1) if peak is not None else None,
+                        rss_per_worker_mib=round(peak / workers, 1) if peak is not None else None)
+            results.append(step)
+            print(f"{workers:>7}{concurrency:>6}{step['rps']:>9.1f}{step.get('p50_ms', 0):>10.0f}"
+                  f"{step.get('p95_ms', 0):>10.0f}{step.get('p99_ms', 0):>10.0f}"
+                  f"{(peak or 0):>10.0f}  {json.dumps(step['status'])}")
+    finally:
+        stop_server(proc)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="server worker counts to compare")
+    parser.add_argument("--concurrency", default="1,8,32", help="concurrent clients per step")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before the first step")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="CATALOG_RENDER_WORKERS per server worker (default: the service's own)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="added to every async Firestore call")
+    parser.add_argument("--grades", type=int, default=10)
+    parser.add_argument("--divisions", default="AB")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="default: bench/results/loadtest-<timestamp>.json")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    layout = school_layout(args.grades, args.divisions)
+
+    print(f"{'workers':>7}{'conc':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MiB':>10}  status")
+    results = []
+    for workers in [int(w) for w in args.workers.split(",") if w]:
+        results += run_workers(args, workers, layout)
+
+    out = args.out or RESULTS_DIR / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    out.write_text(json.dumps({"environment": _environment(), "config": config, "mix": MONTH_END_MIX,
+                               "classes": len(layout), "results": results}, indent=2) + "\n")
+    print(f"\nwrote {out}")
+
+
+if __name__ == "__main__":
+    main()
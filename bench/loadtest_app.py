@@ -0,0 +1,35 @@
+"""
+The service from main.py over a seeded in-memory Firestore, for load tests:
+
+    uvicorn bench.loadtest_app:app --workers 4
+    gunicorn -c gunicorn.conf.py bench.loadtest_app:app -w 4
+
+Every worker process seeds its own copy of the same synthetic school
+(deterministic; under gunicorn's preload_app the master seeds it once and
+the workers inherit it), so no FIREBASE_KEY or emulator is needed. LOADTEST_GRADES
+(default 10), LOADTEST_DIVISIONS (AB), LOADTEST_HISTORY_MONTHS (3) shape the
+school; LOADTEST_LATENCY_MS (20) is added to every async Firestore call.
+"""
+from __future__ import annotations
+import os
+from datetime import date
+
+from bench.fake_firestore import FakeFirestore
+from bench.synthetic_roster import school_layout, seed_school
+from reports.catalog import firestore_clients_fn
+
+
+def layout_from_env():
+    return school_layout(int(os.environ.get("LOADTEST_GRADES", "10")),
+                         os.environ.get("LOADTEST_DIVISIONS", "AB"))
+
+
+db = FakeFirestore()
+_today = date.today()
+seed_school(db, layout_from_env(), _today.year, _today.month,
+            history_months=int(os.environ.get("LOADTEST_HISTORY_MONTHS", "3")))
+firestore_clients_fn.set_clients(
+    db=db, async_db=db.async_client(float(os.environ.get("LOADTEST_LATENCY_MS", "20")) / 1000),
+)
+
+from main import app  # noqa: E402  (clients must be in place before main is imported)
@@ -0,0 +1,140 @@
+"""
+Synthetic class rosters shaped like the production data: Marathi names,
+girls listed before boys, Timestamp dobs and the usual category/concession
+mix. Deterministic for a given (size, seed).
+"""
+from __future__ import annotations
+import calendar
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from reports.catalog.report_data_fn import roster_record_id
+
+FIRST_NAMES_GIRLS = ["सई", "अनुष्का", "प्राजक्ता", "श्रुती", "गौरी", "मधुरा", "रुचा", "स्नेहा", "वैष्णवी", "पल्लवी"]
+FIRST_NAMES_BOYS = ["आदित्य", "ओंकार", "प्रथमेश", "सार्थक", "विराज", "तेजस", "अथर्व", "सोहम", "रोहन", "मयूर"]
+SURNAMES = ["पाटील", "जाधव", "कुलकर्णी", "देशमुख", "शिंदे", "पवार", "गायकवाड", "भोसले", "कांबळे", "सावंत"]
+MOTHER_NAMES = ["सुनीता", "मंगल", "अर्चना", "वर्षा", "रेखा", "सविता", "उज्ज्वला", "शारदा"]
+CATEGORIES = [("OPEN", "खुला"), ("OBC", "इतर मागास"), ("SC", "अनुसूचित जाती"), ("ST", "अनुसूचित जमाती"),
+              ("NT-B", "भटक्या जमाती ब"), ("SBC", "विशेष मागास")]
+CASTES = ["मराठा", "माळी", "महार", "धनगर", "वंजारी", "ब्राह्मण"]
+CONCESSIONS = ["", "", "मोफत शिक्षण", "माजी सैनिक"]
+
+
+class Timestamp:
+    """What the Admin SDK hands back for timestamps nested in arrays: has .to_datetime()."""
+
+    __slots__ = ("_dt",)
+
+    def __init__(self, dt: datetime):
+        self._dt = dt
+
+    def to_datetime(self) -> datetime:
+        return self._dt
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def make_roster(size: int, class_division: str = "5-A", seed: int = 0) -> List[Dict[str, Any]]:
+    """`size` active students, roughly half girls (listed first), rollNo 1..size."""
+    rnd = random.Random(f"{class_division}:{size}:{seed}")
+    girls = size // 2 + rnd.randint(-size // 10, size // 10) if size >= 10 else size // 2
+    students = []
+    for i in range(size):
+        girl = i < girls
+        first = rnd.choice(FIRST_NAMES_GIRLS if girl else FIRST_NAMES_BOYS)
+        cat_en, cat_mr = rnd.choice(CATEGORIES)
+        students.append({
+            "regNo": 10000 + i,
+            "rollNo": i + 1,
+            "fullNameMr": f"{rnd.choice(SURNAMES)} {first} {rnd.choice(FIRST_NAMES_BOYS)}",
+            "motherName": rnd.choice(MOTHER_NAMES),
+            "gender": "मुलगी" if girl else "मुलगा",
+            "dob": Timestamp(datetime(2013 + rnd.randint(0, 2), rnd.randint(1, 12), rnd.randint(1, 28),
+                                      tzinfo=timezone.utc)),
+            "categoryEn": cat_en,
+            "categoryMr": cat_mr,
+            "caste": rnd.choice(CASTES),
+            "concession": rnd.choice(CONCESSIONS),
+            "status": "active",
+            "classDivision": class_division,
+        })
+    return students
+
+
+def catalog_meta(class_division: str, year: int = 2025, month: int = 6) -> Dict[str, Any]:
+    return {
+        "classTeacher": "श्री. पाटील",
+        "month": month,
+        "year": year,
+        "subjects": [{"nameMr": name, "order": i} for i, name in enumerate(
+            ["मराठी", "हिंदी", "इंग्रजी", "गणित", "विज्ञान", "इतिहास", "भूगोल", "कला"])],
+    }
+
+
+def make_attendance(students: List[Dict[str, Any]], year: int = 2025, month: int = 6, seed: int = 0) -> Dict[str, Any]:
+    """attendance doc for the roster: Sundays off, about one absence in twelve."""
+    rnd = random.Random(f"attendance:{year}-{month}:{len(students)}:{seed}")
+    days = calendar.monthrange(year, month)[1]
+    sundays = {d for d in range(1, days + 1) if calendar.weekday(year, month, d) == calendar.SUNDAY}
+    marks = {}
+    for st in students:
+        marks[str(st["regNo"])] = "".join(
+            "-" if d in sundays else ("A" if rnd.random() < 1 / 12 else "P") for d in range(1, days + 1)
+        )
+    return {"marks": marks}
+
+
+def seed_firestore(db, class_division: str, size: int, year: int = 2025, month: int = 6, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Writes the class into db (a FakeFirestore or a real/emulator client):
+    catalog/{cd}, its active students, and the roster_records snapshot and
+    attendance doc for year/month. Returns the roster.
+    """
+    students = make_roster(size, class_division, seed)
+    db.collection("catalog").document(class_division).set(catalog_meta(class_division, year, month))
+    students_ref = db.collection("catalog/global/students")
+    batch = db.batch()
+    for i, st in enumerate(students, start=1):
+        batch.set(students_ref.document(f"{class_division}-{st['regNo']}"), st)
+        if i % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    db.collection("roster_records").document(roster_record_id(class_division, year, month)).set(
+        {"studentsData": students})
+    db.collection("attendance").document(roster_record_id(class_division, year, month)).set(
+        make_attendance(students, year, month, seed))
+    return students
+
+
+def school_layout(grades: int = 10, divisions: str = "AB", seed: int = 0) -> Dict[str, int]:
+    """classDivision -> roster size for a whole school: grades 1..grades, 35-60 students per division."""
+    rnd = random.Random(f"school:{grades}:{divisions}:{seed}")
+    return {f"{g}-{d}": rnd.randint(35, 60) for g in range(1, grades + 1) for d in divisions}
+
+
+def months_before(year: int, month: int, n: int) -> List[Tuple[int, int]]:
+    """The n (year, month) pairs before year/month, most recent first."""
+    out = []
+    for _ in range(n):
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        out.append((year, month))
+    return out
+
+
+def seed_school(db, layout: Dict[str, int], year: int, month: int, history_months: int = 3, seed: int = 0) -> None:
+    """
+    Every class of layout as of year/month (seed_firestore), plus the frozen
+    roster and attendance of the history_months before it. Past rosters
+    differ a little from the live one, as they do after admissions.
+    """
+    for cd, size in layout.items():
+        seed_firestore(db, cd, size, year, month, seed)
+        for k, (y, m) in enumerate(months_before(year, month, history_months), start=1):
+            students = make_roster(max(1, size - k), cd, seed + k)
+            db.collection("roster_records").document(roster_record_id(cd, y, m)).set({"studentsData": students})
+            db.collection("attendance").document(roster_record_id(cd, y, m)).set(
+                make_attendance(students, y, m, seed + k))
+
@@ -0,0 +1,40 @@
+# gunicorn -c gunicorn.conf.py main:app
+#
+# The app is imported once in the master (preload_app) and the workers fork
+# from it, sharing the imported modules copy-on-write instead of each
+# importing FastAPI, openpyxl and the Firestore client stack again. Nothing
+# that holds a connection or thread is created at import time: Firestore
+# clients, the render pool and the roster replica syncer all start in each
+# worker's lifespan (startup_fn.warm_up), after the fork.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+
+# Imported in the master too, so the workers' first Firestore client costs
+# no imports. Importing gRPC before forking is safe; channels are not.
+PRELOAD_MODULES = ("firebase_admin.firestore", "firebase_admin.firestore_async")
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before any worker forks
+    import importlib
+
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    # Keep what is loaded now out of the collector's reach: a collection in
+    # a worker would otherwise touch (and so copy) every shared page
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,34 +1,77 @@
 # main.py
 from __future__ import annotations
 
+import time
+_import_started = time.perf_counter()  # startup budget: everything below counts as "import"
+
 import os
 import json
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List
 
-from fastapi import FastAPI, Body, Response, HTTPException
+from fastapi import FastAPI, Body, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from firebase_admin import credentials, initialize_app
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from reports.catalog.generate_full_report_fn import generate_catalog_report
+from reports.catalog.generate_full_report_fn import generate_catalog_report_async
+from reports.catalog.academic_year_fn import generate_academic_year_report_async, academic_year_label
+from reports.catalog.firestore_clients_fn import clients_configured, get_db
+from reports.catalog.report_data_fn import load_bulk_report_inputs_fn, is_historical
+from reports.catalog.bulk_report_fn import iter_bulk_catalog_zip
+from reports.catalog.report_cache_fn import get_report_cache
+from reports.catalog.incremental_render_fn import incremental_stats
+from reports.catalog.render_executor_fn import RenderQueueFull, get_render_executor
+from reports.catalog.report_metrics_fn import metrics_payload
+from reports.catalog.report_jobs_fn import submit_report_job, get_job_status, open_job_result
+from reports.catalog.generate_full_report_fn import iter_report_chunks, report_flights
+from reports.catalog.snapshot_freeze_fn import freeze_month_snapshots_fn, load_school_summary_fn
+from reports.catalog.roster_replica_fn import replica_stats, start_replica_sync, stop_replica_sync
+from reports.catalog.startup_fn import (
+    note_first_request, record_startup, startup_stage, startup_stats, warm_up, warmup_enabled,
+)
+from reports.catalog.report_profile_fn import (
+    PROFILE_TYPE, admin_token_ok, get_profile, open_profile, profile_report_async, profiling_requested,
+)
 
 # ---------------------------------------------------------------------
 # Firebase Admin initialization
 # ---------------------------------------------------------------------
-FIREBASE_CREDENTIALS_JSON = os.environ.get("FIREBASE_KEY")
-if not FIREBASE_CREDENTIALS_JSON:
-    raise RuntimeError(
-        "FIREBASE_KEY env var not set. Paste your service account JSON here."
-    )
+# Skipped when Firestore clients were injected before import (bench/loadtest_app.py)
+if not clients_configured():
+    with startup_stage("firebase_init"):
+        from firebase_admin import credentials, initialize_app
+
+        FIREBASE_CREDENTIALS_JSON = os.environ.get("FIREBASE_KEY")
+        if not FIREBASE_CREDENTIALS_JSON:
+            raise RuntimeError(
+                "FIREBASE_KEY env var not set. Paste your service account JSON here."
+            )
 
-cred_dict = json.loads(FIREBASE_CREDENTIALS_JSON)
-cred = credentials.Certificate(cred_dict)
-initialize_app(cred)
+        cred_dict = json.loads(FIREBASE_CREDENTIALS_JSON)
+        cred = credentials.Certificate(cred_dict)
+        initialize_app(cred)
 
 # ---------------------------------------------------------------------
 # FastAPI app
 # ---------------------------------------------------------------------
-app = FastAPI(title="Catalog Report Service")
+ASSETS_DIR = Path("assets")
+
+# Warm-up (startup_fn) runs before the worker takes requests; the roster
+# replica syncer (CATALOG_REPLICA_PATH) runs with the worker; render pool
+# children go down with it
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if warmup_enabled():
+        await asyncio.to_thread(warm_up, ASSETS_DIR)
+    start_replica_sync(get_db())
+    yield
+    await asyncio.to_thread(stop_replica_sync)
+    await asyncio.to_thread(get_render_executor().shutdown)
+
+app = FastAPI(title="Catalog Report Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,6 +81,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Render pool is full: tell clients when to come back instead of queueing
+@app.exception_handler(RenderQueueFull)
+async def render_queue_full_handler(request, exc: RenderQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Report unchanged since the client's copy: answer 304, nothing was rendered
+def not_modified_response(result) -> Response:
+    return Response(status_code=304, headers={
+        "ETag": result["etag"],
+        "Cache-Control": "no-cache",
+        "Server-Timing": result["server_timing"],
+    })
+
+# Single report, profiled (report_profile_fn) when asked: (result, profile id or None)
+async def run_report(profile: bool, **kwargs):
+    started = time.perf_counter()
+    if profile:
+        label = f"{kwargs['class_no']}-{kwargs['division']}"
+        if kwargs.get("selected_year") and kwargs.get("selected_month"):
+            label += f"_{kwargs['selected_year']}-{str(kwargs['selected_month']).zfill(2)}"
+        out = await profile_report_async(label, **kwargs)
+    else:
+        out = await generate_catalog_report_async(**kwargs), None
+    note_first_request(time.perf_counter() - started)
+    return out
+
 # ---------------------------------------------------------------------
 # Health
 # ---------------------------------------------------------------------
@@ -45,42 +118,96 @@ app.add_middleware(
 def health():
     return {"ok": True}
 
+# ---------------------------------------------------------------------
+# Prometheus metrics: per-stage histograms, Firestore document reads
+# ---------------------------------------------------------------------
+@app.get("/metrics")
+def metrics():
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+# ---------------------------------------------------------------------
+# Render pool queue depth and wait times (this worker only)
+# ---------------------------------------------------------------------
+@app.get("/render-stats")
+def render_stats():
+    return get_render_executor().stats()
+
+# ---------------------------------------------------------------------
+# Cold start of this worker: import, warm-up and first request against
+# the startup budget (startup_fn), and the assets it found
+# ---------------------------------------------------------------------
+@app.get("/startup-stats")
+def startup_stats_endpoint():
+    return startup_stats(ASSETS_DIR)
+
+# ---------------------------------------------------------------------
+# Report cache and request coalescing counters (this worker only),
+# roster replica size and lag (shared by the host's workers)
+# ---------------------------------------------------------------------
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "historical": get_report_cache().stats(),
+        "incremental": incremental_stats(),
+        "coalesced": report_flights.stats(),
+        "replica": replica_stats(),
+    }
+
 # ---------------------------------------------------------------------
 # Current-month generator (This endpoint is unchanged)
 # ---------------------------------------------------------------------
 @app.post("/generate")
-def generate_endpoint(
+async def generate_endpoint(
     class_no: int = Body(..., embed=True),
     division: str = Body(..., embed=True),
     return_inline: Optional[bool] = Body(False, embed=True),
     selected_month: Optional[int] = Body(None, embed=True),
     selected_year: Optional[int] = Body(None, embed=True),
+    with_attendance: bool = Body(False, embed=True),  # fill the day grid from attendance/
+    max_staleness: Optional[float] = Body(None, embed=True),  # seconds of replica lag accepted; 0 = Firestore
+    if_none_match: Optional[str] = Header(None),
+    x_catalog_profile: Optional[str] = Header(None),  # admin token: profile this request
 ):
-    assets_dir = Path("assets")
+    assets_dir = ASSETS_DIR
     div = (division or "").strip().upper()
     if not div:
         raise HTTPException(status_code=400, detail="division is required")
 
-    result = generate_catalog_report(
+    result, profile_id = await run_report(
+        profiling_requested(x_catalog_profile),
         class_no=class_no,
         division=div,
-        return_bytes=True,
+        return_bytes=False,
+        return_stream=True,
         assets_dir=assets_dir,
         selected_month=selected_month,
         selected_year=selected_year,
+        if_none_match=if_none_match,
+        with_attendance=with_attendance,
+        max_staleness=max_staleness,
     )
     if not result.get("ok"):
         raise HTTPException(status_code=400, detail=result.get("error", "Unknown error"))
+    if result.get("not_modified"):
+        return not_modified_response(result)
 
-    data: bytes = result["bytes"]
     disp_type = "inline" if return_inline else "attachment"
     suffix = ""
     if isinstance(selected_year, int) and isinstance(selected_month, int):
         suffix = f"_{selected_year}-{str(selected_month).zfill(2)}"
     filename = f"catalog_{class_no}-{div}{suffix}.xlsx"
-    headers = {"Content-Disposition": f'{disp_type}; filename="{filename}"'}
-    return Response(
-        content=data,
+    headers = {
+        "Content-Disposition": f'{disp_type}; filename="{filename}"',
+        "Content-Length": str(result["size"]),
+        "Server-Timing": result["server_timing"],
+        "ETag": result["etag"],
+        "Cache-Control": "no-cache",  # always revalidate; unchanged reports cost a 304
+    }
+    if profile_id:
+        headers["X-Profile-Id"] = profile_id
+    return StreamingResponse(
+        result["stream"],
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers,
     )
@@ -89,34 +216,280 @@ def generate_endpoint(
 # --- CHANGE: Historical generator updated to accept POST requests ---
 # ---------------------------------------------------------------------
 @app.post("/generate-historical-report") # Changed from @app.get to @app.post
-def generate_historical_report(
+async def generate_historical_report(
     # Changed from Query to Body to read JSON from the request
     class_no: int = Body(...),
     division: str = Body(...),
     selected_year: int = Body(...),
     selected_month: int = Body(...),
+    with_attendance: bool = Body(False),
+    max_staleness: Optional[float] = Body(None),
+    if_none_match: Optional[str] = Header(None),
+    x_catalog_profile: Optional[str] = Header(None),
 ):
-    assets_dir = Path("assets")
+    assets_dir = ASSETS_DIR
     div = (division or "").strip().upper()
     if not div:
         raise HTTPException(status_code=400, detail="division is required")
 
-    result = generate_catalog_report(
+    result, profile_id = await run_report(
+        profiling_requested(x_catalog_profile),
         class_no=class_no,
         division=div,
-        return_bytes=True,
+        return_bytes=False,
+        return_stream=True,
         assets_dir=assets_dir,
         selected_month=selected_month, # Use the variables from the Body
         selected_year=selected_year,   # Use the variables from the Body
+        if_none_match=if_none_match,
+        with_attendance=with_attendance,
+        max_staleness=max_staleness,
     )
-    if not result.get("ok") or not result.get("bytes"):
+    if result.get("ok") and result.get("not_modified"):
+        return not_modified_response(result)
+    if not result.get("ok") or not result.get("size"):
         raise HTTPException(status_code=400, detail=result.get("error", "Unknown error"))
 
-    data: bytes = result["bytes"]
     filename = f"catalog_{class_no}-{div}_{selected_year}-{str(selected_month).zfill(2)}.xlsx"
-    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    return Response(
-        content=data,
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(result["size"]),
+        "Server-Timing": result["server_timing"],
+        "ETag": result["etag"],
+        "Cache-Control": "no-cache",  # always revalidate; unchanged reports cost a 304
+    }
+    if profile_id:
+        headers["X-Profile-Id"] = profile_id
+    return StreamingResponse(
+        result["stream"],
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers,
-    )
\ No newline at end of file
+    )
+
+# ---------------------------------------------------------------------
+# Whole academic year of one class (June..May) in a single workbook
+# ---------------------------------------------------------------------
+@app.post("/generate-academic-year")
+async def generate_academic_year_endpoint(
+    class_no: int = Body(..., embed=True),
+    division: str = Body(..., embed=True),
+    start_year: int = Body(..., embed=True),  # 2025 = June 2025 .. May 2026
+):
+    assets_dir = ASSETS_DIR
+    div = (division or "").strip().upper()
+    if not div:
+        raise HTTPException(status_code=400, detail="division is required")
+    if start_year <= 0:
+        raise HTTPException(status_code=400, detail="invalid start_year")
+
+    result = await generate_academic_year_report_async(
+        class_no=class_no,
+        division=div,
+        start_year=start_year,
+        return_bytes=False,
+        return_stream=True,
+        assets_dir=assets_dir,
+    )
+    if not result.get("ok"):
+        raise HTTPException(status_code=400, detail=result.get("error", "Unknown error"))
+
+    filename = f"catalog_{class_no}-{div}_{academic_year_label(start_year)}.xlsx"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(result["size"]),
+        "Server-Timing": result["server_timing"],
+    }
+    if result["missing_months"]:
+        headers["X-Missing-Months"] = ",".join(result["missing_months"])
+    return StreamingResponse(
+        result["stream"],
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers,
+    )
+
+# ---------------------------------------------------------------------
+# Whole-school bulk export: one ZIP with every class-division
+# ---------------------------------------------------------------------
+@app.post("/generate-bulk")
+def generate_bulk_endpoint(
+    selected_month: Optional[int] = Body(None, embed=True),
+    selected_year: Optional[int] = Body(None, embed=True),
+    classes: Optional[List[str]] = Body(None, embed=True),  # e.g. ["5-A", "5-B"]; default: all
+):
+    assets_dir = ASSETS_DIR
+    if (selected_month is None) != (selected_year is None):
+        raise HTTPException(status_code=400, detail="selected_month and selected_year go together")
+    if selected_month is not None and not is_historical(selected_month, selected_year):
+        raise HTTPException(status_code=400, detail="invalid selected_month/selected_year")
+
+    try:
+        inputs_list = load_bulk_report_inputs_fn(
+            get_db(), classes, selected_month=selected_month, selected_year=selected_year
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not any(i.get("ok") for i in inputs_list):
+        detail = "; ".join(f"{i['class_division']}: {i['error']}" for i in inputs_list) or "No classes found"
+        raise HTTPException(status_code=400, detail=detail)
+
+    suffix = ""
+    if isinstance(selected_year, int) and isinstance(selected_month, int):
+        suffix = f"_{selected_year}-{str(selected_month).zfill(2)}"
+    headers = {"Content-Disposition": f'attachment; filename="catalogs{suffix}.zip"'}
+    return StreamingResponse(
+        iter_bulk_catalog_zip(inputs_list, assets_dir, selected_month, selected_year),
+        media_type="application/zip",
+        headers=headers,
+    )
+
+# ---------------------------------------------------------------------
+# Month-end freeze: copy every class's live roster into roster_records
+# (run from a scheduler on the last day of the month)
+# ---------------------------------------------------------------------
+@app.post("/freeze-snapshots")
+def freeze_snapshots_endpoint(
+    year: Optional[int] = Body(None, embed=True),    # default: current month
+    month: Optional[int] = Body(None, embed=True),
+    classes: Optional[List[str]] = Body(None, embed=True),  # default: every active class
+    overwrite: bool = Body(False, embed=True),
+    dry_run: bool = Body(False, embed=True),
+):
+    if (year is None) != (month is None):
+        raise HTTPException(status_code=400, detail="year and month go together")
+    if year is None:
+        today = date.today()
+        year, month = today.year, today.month
+    if not is_historical(month, year):
+        raise HTTPException(status_code=400, detail="invalid year/month")
+
+    try:
+        summary = freeze_month_snapshots_fn(get_db(), year, month, classes, overwrite=overwrite, dry_run=dry_run)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not summary["frozen"] and not summary["skipped_existing"]:
+        raise HTTPException(status_code=400, detail="; ".join(summary["errors"]) or "No active students found")
+    return summary
+
+# ---------------------------------------------------------------------
+# Whole-school boys/girls by category and concession, per class and total
+# ---------------------------------------------------------------------
+@app.post("/school-summary")
+def school_summary_endpoint(
+    selected_month: Optional[int] = Body(None, embed=True),  # default: live roster
+    selected_year: Optional[int] = Body(None, embed=True),
+):
+    try:
+        summary = load_school_summary_fn(get_db(), selected_year, selected_month)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not summary["ok"]:
+        raise HTTPException(status_code=400, detail=summary["error"])
+    return summary
+
+# ---------------------------------------------------------------------
+# Report jobs: submit, poll, download. Renders run detached from the
+# client's connection and results go to the job store (result_store_fn).
+# ---------------------------------------------------------------------
+@app.post("/jobs", status_code=202)
+async def create_job(
+    kind: str = Body("catalog", embed=True),  # "catalog" | "academic_year" | "bulk"
+    class_no: Optional[int] = Body(None, embed=True),
+    division: Optional[str] = Body(None, embed=True),
+    selected_month: Optional[int] = Body(None, embed=True),
+    selected_year: Optional[int] = Body(None, embed=True),
+    start_year: Optional[int] = Body(None, embed=True),
+    classes: Optional[List[str]] = Body(None, embed=True),
+):
+    div = (division or "").strip().upper()
+    if (selected_month is None) != (selected_year is None):
+        raise HTTPException(status_code=400, detail="selected_month and selected_year go together")
+    if selected_month is not None and not is_historical(selected_month, selected_year):
+        raise HTTPException(status_code=400, detail="invalid selected_month/selected_year")
+
+    if kind == "catalog":
+        if class_no is None or not div:
+            raise HTTPException(status_code=400, detail="class_no and division are required")
+        params = {"class_no": class_no, "division": div,
+                  "selected_month": selected_month, "selected_year": selected_year}
+    elif kind == "academic_year":
+        if class_no is None or not div or not start_year or start_year <= 0:
+            raise HTTPException(status_code=400, detail="class_no, division and start_year are required")
+        params = {"class_no": class_no, "division": div, "start_year": start_year}
+    elif kind == "bulk":
+        params = {"selected_month": selected_month, "selected_year": selected_year, "classes": classes}
+    else:
+        raise HTTPException(status_code=400, detail=f"unknown job kind: {kind}")
+
+    status = await submit_report_job(kind, params, assets_dir=ASSETS_DIR)
+    return JSONResponse(
+        status_code=202,
+        content={**status, "status_url": f"/jobs/{status['id']}", "result_url": f"/jobs/{status['id']}/result"},
+        headers={"Location": f"/jobs/{status['id']}"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = await asyncio.to_thread(get_job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return status
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    status = await asyncio.to_thread(get_job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    if status["status"] == "failed":
+        raise HTTPException(status_code=400, detail=status.get("error") or "job failed")
+    if status["status"] != "succeeded":
+        return JSONResponse(status_code=409, content=status, headers={"Retry-After": "2"})
+    opened = await asyncio.to_thread(open_job_result, job_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="job result expired")
+    f, size = opened
+    return StreamingResponse(
+        iter_report_chunks(f),
+        media_type=status["content_type"],
+        headers={
+            "Content-Disposition": f'attachment; filename="{status["filename"]}"',
+            "Content-Length": str(size),
+        },
+    )
+
+# ---------------------------------------------------------------------
+# Request profiles (X-Catalog-Profile): summary and pstats download.
+# Both need the admin token in X-Admin-Token.
+# ---------------------------------------------------------------------
+def require_admin(token: Optional[str]) -> None:
+    if not admin_token_ok(token):
+        raise HTTPException(status_code=403, detail="admin token required")
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def profile_summary(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    summary = await asyncio.to_thread(get_profile, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return summary
+
+
+@app.get("/admin/profiles/{profile_id}/pstats")
+async def profile_download(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    opened = await asyncio.to_thread(open_profile, profile_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    f, size = opened
+    return StreamingResponse(
+        iter_report_chunks(f),
+        media_type=PROFILE_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="catalog-{profile_id}.prof"',
+            "Content-Length": str(size),
+        },
+    )
+
+record_startup("import", time.perf_counter() - _import_started)
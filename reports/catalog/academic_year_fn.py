@@ -0,0 +1,185 @@
+from __future__ import annotations
+import asyncio
+import calendar
+import datetime
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+from openpyxl import Workbook
+from openpyxl.packaging.relationship import get_rels_path
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.xml.functions import tostring
+
+from .report_data_fn import (
+    load_academic_year_sources_async_fn, academic_year_inputs_from_sources, doc_version,
+)
+from .report_cache_fn import get_report_cache, report_cache_key
+from .deterministic_output_fn import output_timestamp, save_workbook
+from .firestore_clients_fn import get_async_db
+from .render_executor_fn import RenderQueueFull
+from .report_metrics_fn import finish_report_metrics, stage_timer, timed_stage
+from .generate_full_report_fn import stream_report_sheets, render_file_in_pool, _report_output
+
+
+class _SharedMediaWriter(ExcelWriter):
+    """
+    ExcelWriter that stores each distinct image once. Every month's Front
+    Page carries the same logo; openpyxl would write one copy per sheet.
+    """
+
+    def __init__(self, workbook, archive):
+        super().__init__(workbook, archive)
+        self._media: Dict[Any, Any] = {}
+
+    def _write_drawing(self, drawing):
+        # Same as ExcelWriter._write_drawing except images sharing a source share a part
+        self._drawings.append(drawing)
+        drawing._id = len(self._drawings)
+        for chart in drawing.charts:
+            self._charts.append(chart)
+            chart._id = len(self._charts)
+        for img in drawing.images:
+            key = img.ref if isinstance(img.ref, str) else id(img.ref)
+            first = self._media.get(key)
+            if first is None:
+                self._images.append(img)
+                img._id = len(self._images)
+                self._media[key] = img
+            else:
+                img._id = first._id
+        self._archive.writestr(drawing.path[1:], tostring(drawing._write()))
+        self._archive.writestr(get_rels_path(drawing.path)[1:], tostring(drawing._write_rels()))
+        self.manifest.append(drawing)
+
+
+def save_shared_media_workbook(wb: Workbook, f, when: Optional[datetime.datetime] = None) -> None:
+    """wb.save(f), with repeated images stored once; dated when if given (deterministic_output_fn)."""
+    save_workbook(wb, f, when, _SharedMediaWriter)
+
+
+def _month_prefix(inputs: Dict[str, Any]) -> str:
+    rd = inputs["report_data"]
+    return f"{calendar.month_abbr[rd['selected_month']]} {rd['selected_year']} "
+
+
+def render_academic_year_workbook(month_inputs: List[Dict[str, Any]], assets_dir: Optional[Path] = None) -> Workbook:
+    """
+    One write-only workbook with a Front Page / Catalog / Back Page set per
+    month, e.g. "Jun 2025 Catalog". The static page layouts come from the
+    process-wide sheet templates and their styles are registered once.
+    """
+    wb = Workbook(write_only=True)
+    for inputs in month_inputs:
+        stream_report_sheets(wb, inputs, assets_dir, title_prefix=_month_prefix(inputs))
+    return wb
+
+
+def _sum_stages(stages: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    totals: "OrderedDict[str, float]" = OrderedDict()
+    for name, seconds in stages:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return list(totals.items())
+
+
+def render_academic_year_file_timed(
+    month_inputs: List[Dict[str, Any]],
+    assets_dir: Optional[Path] = None,
+) -> Tuple[str, List[Tuple[str, float]]]:
+    """Renders the year workbook into a new temp file; returns its path and per-stage totals."""
+    with stage_timer() as timer:
+        wb = render_academic_year_workbook(month_inputs, assets_dir)
+        fd, path = tempfile.mkstemp(prefix="catalog-year-", suffix=".xlsx")
+        try:
+            with os.fdopen(fd, "wb") as f, timed_stage("save"):
+                save_shared_media_workbook(wb, f, output_timestamp(month_inputs))
+        except BaseException:
+            os.unlink(path)
+            raise
+    return path, _sum_stages(timer.stages)
+
+
+def academic_year_label(start_year: int) -> str:
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+
+async def generate_academic_year_report_async(
+    class_no: str | int,
+    division: str,
+    start_year: int,
+    *,
+    save_path: Optional[Path | str] = None,
+    return_bytes: bool = True,
+    assets_dir: Optional[Path] = None,
+    use_cache: bool = True,
+    return_stream: bool = False,
+) -> Dict[str, Any]:
+    """
+    Whole academic year (June start_year .. May start_year + 1) of one class
+    in a single workbook, built from the monthly roster_records snapshots.
+
+    The catalog meta doc and all twelve snapshots are fetched in one batched
+    read; months without a snapshot are skipped and listed in
+    out["missing_months"] as "YYYY-MM". Finished workbooks are cached on the
+    update_time of every source document.
+    """
+    with stage_timer() as timer:
+        out = await _generate_academic_year(
+            class_no, division, start_year, save_path, return_bytes, assets_dir, use_cache, return_stream,
+        )
+    return finish_report_metrics(timer, out, "academic_year")
+
+
+async def _generate_academic_year(
+    class_no: str | int,
+    division: str,
+    start_year: int,
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    assets_dir: Optional[Path],
+    use_cache: bool,
+    return_stream: bool,
+) -> Dict[str, Any]:
+    try:
+        class_division_str = f"{class_no}-{division.upper()}"
+        sources = await load_academic_year_sources_async_fn(get_async_db(), class_division_str, start_year)
+        month_inputs, missing = academic_year_inputs_from_sources(class_no, division, sources)
+        if not month_inputs:
+            return {"ok": False, "error": f"No roster snapshots for {class_division_str} in "
+                                          f"academic year {academic_year_label(start_year)}.",
+                    "bytes": None, "path": None}
+        missing_months = [f"{y}-{str(m).zfill(2)}" for y, m in missing]
+
+        cache = get_report_cache()
+        cache_key = None
+        if use_cache:
+            cache_key = report_cache_key(
+                "academic-year", class_division_str, start_year, doc_version(sources["catalog"]),
+                *(doc_version(snap) for _y, _m, _rid, snap in sources["months"]),
+                assets_dir=assets_dir,
+            )
+            with timed_stage("cache_read"):
+                data = await asyncio.to_thread(cache.get, cache_key)
+            if data is not None:
+                out = await asyncio.to_thread(_report_output, data, save_path, return_bytes, return_stream)
+                return {**out, "missing_months": missing_months}
+
+        path = await render_file_in_pool(render_academic_year_file_timed, month_inputs, assets_dir)
+        f = open(path, "rb")
+        os.unlink(path)  # the open handle keeps the file readable
+        if not (cache_key or return_bytes):
+            out = await asyncio.to_thread(_report_output, f, save_path, False, return_stream)
+        else:
+            with f:
+                data = await asyncio.to_thread(f.read)
+            if cache_key:
+                await asyncio.to_thread(cache.put, cache_key, data)
+            out = await asyncio.to_thread(_report_output, data, save_path, return_bytes, return_stream)
+        return {**out, "missing_months": missing_months}
+
+    except RenderQueueFull:
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "bytes": None, "path": None}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+FONT_FILE = "Kokila.ttf"
+LOGO_FILE = "School_logo.png"
+_FONT_MAGIC = (b"\x00\x01\x00\x00", b"true", b"OTTO", b"ttcf")
+
+
+class ReportAssets:
+    """
+    The font and logo a report uses, found and checked once per assets
+    directory: Kokila only if Kokila.ttf really is a font file, the logo
+    only if Pillow can read it. What was rejected is listed in problems.
+    """
+
+    def __init__(self, assets_dir: Optional[Path]):
+        self.assets_dir = assets_dir
+        self.font_name = "Calibri"
+        self.logo_path: Optional[Path] = None
+        self.logo_size: Optional[Tuple[int, int]] = None
+        self.problems: List[str] = []
+        if assets_dir is None:
+            return
+
+        font_path = assets_dir / FONT_FILE
+        if font_path.exists():
+            try:
+                with open(font_path, "rb") as f:
+                    magic = f.read(4)
+            except OSError as e:
+                magic = b""
+                self.problems.append(f"{font_path}: {e}")
+            if magic in _FONT_MAGIC:
+                self.font_name = "Kokila"
+            elif magic:
+                self.problems.append(f"{font_path}: not a TrueType/OpenType font, using Calibri")
+
+        logo_path = assets_dir / LOGO_FILE
+        if logo_path.exists():
+            from PIL import Image  # only here and in openpyxl's own image handling
+
+            try:
+                with Image.open(logo_path) as img:
+                    img.verify()
+                with Image.open(logo_path) as img:
+                    self.logo_size = img.size
+                self.logo_path = logo_path
+            except Exception as e:
+                self.problems.append(f"{logo_path}: {e}; the Front Page has no logo")
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "assets_dir": str(self.assets_dir) if self.assets_dir else None,
+            "font": self.font_name,
+            "logo": str(self.logo_path) if self.logo_path else None,
+            "logo_size": list(self.logo_size) if self.logo_size else None,
+            "problems": self.problems,
+        }
+
+
+_assets: Dict[Optional[str], ReportAssets] = {}
+_assets_lock = threading.Lock()
+
+
+def get_report_assets(assets_dir: Optional[Path]) -> ReportAssets:
+    """Process-wide ReportAssets for assets_dir; the files are read on first use only."""
+    key = str(assets_dir) if assets_dir else None
+    assets = _assets.get(key)
+    if assets is None:
+        with _assets_lock:
+            assets = _assets.get(key)
+            if assets is None:
+                assets = _assets[key] = ReportAssets(Path(assets_dir) if assets_dir else None)
+    return assets
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import calendar
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+# attendance/{classNo}-{DIV}_{YYYY}-{MM}: {"marks": {regNo: "PPAP-..."}}, one
+# character per day of the month. P = present, A = absent, anything else
+# (-, H, blank) = no school or not marked. A day counts as a working day
+# once anyone in the class is marked on it.
+DAYS = 31
+PRESENT, ABSENT = ord("P"), ord("A")
+
+# What a day cell shows for each mark byte; everything else stays empty
+_DAY_CELL = np.full(256, None, dtype=object)
+_DAY_CELL[PRESENT] = "P"
+_DAY_CELL[ABSENT] = "A"
+
+
+def attendance_grid(students: List[Dict[str, Any]], marks: Dict[str, Any]) -> np.ndarray:
+    """students x 31 uint8 matrix of mark bytes, rows in roster order."""
+    pad = " " * DAYS
+    text = "".join(
+        (str(marks.get(str(st.get("regNo", "")), "") or "").upper() + pad)[:DAYS]
+        for st in students
+    )
+    # ascii "replace" keeps one byte per character
+    return np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8).reshape(len(students), DAYS)
+
+
+def attendance_summary(grid: np.ndarray, year: int, month: int) -> Dict[str, Any]:
+    """
+    Totals for the Catalog sheet and Front Page, computed over the whole
+    grid at once: days present per student, present/absent per day, the
+    working days and the average daily attendance. Days past the end of
+    the month are ignored. Everything in it is picklable.
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    grid = grid.copy()
+    grid[:, days_in_month:] = ord(" ")
+    present = grid == PRESENT
+    absent = grid == ABSENT
+    day_present = present.sum(axis=0)
+    day_absent = absent.sum(axis=0)
+    working = (day_present + day_absent) > 0
+    working_days = int(working.sum())
+    total_present = int(day_present.sum())
+    return {
+        "grid": grid,
+        "student_present": present.sum(axis=1),
+        "day_present": day_present,
+        "day_absent": day_absent,
+        "working": working,
+        "working_days": working_days,
+        "total_present": total_present,
+        "total_absent": int(day_absent.sum()),
+        "average": round(total_present / working_days, 2) if working_days else None,
+    }
+
+
+def load_attendance_summary(students: List[Dict[str, Any]], snap, year: int, month: int) -> Optional[Dict[str, Any]]:
+    """Summary of an attendance doc snapshot for this roster; None when the month has no attendance."""
+    if snap is None or not snap.exists:
+        return None
+    marks = (snap.to_dict() or {}).get("marks") or {}
+    if not isinstance(marks, dict):
+        return None
+    return attendance_summary(attendance_grid(students, marks), year, month)
+
+
+def student_day_cells(summary: Dict[str, Any]) -> List[List[Any]]:
+    """Per student, the values of the 31 day columns (M..AQ)."""
+    return _DAY_CELL[summary["grid"]].tolist()
+
+
+def footer_day_cells(summary: Dict[str, Any]) -> List[List[Any]]:
+    """
+    Values of the day columns plus AR on the हजर / गैरहजर / एकूण footer
+    rows. Days nobody was marked on stay empty.
+    """
+    working = summary["working"]
+    present = np.where(working, summary["day_present"], None).tolist()
+    absent = np.where(working, summary["day_absent"], None).tolist()
+    total = np.where(working, summary["day_present"] + summary["day_absent"], None).tolist()
+    total_present, total_absent = summary["total_present"], summary["total_absent"]
+    return [
+        present + [total_present],
+        absent + [total_absent],
+        total + [total_present + total_absent],
+    ]
@@ -3,17 +3,36 @@ from typing import Dict, Any, List, Optional
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side
 
+from .sheet_template_fn import get_sheet_template_fn
+
 CM_TO_POINTS = 72.0 / 2.54  # points per cm
 
-def add_back_page_fn(
-    wb: Workbook,
-    class_no: Optional[str | int] = None,
-    division: Optional[str] = None,
-    subjects: Optional[List[Dict[str, Any]]] = None,
-    catalog_doc: Optional[Dict[str, Any]] = None,
-) -> Workbook:
-    ws = wb.create_sheet(title="Back Page")
+FONT_NAME = "Kokila"
 
+
+def _thin_range(ws, rng: str):
+    thin = Side(style="thin")
+    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    for row in ws[rng]:
+        for cell in row:
+            cell.border = thin_border
+
+
+def _edge(ws, r: int, c: int, left=None, right=None, top=None, bottom=None):
+    e = ws.cell(r, c).border
+    ws.cell(r, c).border = Border(
+        left=left if left is not None else e.left,
+        right=right if right is not None else e.right,
+        top=top if top is not None else e.top,
+        bottom=bottom if bottom is not None else e.bottom,
+    )
+
+
+def _build_back_page(ws, subject_count: int) -> None:
+    """
+    The whole Back Page layout for a given number of subjects, with empty
+    subject names and teacher name.
+    """
     ws.page_setup.paperSize = ws.PAPERSIZE_LEGAL
     ws.page_margins.left = 0.0
     ws.page_margins.right = 0.0
@@ -34,8 +53,7 @@ def add_back_page_fn(
     ws.merge_cells('D2:H2')
     ws.merge_cells('I2:K2')
 
-    font_name = "Kokila"
-    hf = Font(name=font_name, size=14, bold=True)
+    hf = Font(name=FONT_NAME, size=14, bold=True)
     ws['B2'].value = "विषय"
     ws['D2'].value = "महिन्यात पूर्ण केलेला अभ्यासक्रम"
     ws['I2'].value = "विषय शिक्षकाची सही"
@@ -43,22 +61,10 @@ def add_back_page_fn(
         ws[a].alignment = Alignment(horizontal='center', vertical='center')
         ws[a].font = hf
 
-    thin = Side(style="thin")
-    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    def thin_range(rng: str):
-        for row in ws[rng]:
-            for cell in row:
-                cell.border = thin_border
-    thin_range('B2:C2'); thin_range('D2:H2'); thin_range('I2:K2')
-
-    def edge(r: int, c: int, left=None, right=None, top=None, bottom=None):
-        e = ws.cell(r, c).border
-        ws.cell(r, c).border = Border(
-            left=left if left is not None else e.left,
-            right=right if right is not None else e.right,
-            top=top if top is not None else e.top,
-            bottom=bottom if bottom is not None else e.bottom,
-        )
+    _thin_range(ws, 'B2:C2'); _thin_range(ws, 'D2:H2'); _thin_range(ws, 'I2:K2')
+
+    def edge(r: int, c: int, **sides):
+        _edge(ws, r, c, **sides)
     medium = Side(style="medium")
 
     for col in (2, 3):
@@ -69,11 +75,12 @@ def add_back_page_fn(
         edge(2, col, top=medium); edge(2, col, bottom=medium)
     edge(2, 4, left=medium); edge(2, 11, right=medium)
 
-    rows = [s for s in (subjects or []) if isinstance(s, dict) and s.get('active', True)]
-    rows.sort(key=lambda s: s.get('order', 0))
+    def thin_range(rng: str):
+        _thin_range(ws, rng)
+    font_name = FONT_NAME
 
     r = 3
-    for s in rows:
+    for _ in range(subject_count):
         ws.row_dimensions[r].auto_height = False
         ws.row_dimensions[r].height = 2.82 * CM_TO_POINTS
 
@@ -82,7 +89,7 @@ def add_back_page_fn(
         ws.merge_cells(start_row=r, start_column=9, end_row=r, end_column=11)
 
         b = ws.cell(r, 2)
-        b.value = s.get('nameMr') or s.get('name') or ""
+        b.value = ""
         b.alignment = Alignment(horizontal='center', vertical='center')
         b.font = Font(name=font_name, size=14, bold=True)
 
@@ -119,44 +126,102 @@ def add_back_page_fn(
     ws.row_dimensions[footer_row3].auto_height = False
     ws.row_dimensions[footer_row3].height = 0.90 * CM_TO_POINTS
 
-    def resolve_teacher_name() -> str:
-        if isinstance(catalog_doc, dict):
-            v = catalog_doc.get('classTeacher')
-            if isinstance(v, str) and v.strip():
-                return v.strip()
-            if isinstance(class_no, str) and isinstance(division, str):
-                key = f"catalog-{class_no}-{division}"
-                nested = catalog_doc.get(key)
-                if isinstance(nested, dict):
-                    v2 = nested.get('classTeacher')
-                    if isinstance(v2, str) and v2.strip():
-                        return v2.strip()
-        if isinstance(class_no, dict):
-            v = class_no.get('classTeacher')
-            if isinstance(v, str) and v.strip():
-                return v.strip()
-        if isinstance(division, dict):
-            v = division.get('classTeacher')
-            if isinstance(v, str) and v.strip():
-                return v.strip()
-        for src in (catalog_doc, class_no, division):
-            try:
-                v = getattr(src, 'classTeacher', None)
-                if isinstance(v, str) and v.strip():
-                    return v.strip()
-            except Exception:
-                pass
-        return ""
-
-    teacher_name = resolve_teacher_name()
-    if len(teacher_name) >= 2 and teacher_name[0] == '"' and teacher_name[-1] == '"':
-        teacher_name = teacher_name[1:-1].strip()
-
     footer_row4 = footer_row3 + 1
     ws.merge_cells(start_row=footer_row4, start_column=10, end_row=footer_row4, end_column=11)
     ct = ws.cell(footer_row4, 10)
-    ct.value = teacher_name
+    ct.value = ""
     ct.alignment = Alignment(horizontal='center', vertical='center')
     ct.font = Font(name=font_name, size=14, bold=False)
 
+
+def _teacher_row(subject_count: int) -> int:
+    # header row 2, subject rows, then four footer rows; the name is the last
+    return max(2, 2 + subject_count) + 4
+
+
+def _resolve_teacher_name(class_no, division, catalog_doc) -> str:
+    if isinstance(catalog_doc, dict):
+        v = catalog_doc.get('classTeacher')
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+        if isinstance(class_no, str) and isinstance(division, str):
+            key = f"catalog-{class_no}-{division}"
+            nested = catalog_doc.get(key)
+            if isinstance(nested, dict):
+                v2 = nested.get('classTeacher')
+                if isinstance(v2, str) and v2.strip():
+                    return v2.strip()
+    if isinstance(class_no, dict):
+        v = class_no.get('classTeacher')
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    if isinstance(division, dict):
+        v = division.get('classTeacher')
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    for src in (catalog_doc, class_no, division):
+        try:
+            v = getattr(src, 'classTeacher', None)
+            if isinstance(v, str) and v.strip():
+                return v.strip()
+        except Exception:
+            pass
+    return ""
+
+
+def active_subjects(subjects) -> List[Dict[str, Any]]:
+    """The subjects the Back Page lists, in their 'order'."""
+    rows = [s for s in (subjects or []) if isinstance(s, dict) and s.get('active', True)]
+    rows.sort(key=lambda s: s.get('order', 0))
+    return rows
+
+
+def back_page_template(subject_count: int):
+    """The Back Page layout; it depends only on the subject count and is built once per count."""
+    return get_sheet_template_fn(("back_page", subject_count), lambda ws: _build_back_page(ws, subject_count))
+
+
+def back_page_values(rows, class_no, division, catalog_doc) -> Dict[tuple, str]:
+    """Subject names and the class teacher's name as (row, col) -> value."""
+    values = {(r, 2): s.get('nameMr') or s.get('name') or "" for r, s in enumerate(rows, start=3)}
+    teacher_name = _resolve_teacher_name(class_no, division, catalog_doc)
+    if len(teacher_name) >= 2 and teacher_name[0] == '"' and teacher_name[-1] == '"':
+        teacher_name = teacher_name[1:-1].strip()
+    values[(_teacher_row(len(rows)), 10)] = teacher_name
+    return values
+
+
+def add_back_page_fn(
+    wb: Workbook,
+    class_no: Optional[str | int] = None,
+    division: Optional[str] = None,
+    subjects: Optional[List[Dict[str, Any]]] = None,
+    catalog_doc: Optional[Dict[str, Any]] = None,
+    use_template: bool = True,
+) -> Workbook:
+    rows = active_subjects(subjects)
+
+    if use_template:
+        ws = back_page_template(len(rows)).stamp(wb, "Back Page")
+    else:
+        ws = wb.create_sheet(title="Back Page")
+        _build_back_page(ws, len(rows))
+
+    for (r, c), value in back_page_values(rows, class_no, division, catalog_doc).items():
+        ws.cell(r, c).value = value
     return wb
+
+
+def stream_back_page_fn(
+    ws,
+    class_no: Optional[str | int] = None,
+    division: Optional[str] = None,
+    subjects: Optional[List[Dict[str, Any]]] = None,
+    catalog_doc: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Writes the Back Page into an empty write-only worksheet."""
+    rows = active_subjects(subjects)
+    values = back_page_values(rows, class_no, division, catalog_doc)
+    back_page_template(len(rows)).stream_into(ws, {k: (v, None, None) for k, v in values.items()})
+
+
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator
+
+from .deterministic_output_fn import FixedTimeZipFile, output_timestamp
+from .generate_full_report_fn import render_catalog_file
+from .render_executor_fn import get_render_executor
+
+
+def report_filename(class_division: str, selected_month: Optional[int], selected_year: Optional[int]) -> str:
+    suffix = ""
+    if isinstance(selected_year, int) and isinstance(selected_month, int):
+        suffix = f"_{selected_year}-{str(selected_month).zfill(2)}"
+    return f"catalog_{class_division}{suffix}.xlsx"
+
+
+def bulk_in_flight(workers: int) -> int:
+    """
+    Renders one bulk export keeps in the pool at a time:
+    CATALOG_BULK_IN_FLIGHT, default half the workers, so interactive
+    reports still find free slots while an export runs.
+    """
+    try:
+        limit = int(os.environ.get("CATALOG_BULK_IN_FLIGHT", ""))
+    except ValueError:
+        limit = workers // 2
+    return max(1, limit)
+
+
+def _discard(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class _ChunkSink:
+    """
+    Write-only file object for zipfile. It has no tell()/seek(), so zipfile
+    switches to streaming mode (data descriptors) and everything written can
+    be handed to the client straight away.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_bulk_catalog_zip(
+    inputs_list: List[Dict[str, Any]],
+    assets_dir: Optional[Path] = None,
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Renders every class-division in the process pool and yields the ZIP
+    archive in chunks, adding each .xlsx as soon as its render finishes.
+    Classes that could not be rendered are listed in errors.txt. Only
+    bulk_in_flight() renders are submitted at a time, the next one as each
+    finishes, so the first chunk does not wait for the whole school.
+
+    In deterministic mode (deterministic_output_fn) the reports go in in
+    class order, each once the ones before it are in, with fixed entry
+    dates, so the same inputs give the same archive.
+    """
+    errors = [f"{i['class_division']}: {i['error']}" for i in inputs_list if not i.get("ok")]
+    executor = get_render_executor()
+    limit = bulk_in_flight(executor.workers)
+    todo = iter([i for i in inputs_list if i.get("ok")])
+    pending: Dict[Future, str] = {}  # submitted, in class order
+
+    def fill() -> None:
+        while len(pending) < limit:
+            inputs = next(todo, None)
+            if inputs is None:
+                return
+            # Waits for a free slot rather than failing; a render that is
+            # cancelled while running deletes its file when it finishes
+            fut = executor.submit(render_catalog_file, inputs, assets_dir, True, block=True, on_discard=_discard)
+            pending[fut] = inputs["class_division"]
+
+    when = output_timestamp(inputs_list)
+    sink = _ChunkSink()
+    try:
+        # .xlsx is already deflated, storing avoids compressing it twice
+        if when is None:
+            zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+        else:
+            zf = FixedTimeZipFile(sink, "w", zipfile.ZIP_STORED, date_time=when)
+        with zf:
+            fill()
+            while pending:
+                if when is None:
+                    done = wait(pending, return_when=FIRST_COMPLETED).done
+                    fut = next(f for f in pending if f in done)
+                else:
+                    fut = next(iter(pending))
+                class_division = pending[fut]
+                try:
+                    path = fut.result()
+                except Exception as e:
+                    del pending[fut]
+                    errors.append(f"{class_division}: {e}")
+                    fill()
+                    continue
+                del pending[fut]
+                try:
+                    zf.write(path, report_filename(class_division, selected_month, selected_year))
+                finally:
+                    os.unlink(path)
+                fill()
+                yield sink.drain()
+            if errors:
+                zf.writestr("errors.txt", "\n".join(errors) + "\n")
+        yield sink.drain()
+    finally:
+        # Client went away or something failed: drop renders nobody will read
+        for fut in pending:
+            if not fut.cancel() and not fut.exception():
+                _discard(fut.result())
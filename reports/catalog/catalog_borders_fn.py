@@ -0,0 +1,104 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from openpyxl.styles import Border, Side
+
+THIN, MEDIUM = 'thin', 'medium'
+
+# (left, right, top, bottom) side styles of one cell
+BorderKey = Tuple[str, str, str, str]
+
+# Column spans ruled with a thin grid: B..J and M..AS
+GRID_SPANS = ((2, 10), (13, 45))
+
+# Medium boxes on the two header rows as (row, first_col, last_col)
+HEADER_BOXES = (
+    (1, 2, 10),     # B1:J1
+    (1, 13, 45),    # M1:AS1
+    (1, 37, 37),    # AK1
+    (1, 44, 44),    # AR1
+    (1, 45, 45),    # AS1
+    (2, 2, 10),     # B2:J2
+    (2, 13, 43),    # M2:AQ2
+    (2, 44, 44),    # AR2
+    (2, 45, 45),    # AS2
+)
+
+# Medium boxes drawn around every page block and the footer as (first_col, last_col)
+BAND_BOXES = (
+    (2, 10),        # roster
+    (13, 45),       # days
+    (44, 44),       # AR
+    (45, 45),       # AS
+)
+
+_borders: Dict[BorderKey, Border] = {}
+
+
+def catalog_border(key: BorderKey) -> Border:
+    """Shared Border object for a (left, right, top, bottom) key."""
+    border = _borders.get(key)
+    if border is None:
+        left, right, top, bottom = (Side(border_style=s) for s in key)
+        border = _borders[key] = Border(left=left, right=right, top=top, bottom=bottom)
+    return border
+
+
+def _compose(boxes, top: bool, bottom: bool, separator: bool) -> List[Tuple[int, BorderKey]]:
+    # boxes: (first_col, last_col) boxes crossing this row; top/bottom say
+    # whether the row is the first/last row of those boxes
+    lefts = {c0 for c0, _c1 in boxes}
+    rights = {c1 for _c0, c1 in boxes}
+    out = []
+    for first, last in GRID_SPANS:
+        for c in range(first, last + 1):
+            boxed = any(c0 <= c <= c1 for c0, c1 in boxes)
+            out.append((c, (
+                MEDIUM if c in lefts else THIN,
+                MEDIUM if c in rights else THIN,
+                MEDIUM if top and boxed else THIN,
+                MEDIUM if (bottom and boxed) or separator else THIN,
+            )))
+    return out
+
+
+class CatalogBorderLayout:
+    """
+    Final border of every grid cell on the Catalog sheet, worked out from
+    the declarative description above instead of by repeatedly overwriting
+    cells. Rows inside a band share one profile, so a sheet has only a
+    handful of distinct rows to compute.
+    """
+
+    def __init__(self, student_count: int, page_boundaries: List[int], last_girl_row: Optional[int] = None):
+        border_end_row = 2 + student_count + 4
+        self.footer_start_row = border_end_row + 1
+        self.last_row = self.footer_start_row + 2
+        self.last_girl_row = last_girl_row
+
+        # Page blocks from row 3, then the three footer rows as their own band
+        self._band_of_row: Dict[int, Tuple[int, int]] = {}
+        start_row = 3
+        for end_row in page_boundaries:
+            self._band_of_row[start_row] = (start_row, end_row)
+            start_row = end_row + 1
+        self._band_of_row[self.footer_start_row] = (self.footer_start_row, self.last_row)
+        self._profiles: Dict[Tuple, List[Tuple[int, BorderKey]]] = {}
+
+    def _profile(self, key, boxes, top: bool, bottom: bool, separator: bool):
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = self._profiles[key] = _compose(boxes, top, bottom, separator)
+        return profile
+
+    def iter_rows(self):
+        """Yields (row, [(col, border_key), ...]) for rows 1..last_row in order."""
+        for r in (1, 2):
+            boxes = [(c0, c1) for row, c0, c1 in HEADER_BOXES if row == r]
+            yield r, self._profile(('header', r), boxes, True, True, False)
+
+        band = None
+        for r in range(3, self.last_row + 1):
+            band = self._band_of_row.get(r, band)
+            top, bottom = r == band[0], r == band[1]
+            separator = r == self.last_girl_row
+            yield r, self._profile((top, bottom, separator), BAND_BOXES, top, bottom, separator)
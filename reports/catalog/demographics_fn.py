@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Optional, Dict, Any, Iterable
+
+# Front Page rows of the category table, B12:B18 and K12:K17
+CONCESSION_ROWS = ("मोफत शिक्षण", "बी.सी. एकदा नापास", "प्रा. शिक्षक पाल्य", "मा. शिक्षक पाल्य",
+                   "माजी सैनिक", "आजी सैनिक", "दार")
+CATEGORY_ROWS = ("SC", "ST", "NT", "SBC", "OBC", "OPEN")
+GIRL = 'मुलगी'
+
+# categoryEn spellings seen in the data, by Front Page row
+_CATEGORY_ALIASES = {
+    "GENERAL": "OPEN", "GEN": "OPEN", "OPEN": "OPEN",
+    "SC": "SC", "ST": "ST", "SBC": "SBC", "OBC": "OBC",
+    "VJ": "NT", "DT": "NT", "VJNT": "NT", "NT": "NT",
+}
+
+
+def category_row(category_en: Any) -> Optional[str]:
+    """Front Page row of a categoryEn value (NT-B, VJ-A, ... all count as NT)."""
+    key = str(category_en or "").strip().upper()
+    if not key:
+        return None
+    return _CATEGORY_ALIASES.get(key) or _CATEGORY_ALIASES.get(key.replace(" ", "-").split("-")[0])
+
+
+def _empty_counts() -> Dict[str, Any]:
+    return {
+        "boys": 0,
+        "girls": 0,
+        "categories": {k: [0, 0] for k in CATEGORY_ROWS},
+        "concessions": {k: [0, 0] for k in CONCESSION_ROWS},
+    }
+
+
+def demographic_counts(students: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Boys/girls on roll, by category (categoryEn) and by concession, in one
+    pass over the roster. Pairs are [boys, girls]. Plain dicts and lists, so
+    the counts can be stored in Firestore as they are.
+    """
+    counts = _empty_counts()
+    categories, concessions = counts["categories"], counts["concessions"]
+    for st in students:
+        g = 1 if st.get('gender') == GIRL else 0
+        counts["girls" if g else "boys"] += 1
+        cat = category_row(st.get('categoryEn'))
+        if cat is not None:
+            categories[cat][g] += 1
+        pair = concessions.get(str(st.get('concession') or '').strip())
+        if pair is not None:
+            pair[g] += 1
+    return counts
+
+
+def merge_demographics(many: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum of several demographic_counts results, e.g. every class of the school."""
+    total = _empty_counts()
+    for counts in many:
+        total["boys"] += counts.get("boys", 0)
+        total["girls"] += counts.get("girls", 0)
+        for section in ("categories", "concessions"):
+            for k, (b, g) in (counts.get(section) or {}).items():
+                if k in total[section]:
+                    total[section][k][0] += b
+                    total[section][k][1] += g
+    return total
+
+
+def front_page_count_cells(counts: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Front Page cells filled from the counts: concessions on the last day
+    (I/J, rows 12-18, their totals on 19 and 20), categories by boys/girls/
+    total (L/M/N, rows 12-17, totals on 18) and पटावर (L19). The first-day,
+    admitted and left columns need more than one roster and stay blank.
+    """
+    cells: Dict[str, int] = {}
+    boys = girls = 0
+    for r, label in enumerate(CONCESSION_ROWS, start=12):
+        b, g = counts["concessions"][label]
+        cells[f"I{r}"], cells[f"J{r}"] = b, g
+        boys, girls = boys + b, girls + g
+    cells["I19"], cells["J19"], cells["I20"] = boys, girls, boys + girls
+
+    boys = girls = 0
+    for r, cat in enumerate(CATEGORY_ROWS, start=12):
+        b, g = counts["categories"][cat]
+        cells[f"L{r}"], cells[f"M{r}"], cells[f"N{r}"] = b, g, b + g
+        boys, girls = boys + b, girls + g
+    cells["L18"], cells["M18"], cells["N18"] = boys, girls, boys + girls
+    cells["L19"] = counts["boys"] + counts["girls"]
+    return cells
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import datetime
+import copy
+import os
+import shutil
+import time
+import zlib
+from typing import Optional, Dict, Any, Iterable, Tuple
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from openpyxl import Workbook
+from openpyxl.writer.excel import ExcelWriter
+
+from .report_data_fn import attendance_month
+
+ZIP_EPOCH = datetime.datetime(1980, 1, 1)  # earliest time a ZIP entry can carry
+
+
+def deterministic_enabled(deterministic: Optional[bool] = None) -> bool:
+    """
+    deterministic=None follows CATALOG_DETERMINISTIC (default off). When on,
+    the same report inputs always give the same file, byte for byte.
+    """
+    if deterministic is None:
+        return os.environ.get("CATALOG_DETERMINISTIC", "0").strip() == "1"
+    return deterministic
+
+
+def report_timestamp(inputs: Dict[str, Any]) -> datetime.datetime:
+    """
+    The time a deterministic report carries in its properties and ZIP
+    entries: SOURCE_DATE_EPOCH when set (the reproducible-builds
+    convention), otherwise midnight on the first of the month the report
+    prints: the selected month, or for a live report the current one (the
+    month its ETag already includes).
+    """
+    epoch = os.environ.get("SOURCE_DATE_EPOCH", "").strip()
+    if epoch:
+        try:
+            when = datetime.datetime.fromtimestamp(int(epoch), tz=datetime.timezone.utc).replace(tzinfo=None)
+            return max(when, ZIP_EPOCH)
+        except (ValueError, OverflowError, OSError):
+            pass
+    rd = inputs.get("report_data") or {}
+    year, month = attendance_month(rd.get("selected_month"), rd.get("selected_year"))
+    return max(datetime.datetime(year, month, 1), ZIP_EPOCH)
+
+
+def output_timestamp(inputs_list: Iterable[Dict[str, Any]], deterministic: Optional[bool] = None
+                     ) -> Optional[datetime.datetime]:
+    """report_timestamp of the first printable inputs in deterministic mode, else None (use the clock)."""
+    if not deterministic_enabled(deterministic):
+        return None
+    for inputs in inputs_list:
+        if inputs.get("ok", True) and inputs.get("report_data"):
+            return report_timestamp(inputs)
+    return ZIP_EPOCH
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+
+
+def stamp_properties(wb: Workbook, when: Optional[datetime.datetime]) -> None:
+    """Created/modified of the workbook: when, or (when None) modified now, as openpyxl's save does."""
+    if when is None:
+        wb.properties.modified = _now()
+    else:
+        wb.properties.created = wb.properties.modified = when
+
+
+class FixedTimeZipFile(ZipFile):
+    """
+    ZipFile whose entries all carry the same date and attributes, whatever
+    the clock, the source file's mtime or the platform, so equal content
+    in equal order gives an equal archive.
+    """
+
+    def __init__(self, file, mode: str = "w", compression: int = ZIP_DEFLATED,
+                 date_time: datetime.datetime = ZIP_EPOCH, **kwargs: Any):
+        super().__init__(file, mode, compression, **kwargs)
+        self.fixed_date_time = max(date_time, ZIP_EPOCH).timetuple()[:6]
+
+    def _fixed_info(self, name: str, compress_type: Optional[int]) -> ZipInfo:
+        info = ZipInfo(name, self.fixed_date_time)
+        info.compress_type = self.compression if compress_type is None else compress_type
+        info.create_system = 3
+        info.external_attr = 0o600 << 16
+        return info
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        if not isinstance(zinfo_or_arcname, ZipInfo):
+            zinfo_or_arcname = self._fixed_info(zinfo_or_arcname, compress_type)
+        super().writestr(zinfo_or_arcname, data, compress_type, compresslevel)
+
+    def write(self, filename, arcname=None, compress_type=None, compresslevel=None):
+        info = self._fixed_info(str(arcname if arcname is not None else filename).lstrip("/"), compress_type)
+        info.file_size = os.path.getsize(filename)  # lets open() pick ZIP64 up front
+        with open(filename, "rb") as src, self.open(info, "w") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def open_package(f, when: Optional[datetime.datetime], compression: int = ZIP_DEFLATED) -> ZipFile:
+    """ZipFile for writing a package; with when, a FixedTimeZipFile dated when."""
+    if when is None:
+        return ZipFile(f, "w", compression, allowZip64=True)
+    return FixedTimeZipFile(f, "w", compression, date_time=when, allowZip64=True)
+
+
+def precompressed_entry(name: str, data: bytes, compress_type: int = ZIP_DEFLATED) -> Tuple[ZipInfo, bytes]:
+    """
+    ZipInfo (CRC and sizes filled in) and data compressed as ZipFile.writestr
+    would, for an entry written many times with write_precompressed.
+    """
+    info = ZipInfo(name)
+    info.compress_type = compress_type
+    info.external_attr = 0o600 << 16
+    info.file_size, info.CRC = len(data), zlib.crc32(data)
+    if compress_type == ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        data = compressor.compress(data) + compressor.flush()
+    info.compress_size = len(data)
+    return info, data
+
+
+def write_precompressed(z: ZipFile, entry: Tuple[ZipInfo, bytes]) -> None:
+    """
+    Adds a precompressed_entry to z as is, dated as z.writestr would date it:
+    the same bytes as writestr of the original data, without compressing.
+    """
+    template, data = entry
+    info = copy.copy(template)
+    if isinstance(z, FixedTimeZipFile):
+        info.date_time, info.create_system = z.fixed_date_time, 3
+    else:
+        info.date_time = time.localtime(time.time())[:6]
+    # What ZipFile._open_to_write and _ZipWriteFile.close do, with the CRC
+    # and sizes known up front (no data descriptor, no seeking back)
+    with z._lock:
+        if z._writing:
+            raise ValueError("Can't write to the ZIP file while another write handle is open")
+        if z._seekable:
+            z.fp.seek(z.start_dir)
+        info.header_offset = z.fp.tell()
+        z._writecheck(info)
+        z._didModify = True
+        z.fp.write(info.FileHeader())
+        z.fp.write(data)
+        z.filelist.append(info)
+        z.NameToInfo[info.filename] = info
+        z.start_dir = z.fp.tell()
+
+
+def save_workbook(wb: Workbook, f, when: Optional[datetime.datetime], writer_class=ExcelWriter) -> None:
+    """wb.save(f); with when, the properties and every ZIP entry are dated when."""
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    stamp_properties(wb, when)
+    writer_class(wb, open_package(f, when)).save()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Tuple
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.cell_range import CellRange
+
+from .attendance_fn import student_day_cells, footer_day_cells
+from .catalog_borders_fn import BorderKey, CatalogBorderLayout, catalog_border
+from .excel_generator_fn import (
+    ROSTER_HEADERS, DAY_HEADERS, EXTRA_HEADERS, FOOTER_LABELS,
+    ROW_HEIGHT_PT, HEADER_ROW_HEIGHT_PT,
+    find_last_girl_row, student_row_values, page_boundaries_for,
+    set_catalog_page_setup, set_catalog_column_widths,
+)
+
+_FONTS = {
+    'header': Font(name='Kokila', size=14, bold=True),
+    'body': Font(name='Kokila', size=14, bold=False),
+    'small_header': Font(name='Kokila', size=10, bold=True),
+    'F2': Font(name='Kokila', size=9, bold=True),
+    'AR2': Font(name='Kokila', size=8, bold=True),
+    'AS2': Font(name='Kokila', size=12, bold=True),
+    'day': Font(name='Kokila', size=10, bold=False),
+}
+_ALIGNMENTS = {
+    'center': Alignment(horizontal='center', vertical='center', wrap_text=True),
+    'left': Alignment(horizontal='left', vertical='center'),
+    'mid_center': Alignment(horizontal='center', vertical='center'),
+}
+
+
+class _StyleCache:
+    """
+    One StyleArray per (font, alignment, border) combination, registered in
+    the workbook on first use. Write-only cells are serialised as soon as
+    they are appended, so they can all share these arrays.
+    """
+
+    def __init__(self, wb):
+        self._wb = wb
+        self._arrays: Dict[Tuple, StyleArray] = {}
+
+    def get(self, font: Optional[str], alignment: Optional[str], border: Optional[BorderKey]) -> StyleArray:
+        key = (font, alignment, border)
+        arr = self._arrays.get(key)
+        if arr is None:
+            wb = self._wb
+            arr = StyleArray()
+            if font:
+                arr.fontId = wb._fonts.add(_FONTS[font])
+            if alignment:
+                arr.alignmentId = wb._alignments.add(_ALIGNMENTS[alignment])
+            if border:
+                arr.borderId = wb._borders.add(catalog_border(border))
+            self._arrays[key] = arr
+        return arr
+
+
+def stream_catalog_sheet_fn(
+    ws,
+    class_no: str | int,
+    division: str,
+    students: List[Dict[str, Any]],
+    last_girl_row_hint: Optional[int] = None,
+    attendance: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Writes the Catalog sheet into a write-only worksheet row by row. The
+    result looks the same as generate_catalog_excel_fn, but only one row is
+    held in memory at a time, however long the roster is. attendance (an
+    attendance_fn summary) fills the day columns, AR and the footer counts.
+    """
+    last_girl_row = last_girl_row_hint
+    if last_girl_row is None:
+        last_girl_row = find_last_girl_row(students)
+
+    set_catalog_page_setup(ws)
+    set_catalog_column_widths(ws)
+    for rng in ('B1:J1', 'M1:AJ1', 'AK1:AQ1', 'AR1:AS1'):
+        ws.merged_cells.add(CellRange(rng))
+
+    styles = _StyleCache(ws.parent)
+    last_student_row = 2 + len(students)
+    border_end_row = last_student_row + 4
+    layout = CatalogBorderLayout(len(students), page_boundaries_for(border_end_row), last_girl_row)
+    footer_start_row = layout.footer_start_row
+
+    def cell(value, font=None, alignment=None, border=None):
+        c = WriteOnlyCell(ws, value)
+        c._style = styles.get(font, alignment, border)
+        return c
+
+    shared: Dict[Tuple, WriteOnlyCell] = {}
+
+    def shared_cell(value, font=None, alignment=None, border=None):
+        # Each cell is serialised as soon as its row is appended, so the
+        # cells that repeat (blank grid, day marks, counts) can be reused
+        key = (value, font, alignment, border)
+        c = shared.get(key)
+        if c is None:
+            c = shared[key] = cell(value, font, alignment, border)
+        return c
+
+    def emit(r: int, cells: Dict[int, Any], height: Optional[float] = None):
+        if height is not None:
+            ws.row_dimensions[r].height = height
+        row = [None] * (max(cells) if cells else 0)
+        for c, v in cells.items():
+            row[c - 1] = v
+        ws.append(row)
+        if height is not None:
+            del ws.row_dimensions[r]  # keep memory flat on long rosters
+
+    # Header texts; every other grid cell only carries its border
+    header_values: Dict[Tuple[int, int], Tuple[str, str]] = {(1, 37): ('एकूण दिवस', 'header')}
+    for i, text in enumerate(ROSTER_HEADERS):
+        header_values[(2, 2 + i)] = (text, 'F2' if 2 + i == 6 else 'header')
+    for i, text in enumerate(DAY_HEADERS + EXTRA_HEADERS):
+        header_values[(2, 13 + i)] = (text, {44: 'AR2', 45: 'AS2'}.get(13 + i, 'small_header'))
+
+    # Day columns M..AQ then AR, worked out for the whole sheet up front
+    day_rows: List[List[Any]] = []
+    footer_days: List[List[Any]] = []
+    if attendance is not None:
+        day_rows = [days + [total] for days, total in
+                    zip(student_day_cells(attendance), attendance["student_present"].tolist())]
+        footer_days = footer_day_cells(attendance)
+
+    for r, profile in layout.iter_rows():
+        values: Dict[int, Any] = {}
+        days: Dict[int, Any] = {}
+        if 3 <= r <= last_student_row:
+            values = dict(enumerate(student_row_values(students[r - 3]), start=2))
+            if day_rows:
+                days = dict(enumerate(day_rows[r - 3], start=13))
+        elif r >= footer_start_row:
+            values = {9: FOOTER_LABELS[r - footer_start_row]}
+            if footer_days:
+                days = dict(enumerate(footer_days[r - footer_start_row], start=13))
+
+        cells = {}
+        for c, border in profile:
+            if r <= 2:
+                text, font = header_values.get((r, c), (None, None))
+                cells[c] = cell(text, font, 'center' if font else None, border)
+            elif days.get(c) is not None:
+                cells[c] = shared_cell(days[c], 'day', 'mid_center', border)
+            elif c not in values:
+                cells[c] = shared_cell(None, border=border)
+            elif r <= last_student_row:
+                cells[c] = cell(values[c], 'body', 'center' if c in {2, 8} else 'left', border)
+            else:
+                cells[c] = cell(values[c], 'header', 'mid_center', border)
+        emit(r, cells, HEADER_ROW_HEIGHT_PT if r == 1 else None if r == 2 else ROW_HEIGHT_PT)
+
+    # Row 18 keeps its own fixed height when the sheet is shorter than that
+    if layout.last_row < 18:
+        for r in range(layout.last_row + 1, 19):
+            emit(r, {}, 22.68 if r == 18 else None)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import threading
+from typing import Any, Optional
+
+# firebase_admin's Firestore modules pull in gRPC and the Cloud client stack;
+# they are imported when the first client is made, so render pool children
+# and benchmarks that never talk to Firestore don't pay for them. The app is
+# initialized in main.py.
+
+_db: Optional[Any] = None
+_async_db: Optional[Any] = None
+_lock = threading.Lock()
+
+
+def get_db():
+    """Process-wide sync Firestore client, created on first use and reused."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                from firebase_admin import firestore
+
+                _db = firestore.client()
+    return _db
+
+
+def get_async_db():
+    """
+    Process-wide AsyncClient. Its gRPC channel binds to the event loop it is
+    first used on, i.e. the server worker's loop; don't share it across loops.
+    """
+    global _async_db
+    if _async_db is None:
+        with _lock:
+            if _async_db is None:
+                from firebase_admin import firestore_async
+
+                _async_db = firestore_async.client()
+    return _async_db
+
+
+def clients_configured() -> bool:
+    """True once set_clients has put clients in place (no Firebase app needed then)."""
+    return _db is not None and _async_db is not None
+
+
+def set_clients(db: Optional[Any] = None, async_db: Optional[Any] = None) -> None:
+    """Swap in other clients (emulator, in-memory stand-in for benchmarks)."""
+    global _db, _async_db
+    with _lock:
+        _db = db
+        _async_db = async_db
@@ -4,11 +4,14 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import get_column_letter, coordinate_to_tuple
 from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.cell import Cell
 from openpyxl.drawing.image import Image
-from PIL import Image as PILImage
+
+from .assets_fn import get_report_assets
+from .demographics_fn import front_page_count_cells
+from .sheet_template_fn import get_sheet_template_fn
 
 
 def to_marathi_numerals(number: int) -> str:
@@ -18,41 +21,41 @@ def to_marathi_numerals(number: int) -> str:
     return str(number).translate(translation_table)
 
 
-def add_front_page_fn(
-    wb: Workbook,
-    report_data: Dict[str, Any],
-    assets_dir: Path | None = None,
-) -> Workbook:
-    # Helpers
-    def apply_thin_grid(ws, cell_range_str: str):
-        thin_side = Side(border_style="thin")
-        thin_border = Border(top=thin_side, left=thin_side, right=thin_side, bottom=thin_side)
-        target = ws[cell_range_str]
-        if isinstance(target, Cell):
-            target.border = thin_border
-        else:
-            for row in target:
-                for cell in row:
-                    cell.border = thin_border
-
-    def apply_medium_box_border(ws, cell_range_str: str):
-        medium_side = Side(border_style="medium")
-        target = ws[cell_range_str]
-        if isinstance(target, Cell):
-            target.border = Border(top=medium_side, left=medium_side, right=medium_side, bottom=medium_side)
-            return
-        rows = list(target)
-        for cell in rows[0]:
-            existing = cell.border.copy(); existing.top = medium_side; cell.border = existing
-        for cell in rows[-1]:
-            existing = cell.border.copy(); existing.bottom = medium_side; cell.border = existing
-        for row in rows:
-            cell = row[0]; existing = cell.border.copy(); existing.left = medium_side; cell.border = existing
-        for row in rows:
-            cell = row[-1]; existing = cell.border.copy(); existing.right = medium_side; cell.border = existing
-
-    ws = wb.create_sheet("Front Page", 0)
+def _apply_thin_grid(ws, cell_range_str: str):
+    thin_side = Side(border_style="thin")
+    thin_border = Border(top=thin_side, left=thin_side, right=thin_side, bottom=thin_side)
+    target = ws[cell_range_str]
+    if isinstance(target, Cell):
+        target.border = thin_border
+    else:
+        for row in target:
+            for cell in row:
+                cell.border = thin_border
+
+
+def _apply_medium_box_border(ws, cell_range_str: str):
+    medium_side = Side(border_style="medium")
+    target = ws[cell_range_str]
+    if isinstance(target, Cell):
+        target.border = Border(top=medium_side, left=medium_side, right=medium_side, bottom=medium_side)
+        return
+    rows = list(target)
+    for cell in rows[0]:
+        existing = cell.border.copy(); existing.top = medium_side; cell.border = existing
+    for cell in rows[-1]:
+        existing = cell.border.copy(); existing.bottom = medium_side; cell.border = existing
+    for row in rows:
+        cell = row[0]; existing = cell.border.copy(); existing.left = medium_side; cell.border = existing
+    for row in rows:
+        cell = row[-1]; existing = cell.border.copy(); existing.right = medium_side; cell.border = existing
+
 
+def _kokila_available(assets_dir: Path | None) -> bool:
+    return get_report_assets(assets_dir).font_name == "Kokila"
+
+
+def _build_front_page_static(ws, font_name: str, assets_dir: Path | None) -> None:
+    """Everything on the Front Page that does not depend on the request."""
     # Page setup and dimensions
     ws.page_setup.paperSize = ws.PAPERSIZE_LEGAL
     ws.page_margins.left = 0.0
@@ -95,23 +98,19 @@ def add_front_page_fn(
     ws.row_dimensions[36].height = 25.23
     ws.row_dimensions[37].height = 19.28
 
-    if assets_dir:
-        logo_path = assets_dir / "School_logo.png"
-        if logo_path.exists():
-            try:
-                with PILImage.open(logo_path) as pil_img:
-                    original_width, original_height = pil_img.size
-                img = Image(str(logo_path))
-                target_height = 135
-                aspect_ratio = original_width / max(1, original_height)
-                img.height = target_height
-                img.width = int(target_height * aspect_ratio)
-                ws.add_image(img, 'D2')
-            except Exception:
-                pass
-
-    kokila_available = assets_dir and (assets_dir / "Kokila.ttf").exists()
-    font_name = "Kokila" if kokila_available else "Calibri"
+    assets = get_report_assets(assets_dir)  # logo checked and measured once per process
+    if assets.logo_path:
+        try:
+            original_width, original_height = assets.logo_size
+            img = Image(str(assets.logo_path))
+            target_height = 135
+            aspect_ratio = original_width / max(1, original_height)
+            img.height = target_height
+            img.width = int(target_height * aspect_ratio)
+            ws.add_image(img, 'D2')
+        except Exception:
+            pass
+
     header_font_r2 = Font(name=font_name, size=16, bold=True)
     header_font_r3 = Font(name=font_name, size=22, bold=True)
     header_font_r4 = Font(name=font_name, size=12, bold=True)
@@ -140,15 +139,14 @@ def add_front_page_fn(
 
     header_ranges_to_border = ['B9:B11', 'C9:N9', 'C10:D10', 'E10:F10', 'G10:H10', 'I10:J10', 'K10:N10', 'C11:D11', 'E11:F11', 'G11:H11', 'I11:J11', 'K11', 'L11:N11']
     for r in header_ranges_to_border:
-        apply_thin_grid(ws, r)
-        apply_medium_box_border(ws, r)
+        _apply_thin_grid(ws, r)
+        _apply_medium_box_border(ws, r)
 
     table_header_font = Font(name=font_name, size=14, bold=True)
     table_subheader_font = Font(name=font_name, size=14, bold=False)
     table_label_font = Font(name=font_name, size=12)
     table_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
     table_left = Alignment(horizontal='left', vertical='center')
-    table_right = Alignment(horizontal='right', vertical='center')
 
     c = ws['B9']; c.value = "विद्यार्थ्यांची वर्गवारी"; c.font = table_header_font; c.alignment = table_center
     c = ws['C9']; c.value = "विद्यार्थी संख्या"; c.font = table_header_font; c.alignment = table_center
@@ -161,7 +159,7 @@ def add_front_page_fn(
     for i, text in enumerate(["अनु. जाती ( SC )", "अनु. जमाती (ST )", "भ. वि. जा. (NT)", "विशेष मागास (SBC)", "इतर मागास (OBC)", "खुला (OPEN)", "एकूण :-", "पटावर :-", "सरासरी हजेरी :-"], start=12):
         c = ws[f'K{i}']; c.value = text; c.font = table_label_font; c.alignment = table_left
 
-    apply_thin_grid(ws, 'B12:N20')
+    _apply_thin_grid(ws, 'B12:N20')
     ws.merge_cells('L19:N19')
     ws.merge_cells('C20:D20')
     ws.merge_cells('E20:F20')
@@ -169,16 +167,16 @@ def add_front_page_fn(
     ws.merge_cells('I20:J20')
     ws.merge_cells('L20:N20')
     for r in ['B12:B18', 'B19', 'B20', 'C12:D18', 'C19:D19', 'C20:D20', 'E12:F18', 'E19:F19', 'E20:F20', 'G12:H18', 'G19:H19', 'G20:H20', 'I12:J18', 'I19:J19', 'I20:J20', 'K12:K18', 'K19', 'K20', 'L12:N18', 'L19:N19', 'L20:N20']:
-        apply_medium_box_border(ws, r)
+        _apply_medium_box_border(ws, r)
 
-    apply_thin_grid(ws, 'B22:N31')
+    _apply_thin_grid(ws, 'B22:N31')
     ws.merge_cells('B22:N22')
     for i in range(23, 32):
         ws.merge_cells(f'C{i}:I{i}')
     for i in range(23, 32):
         ws.merge_cells(f'J{i}:N{i}')
     for r in ['B22:N22', 'B23:N23', 'B23:B31', 'C23:I31', 'J23:N31']:
-        apply_medium_box_border(ws, r)
+        _apply_medium_box_border(ws, r)
 
     curriculum_header_font = Font(name=font_name, size=14, bold=True)
     c = ws['B22']; c.value = "कमी केलेल्या व प्रवेश दिलेल्या विद्यार्थ्यांची नावे"; c.font = curriculum_header_font; c.alignment = table_center
@@ -196,10 +194,22 @@ def add_front_page_fn(
     c = ws['B34']; c.value = "हजेरीपत्रक तपासले असून त्यातील नोंदी आमचे माहितीनुसार बरोबर आहेत"; c.font = signature_font; c.alignment = table_left
     c = ws['L35']; c.value = "वर्गशिक्षक"; c.font = signature_font; c.alignment = table_center
 
+
+def front_page_values(report_data: Dict[str, Any], font_name: str) -> Dict[str, tuple]:
+    """
+    The per-request cells as coord -> (value, font, alignment): B7, K7, L7,
+    B8, L37, the category table counts and L20 when known.
+    """
+    table_left = Alignment(horizontal='left', vertical='center')
+    table_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    table_right = Alignment(horizontal='right', vertical='center')
+    signature_font = Font(name=font_name, size=14)
+    values: Dict[str, tuple] = {}
+
     # Dynamic data
     teacher_name = report_data.get('teacher_name', 'N/A')
-    c = ws['B8']; c.value = f"वर्गशिक्षक :- {teacher_name}"; c.font = Font(name=font_name, size=14, bold=True); c.alignment = table_left
-    c = ws['L37']; c.value = teacher_name; c.font = signature_font; c.alignment = table_center
+    values['B8'] = (f"वर्गशिक्षक :- {teacher_name}", Font(name=font_name, size=14, bold=True), table_left)
+    values['L37'] = (teacher_name, signature_font, table_center)
 
     # Decide month/year: historical override if provided, else current
     marathi_months = ["जानेवारी", "फेब्रुवारी", "मार्च", "एप्रिल", "मे", "जून", "जुलै", "ऑगस्ट", "सप्टेंबर", "ऑक्टोबर", "नोव्हेंबर", "डिसेंबर"]
@@ -216,15 +226,66 @@ def add_front_page_fn(
     marathi_year = to_marathi_numerals(year)
 
     info_font = Font(name=font_name, size=18, bold=True)
-    c = ws['B7']; c.value = f"महिना: {month_name} {marathi_year}"; c.font = info_font; c.alignment = table_left
+    values['B7'] = (f"महिना: {month_name} {marathi_year}", info_font, table_left)
     class_name = report_data.get('class_name_mr', '')
-    c = ws['K7']; c.value = f"इयत्ता: {class_name}"; c.font = info_font; c.alignment = table_right
+    values['K7'] = (f"इयत्ता: {class_name}", info_font, table_right)
 
     # Division label
     marathi_division_map = {'A': 'अ', 'B': 'ब', 'C': 'क', 'D': 'ड', 'E': 'ई', 'F': 'फ'}
     raw_value = report_data.get('division_name_mr') or report_data.get('division', '')
     cleaned_value = str(raw_value).strip().upper()
     final_division_name = marathi_division_map.get(cleaned_value, str(raw_value).strip())
-    c = ws['L7']; c.value = f"तुकडी: {final_division_name}"; c.font = info_font; c.alignment = table_center
+    values['L7'] = (f"तुकडी: {final_division_name}", info_font, table_center)
+
+    # Category table, counted from the roster when the inputs were assembled
+    demographics = report_data.get('demographics')
+    if demographics:
+        count_font = Font(name=font_name, size=12)
+        for coord, n in front_page_count_cells(demographics).items():
+            values[coord] = (to_marathi_numerals(n), count_font, table_center)
+
+    # सरासरी हजेरी, when the report was filled from attendance
+    average = report_data.get('average_attendance')
+    if average is not None:
+        values['L20'] = (to_marathi_numerals(f"{average:.2f}"), Font(name=font_name, size=12), table_center)
+    return values
+
+
+def _fill_front_page_values(ws, report_data: Dict[str, Any], font_name: str) -> None:
+    for coord, (value, font, alignment) in front_page_values(report_data, font_name).items():
+        c = ws[coord]; c.value = value; c.font = font; c.alignment = alignment
+
+
+def front_page_template(font_name: str, assets_dir: Path | None):
+    """The Front Page's static layout, built once per process and copied in."""
+    logo_path = get_report_assets(assets_dir).logo_path
+    key = ("front_page", font_name, str(logo_path) if logo_path else None)
+    return get_sheet_template_fn(key, lambda ws: _build_front_page_static(ws, font_name, assets_dir))
+
+
+def add_front_page_fn(
+    wb: Workbook,
+    report_data: Dict[str, Any],
+    assets_dir: Path | None = None,
+    use_template: bool = True,
+) -> Workbook:
+    font_name = "Kokila" if _kokila_available(assets_dir) else "Calibri"
 
+    if use_template:
+        ws = front_page_template(font_name, assets_dir).stamp(wb, "Front Page", 0)
+    else:
+        ws = wb.create_sheet("Front Page", 0)
+        _build_front_page_static(ws, font_name, assets_dir)
+
+    _fill_front_page_values(ws, report_data, font_name)
     return wb
+
+
+def stream_front_page_fn(ws, report_data: Dict[str, Any], assets_dir: Path | None = None) -> None:
+    """Writes the Front Page into an empty write-only worksheet."""
+    font_name = "Kokila" if _kokila_available(assets_dir) else "Calibri"
+    values = {
+        coordinate_to_tuple(coord): v
+        for coord, v in front_page_values(report_data, font_name).items()
+    }
+    front_page_template(font_name, assets_dir).stream_into(ws, values)
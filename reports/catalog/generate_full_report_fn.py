@@ -1,30 +1,221 @@
 from __future__ import annotations
+import asyncio
+import functools
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
 from io import BytesIO
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, IO, Iterator, List, Tuple, Union
 from openpyxl import Workbook
 
 from .excel_generator_fn import generate_catalog_excel_fn
-from .front_page_fn import add_front_page_fn
-from .back_page_fn import add_back_page_fn
+from .excel_stream_fn import stream_catalog_sheet_fn
+from .front_page_fn import add_front_page_fn, stream_front_page_fn
+from .back_page_fn import add_back_page_fn, stream_back_page_fn
+from .report_data_fn import (
+    load_report_inputs_fn, load_historical_sources_fn, historical_inputs_from_sources,
+    load_report_inputs_async_fn, load_historical_sources_async_fn,
+    doc_version, is_historical,
+)
+from .report_cache_fn import get_report_cache, report_cache_key
+from .incremental_render_fn import incremental_enabled, patch_catalog_bytes_fn, remember_catalog_bytes_fn
+from .package_template_fn import package_template_enabled, write_report_package
+from .deterministic_output_fn import deterministic_enabled, output_timestamp, save_workbook
+from .firestore_clients_fn import get_db, get_async_db
+from .roster_replica_fn import replica_async_db, replica_db
+from .render_executor_fn import RenderQueueFull, get_render_executor
+from .report_metrics_fn import (
+    REPORTS_COALESCED, add_stages, finish_report_metrics, stage_timer, timed_stage,
+)
+from .single_flight_fn import SingleFlight
 
-from firebase_admin import firestore  # initialized in main.py
+STREAM_CHUNK_SIZE = 64 * 1024
 
+# Identical async report requests in flight at the same time share one render
+report_flights = SingleFlight()
 
-def _coerce_timestamp_to_datetime(v: Any):
+
+def _streaming_min_rows() -> int:
+    try:
+        return int(os.environ.get("CATALOG_STREAMING_MIN_ROWS", "200"))
+    except ValueError:
+        return 200
+
+
+def use_streaming(inputs: Dict[str, Any], streaming: Optional[bool] = None) -> bool:
+    """streaming=None picks write-only mode for rosters of CATALOG_STREAMING_MIN_ROWS or more."""
+    if streaming is None:
+        return len(inputs["students"]) >= _streaming_min_rows()
+    return streaming
+
+
+def stream_report_sheets(wb: Workbook, inputs: Dict[str, Any], assets_dir: Optional[Path] = None,
+                         title_prefix: str = "") -> None:
+    """Appends the Front Page, Catalog and Back Page of one report to a write-only workbook."""
+    # Write-only sheets are created in final tab order and filled top to bottom;
+    # rows are serialised as they are appended and the workbook saves only once.
+    class_no = inputs["class_no"]
+    division = inputs["division"]
+    front = wb.create_sheet(f"{title_prefix}Front Page")
+    catalog = wb.create_sheet(f"{title_prefix}Catalog")
+    back = wb.create_sheet(f"{title_prefix}Back Page")
+    for ws in (front, catalog, back):
+        ws.sheet_view.view = "pageLayout"
+    with timed_stage("front_page"):
+        stream_front_page_fn(front, inputs["report_data"], assets_dir=assets_dir)
+    with timed_stage("catalog_sheet"):
+        stream_catalog_sheet_fn(catalog, class_no, division, inputs["students"], attendance=inputs.get("attendance"))
+    with timed_stage("back_page"):
+        stream_back_page_fn(back, class_no=str(class_no), division=division.upper(),
+                            subjects=inputs["subjects"], catalog_doc=inputs["catalog_doc"])
+
+
+def _render_streaming_workbook(inputs: Dict[str, Any], assets_dir: Optional[Path] = None) -> Workbook:
+    wb = Workbook(write_only=True)
+    stream_report_sheets(wb, inputs, assets_dir)
+    return wb
+
+
+def render_catalog_workbook(
+    inputs: Dict[str, Any],
+    assets_dir: Optional[Path] = None,
+    streaming: Optional[bool] = False,
+) -> Workbook:
     """
-    Firestore Admin returns a Timestamp for 'dob' in studentsData.
-    Convert to Python datetime if possible; otherwise return as-is.
+    Builds the Catalog / Front Page / Back Page workbook from the plain-data
+    bundle produced by report_data_fn. No Firestore access happens here.
+
+    With streaming the workbook is write-only: it looks the same but can be
+    saved exactly once and its sheets cannot be read back.
     """
+    if use_streaming(inputs, streaming):
+        return _render_streaming_workbook(inputs, assets_dir)
+
+    class_no = inputs["class_no"]
+    division = inputs["division"]
+    with timed_stage("catalog_sheet"):
+        wb: Workbook = generate_catalog_excel_fn(class_no, division, inputs["students"],
+                                                 attendance=inputs.get("attendance"))
+        wb.active.title = "Catalog"
+    with timed_stage("front_page"):
+        wb = add_front_page_fn(wb, inputs["report_data"], assets_dir=assets_dir)
+    with timed_stage("back_page"):
+        wb = add_back_page_fn(wb, class_no=str(class_no), division=division.upper(),
+                              subjects=inputs["subjects"], catalog_doc=inputs["catalog_doc"])
+
+    # Show all worksheets in page layout view
+    for ws in wb.worksheets:
+        ws.sheet_view.view = "pageLayout"
+    return wb
+
+
+def write_catalog_report(
+    inputs: Dict[str, Any],
+    f: IO[bytes],
+    assets_dir: Optional[Path] = None,
+    streaming: Optional[bool] = None,
+    deterministic: Optional[bool] = None,
+) -> None:
+    """
+    Renders one report and writes the .xlsx into the binary file f. Unless
+    streaming is False (or CATALOG_PACKAGE_TEMPLATE=0), only the Catalog
+    sheet and the per-request cells are serialised; everything else comes
+    precompiled from package_template_fn.
+
+    In deterministic mode (deterministic_output_fn; off unless
+    CATALOG_DETERMINISTIC=1) the file is dated by the month it prints, not
+    the clock, so the same inputs always give the same bytes.
+    """
+    when = output_timestamp([inputs], deterministic)
+    if streaming is not False and package_template_enabled():
+        write_report_package(inputs, f, assets_dir, when)
+        return
+    wb = render_catalog_workbook(inputs, assets_dir=assets_dir, streaming=streaming)
+    with timed_stage("save"):
+        save_workbook(wb, f, when)
+
+
+def render_catalog_bytes(
+    inputs: Dict[str, Any],
+    assets_dir: Optional[Path] = None,
+    streaming: Optional[bool] = None,
+) -> bytes:
+    """Renders and serialises one report; safe to run in a worker process."""
+    buf = BytesIO()
+    write_catalog_report(inputs, buf, assets_dir, streaming)
+    return buf.getvalue()
+
+
+def render_catalog_file(
+    inputs: Dict[str, Any],
+    assets_dir: Optional[Path] = None,
+    streaming: Optional[bool] = None,
+) -> str:
+    """
+    Renders one report into a new temp file and returns its path; the caller
+    deletes it. Used by the render pool so finished workbooks go back to the
+    server through the filesystem instead of being pickled.
+    """
+    fd, path = tempfile.mkstemp(prefix="catalog-", suffix=".xlsx")
     try:
-        # Firestore Timestamp has .to_datetime()
-        if hasattr(v, "to_datetime"):
-            return v.to_datetime()
-        return v
-    except Exception:
-        return v
+        with os.fdopen(fd, "wb") as f:
+            write_catalog_report(inputs, f, assets_dir, streaming)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def render_catalog_file_timed(
+    inputs: Dict[str, Any],
+    assets_dir: Optional[Path] = None,
+    streaming: Optional[bool] = None,
+) -> Tuple[str, List[Tuple[str, float]]]:
+    """render_catalog_file plus its stage timings, for callers in another process."""
+    with stage_timer() as timer:
+        path = render_catalog_file(inputs, assets_dir, streaming)
+    return path, timer.stages
+
+
+async def render_file_in_pool(fn, *args: Any) -> str:
+    """
+    Runs fn(*args) -> (path, stages) in the render pool and returns the path,
+    merging the child's stage timings into the current request's.
+    """
+    submitted = time.perf_counter()
+    path, stages = await asyncio.wrap_future(get_render_executor().submit(fn, *args))
+    # Whatever the child did not spend rendering was queueing and hand-off
+    add_stages([("render_queue", max(0.0, time.perf_counter() - submitted - sum(s for _, s in stages)))] + stages)
+    return path
+
+
+def _timed_report(fn):
+    # Times the stages of one report: Server-Timing in out["server_timing"],
+    # histograms and read counters in report_metrics_fn
+    def finish(timer, out, kwargs):
+        historical = is_historical(kwargs.get("selected_month"), kwargs.get("selected_year"))
+        return finish_report_metrics(timer, out, "historical" if historical else "live")
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(*args, **kwargs):
+            with stage_timer() as timer:
+                out = await fn(*args, **kwargs)
+            return finish(timer, out, kwargs)
+        return run_async
 
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with stage_timer() as timer:
+            out = fn(*args, **kwargs)
+        return finish(timer, out, kwargs)
+    return run
 
+
+@_timed_report
 def generate_catalog_report(
     class_no: str | int,
     division: str,
@@ -34,6 +225,13 @@ def generate_catalog_report(
     assets_dir: Optional[Path] = None,
     selected_month: Optional[int] = None,   # 1..12
     selected_year: Optional[int] = None,    # e.g., 2025
+    streaming: Optional[bool] = None,       # None = auto by roster size
+    use_cache: bool = True,                 # historical mode only
+    incremental: bool = True,               # live mode only
+    return_stream: bool = False,
+    if_none_match: Optional[str] = None,    # request's If-None-Match header
+    with_attendance: bool = False,          # fill day grid and totals from attendance/
+    max_staleness: Optional[float] = None,  # seconds of replica lag accepted; 0 = Firestore only
 ) -> Dict[str, Any]:
     """
     Generates the catalog workbook.
@@ -43,112 +241,435 @@ def generate_catalog_report(
           roster_records/{classNo}-{DIV}_{YYYY}-{MM}
         and use studentsData array as the roster in that stored order.
 
+      Finished historical workbooks are cached (report_cache_fn), keyed on
+      the record ID and the update_time of the snapshot and catalog docs.
+
     Live mode:
       - Otherwise, read active students for the classDivision.
+      With incremental, the last workbook of the class is patched when only
+      some student rows changed (incremental_render_fn).
+
+    With return_stream, out["stream"] iterates the file in chunks and
+    out["size"] is its length; the workbook is not copied into a bytes
+    object unless a cache needs one. out["server_timing"] holds the
+    per-stage durations as a Server-Timing header value.
+
+    out["etag"] identifies the report version; it is derived from the
+    sources' update_times and the renderer version before anything is
+    rendered, and is weak unless output is deterministic. When
+    if_none_match already names it, nothing is rendered and
+    out["not_modified"] is True.
+
+    with_attendance fills the day columns, the हजर / गैरहजर / एकूण rows and
+    the Front Page's average attendance from the month's attendance doc
+    (attendance_fn); without one the grid stays blank.
+
+    With CATALOG_REPLICA_PATH set, catalog, roster_records and student
+    reads come from the local replica (roster_replica_fn) when it was
+    synced within max_staleness seconds, and from Firestore otherwise.
     """
     try:
-        db = firestore.client()
-        class_division_str = f"{class_no}-{division.upper()}"
-
-        # Catalog meta for front/back pages (class teacher, subjects)
-        doc = db.collection('catalog').document(class_division_str).get()
-        teacher_name = "N/A"; month = 1; year = 2025
-        subjects: List[Dict[str, Any]] = []; doc_data: Dict[str, Any] = {}
-        if doc.exists:
-            doc_data = doc.to_dict() or {}
-            teacher_name = doc_data.get('classTeacher', 'N/A')
-            month = doc_data.get('month', 1)
-            year = doc_data.get('year', 2025)
-            subjects = doc_data.get('subjects', []) or []
-
-        # Marathi mappings for Front Page labeling
-        class_map_mr = {
-            "1": "१ ली", "2": "२ री", "3": "३ री", "4": "४ थी", "5": "५ वी",
-            "6": "६ वी", "7": "७ वी", "8": "८ वी", "9": "९ वी", "10": "१० वी"
-        }
-        class_name_mr = class_map_mr.get(str(class_no), str(class_no))
-        division_map_mr = {"A": "अ", "B": "ब", "C": "क", "D": "ड"}
-        division_name_mr = division_map_mr.get(division.upper(), division.upper())
-
-        report_data = {
-            "teacher_name": teacher_name,
-            "month": month,
-            "year": year,
-            "class_name_mr": class_name_mr,
-            "division_name_mr": division_name_mr,
-            "division": division.upper(),
-            "selected_month": selected_month,
-            "selected_year": selected_year,
-        }
-
-        students: List[Dict[str, Any]] = []
-
-        if isinstance(selected_month, int) and 1 <= selected_month <= 12 and isinstance(selected_year, int) and selected_year > 0:
-            # Historical mode: read frozen snapshot
-            mm = str(selected_month).zfill(2)
-            record_id = f"{class_division_str}_{selected_year}-{mm}"
-            rec_doc = db.collection('roster_records').document(record_id).get()
-            if not rec_doc.exists:
-                return {
-                    "ok": False,
-                    "error": f"No historical roster found: roster_records/{record_id}",
-                    "bytes": None,
-                    "path": None,
-                }
-            rec = rec_doc.to_dict() or {}
-            data_list = rec.get("studentsData", [])
-            if not isinstance(data_list, list) or not data_list:
-                return {
-                    "ok": False,
-                    "error": f"Historical roster for {record_id} has no studentsData.",
-                    "bytes": None,
-                    "path": None,
-                }
-
-            # Preserve array order and coerce timestamps
-            students = []
-            for item in data_list:
-                if not isinstance(item, dict):
-                    continue
-                s = dict(item)
-                if "dob" in s:
-                    s["dob"] = _coerce_timestamp_to_datetime(s["dob"])
-                students.append(s)
+        db = replica_db(get_db(), max_staleness)
+        cache_key = None
+        if is_historical(selected_month, selected_year):
+            # A frozen snapshot always renders the same workbook: serve it from
+            # the cache while neither source document has changed
+            sources = load_historical_sources_fn(db, f"{class_no}-{division.upper()}", selected_month, selected_year,
+                                                 with_attendance)
+            version_key, etag = _historical_version(sources, assets_dir)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+            if use_cache:
+                cache_key = version_key
+                with timed_stage("cache_read"):
+                    data = get_report_cache().get(cache_key)
+                if data is not None:
+                    return _with_etag(_report_output(data, save_path, return_bytes, return_stream), etag)
+            inputs = historical_inputs_from_sources(class_no, division, sources, selected_month, selected_year)
         else:
-            # Live mode: query active students for this classDivision
-            students_ref = db.collection('catalog/global/students')
-            query = students_ref.where('status', '==', 'active').where('classDivision', '==', class_division_str)
-            docs = list(query.stream())
-            # Sort by rollNo if present
-            docs.sort(key=lambda x: (x.to_dict().get('rollNo', 10_000_000)))
-            students = [d.to_dict() for d in docs]
-
-        if not students:
-            return {"ok": False, "error": f"No students to print for {class_division_str}.", "bytes": None, "path": None}
-
-        # Build workbook
-        wb: Workbook = generate_catalog_excel_fn(class_no, division, students)
-        wb.active.title = "Catalog"
-        wb = add_front_page_fn(wb, report_data, assets_dir=assets_dir)
-        wb = add_back_page_fn(wb, class_no=str(class_no), division=division.upper(), subjects=subjects, catalog_doc=doc_data)
-
-        # Show all worksheets in page layout view
-        for ws in wb.worksheets:
-            ws.sheet_view.view = "pageLayout"
-
-        # Output
-        out: Dict[str, Any] = {"ok": True, "bytes": None, "path": None, "error": None}
-        if save_path:
-            save_path = str(save_path)
-            Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-            wb.save(save_path)
-            out["path"] = save_path
-        if return_bytes:
-            buf = BytesIO()
-            wb.save(buf)
-            out["bytes"] = buf.getvalue()
-            buf.close()
-        return out
+            inputs = load_report_inputs_fn(db, class_no, division, selected_month, selected_year, with_attendance)
+            etag = _live_etag(inputs, assets_dir)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+        out = _render_report(inputs, cache_key, save_path, return_bytes, assets_dir, streaming,
+                             incremental and not is_historical(selected_month, selected_year), return_stream)
+        return _with_etag(out, etag)
+
+    except Exception as e:
+        return {"ok": False, "error": str(e), "bytes": None, "path": None}
+
+
+@_timed_report
+async def generate_catalog_report_async(
+    class_no: str | int,
+    division: str,
+    *,
+    save_path: Optional[Path | str] = None,
+    return_bytes: bool = True,
+    assets_dir: Optional[Path] = None,
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    use_cache: bool = True,
+    incremental: bool = True,
+    return_stream: bool = False,
+    if_none_match: Optional[str] = None,
+    with_attendance: bool = False,
+    max_staleness: Optional[float] = None,
+    coalesce: bool = True,
+) -> Dict[str, Any]:
+    """
+    generate_catalog_report for async endpoints: Firestore reads go through
+    the shared AsyncClient and run concurrently, rendering runs in the
+    render process pool (render_executor_fn) so the event loop stays free
+    and renders use every core. Raises RenderQueueFull when the pool's
+    queue is full.
+
+    With coalesce, identical requests (same class, month, options and
+    If-None-Match) arriving while one is in flight wait for it and get the
+    same workbook instead of reading and rendering it again; their
+    Server-Timing shows the wait as "coalesced".
+    """
+    if not coalesce:
+        return await _generate_catalog_async(
+            class_no, division, save_path, return_bytes, assets_dir, selected_month, selected_year,
+            streaming, use_cache, incremental, return_stream, if_none_match, with_attendance, max_staleness,
+        )
+    key = (
+        "catalog", str(class_no), division.upper(), selected_month, selected_year, with_attendance,
+        streaming, use_cache, incremental, str(assets_dir) if assets_dir else None, if_none_match, max_staleness,
+    )
+    started = time.perf_counter()
+    # The shared run hands over bytes only when a cache or the incremental
+    # state holds them anyway; otherwise the rendered file, read by each caller
+    out, joined = await report_flights.do(key, lambda: _generate_catalog_async(
+        class_no, division, None, False, assets_dir, selected_month, selected_year,
+        streaming, use_cache, incremental, False, if_none_match, with_attendance, max_staleness,
+        share=True,
+    ))
+    if joined:
+        add_stages([("coalesced", time.perf_counter() - started)])
+        REPORTS_COALESCED.inc()
+    return _shared_output(out, save_path, return_bytes, return_stream)
+
 
+def _shared_output(
+    out: Dict[str, Any],
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    return_stream: bool,
+) -> Dict[str, Any]:
+    # One caller's view of a result shared through report_flights
+    shared = out.get("file")
+    if not out.get("ok") or (out.get("bytes") is None and shared is None):
+        return {k: v for k, v in out.items() if k != "server_timing"}
+    extra = {k: v for k, v in out.items() if k not in ("ok", "error", "bytes", "path", "file", "server_timing")}
+    if shared is None:
+        return {**_report_output(out["bytes"], save_path, return_bytes, return_stream), **extra}
+    data = shared.reader()
+    if return_bytes:
+        with data:
+            data = data.read()
+    return {**_report_output(data, save_path, return_bytes, return_stream), **extra}
+
+
+async def _generate_catalog_async(
+    class_no: str | int,
+    division: str,
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    assets_dir: Optional[Path],
+    selected_month: Optional[int],
+    selected_year: Optional[int],
+    streaming: Optional[bool],
+    use_cache: bool,
+    incremental: bool,
+    return_stream: bool,
+    if_none_match: Optional[str],
+    with_attendance: bool,
+    max_staleness: Optional[float],
+    share: bool = False,
+) -> Dict[str, Any]:
+    # share: a result for several callers, see _render_report_async
+    try:
+        adb = await replica_async_db(get_async_db(), max_staleness)
+        cache_key = None
+        if is_historical(selected_month, selected_year):
+            sources = await load_historical_sources_async_fn(
+                adb, f"{class_no}-{division.upper()}", selected_month, selected_year, with_attendance,
+            )
+            version_key, etag = _historical_version(sources, assets_dir)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+            if use_cache:
+                cache_key = version_key
+                with timed_stage("cache_read"):
+                    data = get_report_cache().get(cache_key)
+                if data is not None:
+                    return _with_etag(_report_output(data, save_path, return_bytes or share, return_stream), etag)
+            inputs = historical_inputs_from_sources(class_no, division, sources, selected_month, selected_year)
+        else:
+            inputs = await load_report_inputs_async_fn(
+                adb, class_no, division, selected_month, selected_year, with_attendance,
+            )
+            etag = _live_etag(inputs, assets_dir)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+        out = await _render_report_async(
+            inputs, cache_key, save_path, return_bytes, assets_dir, streaming,
+            incremental and not is_historical(selected_month, selected_year), return_stream, share,
+        )
+        return _with_etag(out, etag)
+
+    except RenderQueueFull:
+        raise
     except Exception as e:
         return {"ok": False, "error": str(e), "bytes": None, "path": None}
+
+
+def _historical_cache_key(sources: Dict[str, Any], assets_dir: Optional[Path]) -> str:
+    # Reports with attendance are a separate version, even when the month has none
+    versions = [doc_version(sources["catalog"]), doc_version(sources["roster"])]
+    if "attendance" in sources:
+        versions += ["attendance", doc_version(sources["attendance"])]
+    return report_cache_key(sources["record_id"], *versions, assets_dir=assets_dir)
+
+
+def report_etag(version_key: str, deterministic: Optional[bool] = None) -> str:
+    """
+    Strong only in deterministic mode: otherwise the same version renders to
+    different bytes (zip and docProps times), so the ETag is weak.
+    """
+    tag = f'"{version_key[:32]}"'
+    return tag if deterministic_enabled(deterministic) else f"W/{tag}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match against our ETag, with the weak comparison RFC 9110 asks for."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _historical_version(sources: Dict[str, Any], assets_dir: Optional[Path]) -> Tuple[str, Optional[str]]:
+    # (cache key, ETag); no ETag for a snapshot that does not exist
+    version_key = _historical_cache_key(sources, assets_dir)
+    roster = sources["roster"]
+    return version_key, report_etag(version_key) if roster is not None and roster.exists else None
+
+
+def _live_etag(inputs: Dict[str, Any], assets_dir: Optional[Path]) -> Optional[str]:
+    if not inputs.get("ok"):
+        return None
+    # Live Front Pages print the current month, so a new month is a new version
+    today = date.today()
+    versions = [inputs["source_version"], today.year, today.month]
+    if "attendance_version" in inputs:
+        versions += ["attendance", inputs["attendance_version"]]
+    return report_etag(report_cache_key("live", inputs["class_division"], *versions, assets_dir=assets_dir))
+
+
+def _not_modified(etag: str) -> Dict[str, Any]:
+    return {"ok": True, "error": None, "bytes": None, "path": None, "not_modified": True, "etag": etag}
+
+
+def _with_etag(out: Dict[str, Any], etag: Optional[str]) -> Dict[str, Any]:
+    if etag and out.get("ok"):
+        out["etag"] = etag
+    return out
+
+
+def _render_report(
+    inputs: Dict[str, Any],
+    cache_key: Optional[str],
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    assets_dir: Optional[Path],
+    streaming: Optional[bool],
+    incremental: bool = False,
+    return_stream: bool = False,
+) -> Dict[str, Any]:
+    if not inputs.get("ok"):
+        return {"ok": False, "error": inputs.get("error"), "bytes": None, "path": None}
+
+    # Patching only rewrites the roster columns; attendance changes the whole grid
+    incremental = incremental and incremental_enabled() and inputs.get("attendance") is None
+    data = None
+    if incremental:
+        with timed_stage("patch"):
+            data = patch_catalog_bytes_fn(inputs, assets_dir)
+    if data is None:
+        # Write-only workbooks can be saved once, so serialise once
+        if not (cache_key or incremental or return_bytes):
+            # Nothing keeps the bytes: save straight into a spooled file
+            spool = tempfile.SpooledTemporaryFile(max_size=_spool_max_bytes())
+            write_catalog_report(inputs, spool, assets_dir, streaming)
+            return _report_output(spool, save_path, False, return_stream)
+        buf = BytesIO()
+        write_catalog_report(inputs, buf, assets_dir, streaming)
+        data = buf.getvalue()
+        buf.close()
+        if incremental:
+            remember_catalog_bytes_fn(inputs, assets_dir, data)
+    if cache_key:
+        get_report_cache().put(cache_key, data)
+    return _report_output(data, save_path, return_bytes, return_stream)
+
+
+async def _render_report_async(
+    inputs: Dict[str, Any],
+    cache_key: Optional[str],
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    assets_dir: Optional[Path],
+    streaming: Optional[bool],
+    incremental: bool = False,
+    return_stream: bool = False,
+    share: bool = False,
+) -> Dict[str, Any]:
+    # _render_report with the full render in the process pool. With share,
+    # the result goes to several callers: out["bytes"] when a cache or the
+    # incremental state keeps them anyway, else out["file"] (SharedReportFile)
+    if not inputs.get("ok"):
+        return {"ok": False, "error": inputs.get("error"), "bytes": None, "path": None}
+
+    # Patching only rewrites the roster columns; attendance changes the whole grid
+    incremental = incremental and incremental_enabled() and inputs.get("attendance") is None
+    data = None
+    if incremental:
+        with timed_stage("patch"):
+            data = await asyncio.to_thread(patch_catalog_bytes_fn, inputs, assets_dir)
+    if data is None:
+        path = await render_file_in_pool(render_catalog_file_timed, inputs, assets_dir, streaming)
+        f = open(path, "rb")
+        os.unlink(path)  # the open handle keeps the file readable
+        if not (cache_key or incremental or return_bytes):
+            if share:
+                return {"ok": True, "error": None, "bytes": None, "path": None, "file": SharedReportFile(f)}
+            return await asyncio.to_thread(_report_output, f, save_path, False, return_stream)
+        with f:
+            data = await asyncio.to_thread(f.read)
+        if incremental:
+            await asyncio.to_thread(remember_catalog_bytes_fn, inputs, assets_dir, data)
+    if cache_key:
+        await asyncio.to_thread(get_report_cache().put, cache_key, data)
+    return await asyncio.to_thread(_report_output, data, save_path, return_bytes or share, return_stream)
+
+
+def _spool_max_bytes() -> int:
+    try:
+        return int(os.environ.get("CATALOG_SPOOL_MAX_MB", "8")) * 1024 * 1024
+    except ValueError:
+        return 8 * 1024 * 1024
+
+
+class SharedReportFile:
+    """
+    A finished report in an unlinked temp file that several coalesced
+    callers read at the same time. Each reader() has its own offset
+    (os.pread), so nobody copies the workbook into memory; the file is
+    closed once the last reader and the shared result are gone.
+    """
+
+    def __init__(self, f: IO[bytes]):
+        self._f = f
+        self.size = os.fstat(f.fileno()).st_size
+
+    def reader(self) -> "_SharedFileReader":
+        return _SharedFileReader(self)
+
+    def pread(self, n: int, offset: int) -> bytes:
+        return os.pread(self._f.fileno(), n, offset)
+
+    def __del__(self):
+        self._f.close()
+
+
+class _SharedFileReader:
+    # The read/seek/tell/close of a binary file that _report_output and
+    # iter_report_chunks use; close() leaves the shared file open
+    def __init__(self, shared: SharedReportFile):
+        self._shared: Optional[SharedReportFile] = shared
+        self._pos = 0
+
+    def read(self, n: int = -1) -> bytes:
+        size = self._shared.size
+        n = size - self._pos if n is None or n < 0 else min(n, size - self._pos)
+        data = self._shared.pread(n, self._pos) if n > 0 else b""
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self._shared.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        self._shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_report_chunks(source: Union[bytes, IO[bytes]], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Chunks of a finished report: zero-copy memoryview slices of a bytes
+    object, or reads from a file object, which is closed once exhausted
+    (or when the consumer goes away).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield view[i:i + chunk_size]
+        return
+    try:
+        source.seek(0)
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        source.close()
+
+
+def _report_output(
+    data: Union[bytes, IO[bytes]],
+    save_path: Optional[Path | str],
+    return_bytes: bool,
+    return_stream: bool = False,
+) -> Dict[str, Any]:
+    # data is the finished .xlsx, as bytes or as a file positioned at its end
+    out: Dict[str, Any] = {"ok": True, "bytes": None, "path": None, "error": None}
+    is_file = not isinstance(data, (bytes, bytearray))
+    if save_path:
+        save_path = str(save_path)
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        if is_file:
+            data.seek(0)
+            with open(save_path, "wb") as f:
+                shutil.copyfileobj(data, f)
+        else:
+            Path(save_path).write_bytes(data)
+        out["path"] = save_path
+    if return_bytes and not is_file:
+        out["bytes"] = data
+    if return_stream:
+        if is_file:
+            data.seek(0, os.SEEK_END)
+            out["size"] = data.tell()
+        else:
+            out["size"] = len(data)
+        out["stream"] = iter_report_chunks(data)
+    elif is_file:
+        data.close()
+    return out
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Dict, Any, List, NamedTuple
+
+from et_xmlfile import xmlfile
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+from openpyxl.cell._writer import write_cell
+from openpyxl.utils import get_column_letter
+from openpyxl.xml.constants import REL_NS, SHEET_MAIN_NS
+from xml.etree import ElementTree
+
+from .excel_generator_fn import find_last_girl_row, student_row_values
+from .report_cache_fn import render_fingerprint
+
+_CELL_STYLE_RE = re.compile(rb'<c r="[A-J]\d+" s="(\d+)"')
+
+
+class _RenderState(NamedTuple):
+    meta: str               # fingerprint of everything except the student rows
+    rows: List[bytes]       # fingerprint per student row
+    sheet_part: str         # zip member holding the Catalog sheet
+    data: bytes             # last .xlsx served
+
+
+_states: "OrderedDict[str, _RenderState]" = OrderedDict()
+_states_lock = threading.Lock()
+_stats = {"full": 0, "patched": 0, "unchanged": 0}
+_scratch_ws = Workbook().active  # only used to serialise loose cells
+
+
+def _max_states() -> int:
+    try:
+        return max(0, int(os.environ.get("CATALOG_INCREMENTAL_MAX_CLASSES", "64")))
+    except ValueError:
+        return 64
+
+
+def incremental_enabled() -> bool:
+    return _max_states() > 0
+
+
+def _meta_fingerprint(inputs: Dict[str, Any], assets_dir: Optional[Path]) -> str:
+    # Front/Back Page inputs, the grid shape and the renderer version. Live
+    # Front Pages print the current month, so a new month rebuilds too.
+    today = date.today()
+    students = inputs["students"]
+    meta = [
+        inputs["class_division"], inputs["report_data"], inputs["subjects"], inputs["catalog_doc"],
+        today.year, today.month, len(students), find_last_girl_row(students),
+        render_fingerprint(str(assets_dir) if assets_dir else None),
+    ]
+    return hashlib.sha256(json.dumps(meta, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _row_fingerprint(values: List[Any]) -> bytes:
+    return hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+
+
+def _catalog_sheet_part(zin: zipfile.ZipFile) -> str:
+    wb = ElementTree.fromstring(zin.read("xl/workbook.xml"))
+    rid = next(el.get(f"{{{REL_NS}}}id") for el in wb.iter(f"{{{SHEET_MAIN_NS}}}sheet") if el.get("name") == "Catalog")
+    rels = ElementTree.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    target = next(el.get("Target") for el in rels if el.get("Id") == rid)
+    return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+
+def _row_cells_xml(r: int, values: List[Any], styles: List[bytes]) -> bytes:
+    # Same serialiser the workbook writer uses, with the row's existing style ids
+    buf = BytesIO()
+    with xmlfile(buf) as xf:
+        for col, value in enumerate(values, start=2):
+            write_cell(xf, _scratch_ws, Cell(_scratch_ws, row=r, column=col, value=value), False)
+    out = buf.getvalue()
+    for col, style_id in enumerate(styles, start=2):
+        ref = f'<c r="{get_column_letter(col)}{r}"'.encode()
+        out = out.replace(ref, ref + b' s="' + style_id + b'"', 1)
+    return out
+
+
+def _splice(data: bytes, sheet_part: str, changed: Dict[int, List[Any]]) -> bytes:
+    zin = zipfile.ZipFile(BytesIO(data))
+    xml = zin.read(sheet_part)
+    pieces: List[bytes] = []
+    pos = 0
+    for r in sorted(changed):
+        # Cells B..J of the row run up to the first day column, M
+        start = xml.find(f'<c r="B{r}"'.encode(), pos)
+        end = xml.find(f'<c r="M{r}"'.encode(), start)
+        if start < 0 or end < 0:
+            raise ValueError(f"row {r} not found in {sheet_part}")
+        styles = _CELL_STYLE_RE.findall(xml, start, end)
+        if len(styles) != 9:
+            raise ValueError(f"unexpected cells in row {r}")
+        pieces += [xml[pos:start], _row_cells_xml(r, changed[r], styles)]
+        pos = end
+    pieces.append(xml[pos:])
+
+    out = BytesIO()
+    with zipfile.ZipFile(out, "w") as zout:
+        for info in zin.infolist():
+            content = b"".join(pieces) if info.filename == sheet_part else zin.read(info)
+            zout.writestr(info, content)
+    return out.getvalue()
+
+
+def _count(name: str) -> None:
+    with _states_lock:
+        _stats[name] += 1
+
+
+def remember_catalog_bytes_fn(inputs: Dict[str, Any], assets_dir: Optional[Path], data: bytes) -> None:
+    """Keep a fully rendered live report as the base for later patches."""
+    max_states = _max_states()
+    rows = [_row_fingerprint(student_row_values(st)) for st in inputs["students"]]
+    try:
+        sheet_part = _catalog_sheet_part(zipfile.ZipFile(BytesIO(data)))
+    except (StopIteration, KeyError, ElementTree.ParseError, zipfile.BadZipFile):
+        return
+    state = _RenderState(_meta_fingerprint(inputs, assets_dir), rows, sheet_part, data)
+    with _states_lock:
+        _states[inputs["class_division"]] = state
+        _states.move_to_end(inputs["class_division"])
+        while len(_states) > max_states:
+            _states.popitem(last=False)
+        _stats["full"] += 1
+
+
+def patch_catalog_bytes_fn(inputs: Dict[str, Any], assets_dir: Optional[Path] = None) -> Optional[bytes]:
+    """
+    Returns the live report for inputs by patching the last one rendered for
+    the same class-division: only student rows whose printed values changed
+    are re-serialised. Returns None when a full rebuild is needed (nothing
+    remembered, row count or last-girl row moved, front/back page inputs or
+    month changed).
+    """
+    key = inputs["class_division"]
+    with _states_lock:
+        state = _states.get(key)
+    if state is None:
+        return None
+    meta = _meta_fingerprint(inputs, assets_dir)
+    if meta != state.meta:
+        return None
+
+    values = [student_row_values(st) for st in inputs["students"]]
+    rows = [_row_fingerprint(v) for v in values]
+    changed = {i + 3: values[i] for i, (old, new) in enumerate(zip(state.rows, rows)) if old != new}
+    if not changed:
+        _count("unchanged")
+        return state.data
+    try:
+        data = _splice(state.data, state.sheet_part, changed)
+    except (ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+    with _states_lock:
+        if _states.get(key) is state:
+            _states[key] = _RenderState(meta, rows, state.sheet_part, data)
+        _stats["patched"] += 1
+    return data
+
+
+def incremental_stats() -> Dict[str, int]:
+    with _states_lock:
+        return {**_stats, "classes": len(_states)}
@@ -0,0 +1,291 @@
+from __future__ import annotations
+import datetime
+import os
+import re
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+
+from et_xmlfile import xmlfile
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+from openpyxl.cell._writer import write_cell
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.xml.functions import tostring
+
+from .assets_fn import get_report_assets
+from .attendance_fn import attendance_grid, attendance_summary
+from .back_page_fn import active_subjects, back_page_template, back_page_values
+from .demographics_fn import demographic_counts
+from .deterministic_output_fn import open_package, precompressed_entry, stamp_properties, write_precompressed
+from .excel_stream_fn import stream_catalog_sheet_fn
+from .front_page_fn import front_page_template, front_page_values
+from .report_metrics_fn import timed_stage
+
+FRONT_PART, CATALOG_PART, BACK_PART = (f"xl/worksheets/sheet{i}.xml" for i in (1, 2, 3))
+CORE_PART, STYLES_PART = "docProps/core.xml", "xl/styles.xml"
+# Written per request; every other part is compressed once with the template
+_DYNAMIC_PARTS = {FRONT_PART, CATALOG_PART, BACK_PART, CORE_PART, STYLES_PART}
+
+# Style registries copied into every request's workbook so style ids match
+# the precompiled styles.xml and sheets
+_STYLE_LISTS = ("_fonts", "_fills", "_borders", "_alignments", "_protections", "_number_formats", "_cell_styles")
+
+# Per-request cells are written into the template as "{{B7}}" and cut out again
+_PLACEHOLDER = "{{%s}}"
+_PLACEHOLDER_RE = re.compile(rb'<c r="([A-Z]+[0-9]+)"(?: s="([0-9]+)")? t="inlineStr"><is><t>\{\{\1\}\}</t></is></c>')
+_scratch_ws = Workbook().active  # only used to serialise loose cells
+
+
+def package_template_enabled() -> bool:
+    return os.environ.get("CATALOG_PACKAGE_TEMPLATE", "1").strip() != "0"
+
+
+def _cell_xml(row: int, col: int, value: Any, style_id: Optional[bytes]) -> bytes:
+    # Same serialiser the workbook writer uses, with the template's style id
+    buf = BytesIO()
+    with xmlfile(buf) as xf:
+        write_cell(xf, _scratch_ws, Cell(_scratch_ws, row=row, column=col, value=value), False)
+    out = buf.getvalue()
+    if style_id:
+        end = out.index(b'"', 6) + 1  # after r="..."
+        out = out[:end] + b' s="' + style_id + b'"' + out[end:]
+    return out
+
+
+class _CompiledSheet:
+    """
+    Finished sheet XML cut around its per-request cells. blank_styles gives
+    the style a cell keeps when the request has no value for it.
+    """
+
+    def __init__(self, xml: bytes, blank_styles: Optional[Dict[str, Optional[bytes]]] = None):
+        self._chunks: List[bytes] = []
+        self._cells: List[Tuple[str, int, int, Optional[bytes], Optional[bytes]]] = []
+        pos = 0
+        for m in _PLACEHOLDER_RE.finditer(xml):
+            self._chunks.append(xml[pos:m.start()])
+            coord = m.group(1).decode()
+            blank = blank_styles.get(coord) if blank_styles is not None else m.group(2)
+            self._cells.append((coord, *coordinate_to_tuple(coord), m.group(2), blank))
+            pos = m.end()
+        self._chunks.append(xml[pos:])
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        out = [self._chunks[0]]
+        for (coord, row, col, style_id, blank_style), chunk in zip(self._cells, self._chunks[1:]):
+            if coord in values:
+                out += [_cell_xml(row, col, values[coord], style_id), chunk]
+            else:
+                out += [_cell_xml(row, col, None, blank_style), chunk]
+        return b"".join(out)
+
+
+def _placeholder_styles(xml: bytes) -> Dict[str, Optional[bytes]]:
+    return {m.group(1).decode(): m.group(2) for m in _PLACEHOLDER_RE.finditer(xml)}
+
+
+def _seed_inputs() -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+    # Report data with every optional Front Page value present, and a roster
+    # long enough for page breaks, the girls/boys separator and the footers
+    students = [{
+        'regNo': 1000 + i, 'concession': 'मोफत शिक्षण', 'caste': '-', 'categoryMr': '-', 'categoryEn': 'OPEN',
+        'dob': '01-01-2015', 'rollNo': i + 1, 'fullNameMr': '-', 'motherName': '-',
+        'gender': 'मुलगी' if i < 20 else 'मुलगा',
+    } for i in range(60)]
+    marks = {str(st['regNo']): "PA-" * 10 + "P" for st in students}
+    report_data = {
+        "teacher_name": "-", "class_name_mr": "-", "division_name_mr": "A", "division": "A",
+        "selected_month": 1, "selected_year": 2025, "average_attendance": 1.0,
+        "demographics": demographic_counts(students),
+    }
+    return report_data, students, attendance_summary(attendance_grid(students, marks), 2025, 1)
+
+
+class PackageTemplate:
+    """
+    The parts of a single-report .xlsx that do not depend on the request,
+    serialised once per process: content types, relationships, theme,
+    styles, the logo and its drawing, and the Front/Back Page sheets with
+    their per-request cells cut out. The unchanging parts are kept
+    compressed and copied into each package as is; a request only writes
+    the Catalog sheet, patches the cut-out cells and compresses those.
+
+    Every request workbook starts from the template's style registries, so
+    the style ids in the precompiled parts stay valid; if a roster needs a
+    style the template never saw, styles.xml is written for that request.
+    """
+
+    def __init__(self, font_name: str, assets_dir: Optional[Path]):
+        self.font_name = font_name
+        self.assets_dir = assets_dir
+        self._lock = threading.Lock()  # the style registries and styles.xml
+        self._backs_lock = threading.Lock()  # Back Pages compiled on first use
+
+        report_data, students, attendance = _seed_inputs()
+        seed = Workbook(write_only=True)
+        front, catalog, back = (seed.create_sheet(t) for t in ("Front Page", "Catalog", "Back Page"))
+        for ws in (front, catalog, back):
+            ws.sheet_view.view = "pageLayout"
+        front_values = front_page_values(report_data, font_name)
+        front_page_template(font_name, assets_dir).stream_into(front, {
+            coordinate_to_tuple(coord): (_PLACEHOLDER % coord, font, alignment)
+            for coord, (_value, font, alignment) in front_values.items()
+        })
+        stream_catalog_sheet_fn(catalog, 0, "A", students, attendance=attendance)
+        back.append([])
+
+        buf = BytesIO()
+        seed.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+        seed.save(buf)
+        with ZipFile(buf) as z:
+            parts = [(info.filename, z.read(info)) for info in z.infolist()]
+        self._names = [name for name, _data in parts]
+        self._static = {
+            # Images are compressed already
+            name: precompressed_entry(name, data, ZIP_STORED if name.startswith("xl/media/") else ZIP_DEFLATED)
+            for name, data in parts if name not in _DYNAMIC_PARTS
+        }
+        self._set_styles(seed, dict(parts)[STYLES_PART])
+        self._backs: Dict[int, _CompiledSheet] = {}
+
+        # The template's own styles, for cells a request leaves empty
+        blank_xml = self._compile_sheet("Front Page", lambda ws: front_page_template(font_name, assets_dir).stream_into(
+            ws, {coordinate_to_tuple(coord): (_PLACEHOLDER % coord, None, None) for coord in front_values}))
+        self._front = _CompiledSheet(dict(parts)[FRONT_PART], _placeholder_styles(blank_xml))
+
+    def _set_styles(self, wb: Workbook, styles_xml: bytes) -> None:
+        self._lists = {name: list(getattr(wb, name)) for name in _STYLE_LISTS}
+        self._styles = precompressed_entry(STYLES_PART, styles_xml)
+
+    def new_workbook(self) -> Tuple[Workbook, Tuple[Dict[str, list], Tuple[ZipInfo, bytes]]]:
+        """
+        Write-only workbook whose style registries match the template's,
+        plus the registries and compressed styles.xml it started from (for
+        _styles_for).
+        """
+        wb = Workbook(write_only=True)
+        with self._lock:
+            base = self._lists, self._styles
+        for name, items in base[0].items():
+            setattr(wb, name, IndexedList(items))
+        return wb, base
+
+    @staticmethod
+    def _styles_for(wb: Workbook, base: Tuple[Dict[str, list], Tuple[ZipInfo, bytes]]) -> Optional[bytes]:
+        # styles.xml for wb, or None when the one wb started from still fits.
+        # Registries only ever grow: same sizes as the registries wb started
+        # from means nothing new was added. Compared with that snapshot, not
+        # the template's current registries, which another thread may grow.
+        lists, _styles = base
+        if all(len(getattr(wb, name)) == len(items) for name, items in lists.items()):
+            return None
+        return tostring(write_stylesheet(wb))
+
+    def _compile_sheet(self, title: str, build) -> bytes:
+        # Sheet XML streamed with the template's style ids; styles it adds
+        # join the template's registries and styles.xml
+        with self._lock:
+            wb = Workbook(write_only=True)
+            for name, items in self._lists.items():
+                setattr(wb, name, IndexedList(items))
+            ws = wb.create_sheet(title)
+            ws.sheet_view.view = "pageLayout"
+            build(ws)
+            ws.close()
+            try:
+                with open(ws._writer.out, "rb") as f:
+                    xml = f.read()
+            finally:
+                ws._writer.cleanup()
+            if any(len(getattr(wb, name)) != len(items) for name, items in self._lists.items()):
+                self._set_styles(wb, tostring(write_stylesheet(wb)))
+        return xml
+
+    def _back_page(self, subject_count: int) -> _CompiledSheet:
+        compiled = self._backs.get(subject_count)
+        if compiled is not None:
+            return compiled
+        with self._backs_lock:
+            compiled = self._backs.get(subject_count)
+            if compiled is None:
+                keys = back_page_values([{}] * subject_count, None, None, None)
+                xml = self._compile_sheet("Back Page", lambda ws: back_page_template(subject_count).stream_into(ws, {
+                    (r, c): (_PLACEHOLDER % f"{get_column_letter(c)}{r}", None, None) for r, c in keys
+                }))
+                # Published only once its styles are in the registries
+                compiled = self._backs[subject_count] = _CompiledSheet(xml)
+        return compiled
+
+    def write(self, inputs: Dict[str, Any], f, when: Optional[datetime.datetime] = None) -> None:
+        """
+        Writes the report for inputs as an .xlsx into the binary file object
+        f. With when, the properties and ZIP entries are dated when instead
+        of now (deterministic_output_fn).
+        """
+        rows = active_subjects(inputs["subjects"])
+        back_sheet = self._back_page(len(rows))  # before new_workbook: it may add styles
+        wb, base = self.new_workbook()
+        catalog = wb.create_sheet("Catalog")
+        catalog.sheet_view.view = "pageLayout"
+
+        with timed_stage("front_page"):
+            values = front_page_values(inputs["report_data"], self.font_name)
+            front_xml = self._front.render({coord: v[0] for coord, v in values.items()})
+        with timed_stage("catalog_sheet"):
+            stream_catalog_sheet_fn(catalog, inputs["class_no"], inputs["division"], inputs["students"],
+                                    attendance=inputs.get("attendance"))
+            catalog.close()
+        try:
+            with timed_stage("back_page"):
+                values = back_page_values(rows, str(inputs["class_no"]), inputs["division"].upper(),
+                                           inputs["catalog_doc"])
+                back_xml = back_sheet.render({f"{get_column_letter(c)}{r}": v for (r, c), v in values.items()})
+            with timed_stage("save"):
+                stamp_properties(wb, when)
+                dynamic = {
+                    FRONT_PART: front_xml,
+                    BACK_PART: back_xml,
+                    CORE_PART: tostring(wb.properties.to_tree()),
+                }
+                styles_xml = self._styles_for(wb, base)
+                if styles_xml is not None:
+                    dynamic[STYLES_PART] = styles_xml
+                static = {**self._static, STYLES_PART: base[1]}
+                with open_package(f, when) as z:
+                    for name in self._names:
+                        if name == CATALOG_PART:
+                            z.write(catalog._writer.out, name)
+                        elif name in dynamic:
+                            z.writestr(name, dynamic[name])
+                        else:
+                            write_precompressed(z, static[name])
+        finally:
+            catalog._writer.cleanup()
+
+
+_templates: Dict[Tuple[str, Optional[str]], PackageTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_package_template(assets_dir: Optional[Path] = None) -> PackageTemplate:
+    """Process-wide template for the font and logo available in assets_dir."""
+    assets = get_report_assets(assets_dir)
+    key = (assets.font_name, str(assets.logo_path) if assets.logo_path else None)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = _templates[key] = PackageTemplate(assets.font_name, assets_dir)
+    return template
+
+
+def write_report_package(inputs: Dict[str, Any], f, assets_dir: Optional[Path] = None,
+                         when: Optional[datetime.datetime] = None) -> None:
+    """Report for inputs written through the precompiled package template."""
+    get_package_template(assets_dir).write(inputs, f, when)
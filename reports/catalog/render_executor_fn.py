@@ -0,0 +1,257 @@
+from __future__ import annotations
+import math
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class RenderQueueFull(Exception):
+    """Every worker is busy and the wait queue is full; retry after retry_after seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _start_method() -> str:
+    # forkserver: children fork from a clean server process that has the
+    # render modules imported already, instead of each importing them anew
+    method = os.environ.get("CATALOG_RENDER_START_METHOD", "").strip()
+    if method:
+        return method
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+# Imported once by the fork server (CATALOG_RENDER_PRELOAD adds more, comma-separated)
+RENDER_PRELOAD = ["reports.catalog.generate_full_report_fn"]
+
+
+def _noop() -> None:
+    return None
+
+
+def _run_timed(fn: Callable, args: tuple):
+    # Runs in the worker process; start/end times let the parent split
+    # queue wait from render time
+    started = time.time()
+    result = fn(*args)
+    return started, time.time(), result
+
+
+class RenderExecutor:
+    """
+    Process pool for CPU-bound rendering with a bounded number of jobs:
+    'workers' running plus 'queue_size' waiting. Past that, submit() fails
+    fast with RenderQueueFull instead of letting requests pile up. The pool
+    uses 'forkserver' (or 'spawn' where that is missing), so children are
+    clear of the parent's gRPC/Firebase state and only ever render plain
+    data.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._initializer: Optional[Callable] = None
+        self._initargs: tuple = ()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats: Dict[str, float] = {
+            "submitted": 0, "rejected": 0, "completed": 0, "failed": 0,
+            "wait_seconds_sum": 0.0, "wait_seconds_max": 0.0, "run_seconds_sum": 0.0,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                method = _start_method()
+                ctx = multiprocessing.get_context(method)
+                if method == "forkserver":
+                    extra = [m.strip() for m in os.environ.get("CATALOG_RENDER_PRELOAD", "").split(",") if m.strip()]
+                    ctx.set_forkserver_preload(RENDER_PRELOAD + extra)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+            return self._pool
+
+    def warm_up(self, initializer: Optional[Callable] = None, *initargs: Any) -> None:
+        """
+        Start every child now rather than on the first renders, each running
+        initializer(*initargs) once (pools rebuilt after a crash do too).
+        Blocks until all children are up.
+        """
+        with self._lock:
+            self._initializer, self._initargs = initializer, initargs
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        pool = self._get_pool()
+        # The pool starts a child per submit while none is idle
+        for f in [pool.submit(_noop) for _ in range(self.workers)]:
+            f.result()
+
+    def _drop_pool(self, pool: ProcessPoolExecutor) -> None:
+        # A crashed child (e.g. OOM-killed) breaks the whole pool; the next
+        # submit starts a fresh one
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up, from the mean render time."""
+        with self._lock:
+            done = self._stats["completed"]
+            mean_run = self._stats["run_seconds_sum"] / done if done else 1.0
+            in_flight = self._in_flight
+        return max(1, math.ceil(mean_run * in_flight / self.workers))
+
+    def _acquire(self, block: bool) -> None:
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise RenderQueueFull(self.retry_after())
+
+    @contextmanager
+    def slot(self, block: bool = False) -> Iterator[None]:
+        """
+        Hold one of the pool's slots while rendering in this process
+        instead (profiled requests): the same admission as submit(), so
+        such renders count against the workers and queue, and a full queue
+        raises RenderQueueFull.
+        """
+        self._acquire(block)
+        with self._lock:
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def submit(self, fn: Callable, *args: Any, block: bool = False,
+               on_discard: Optional[Callable[[Any], None]] = None) -> Future:
+        """
+        Queue fn(*args) in the pool. With block=False a full queue raises
+        RenderQueueFull; block=True waits for a slot (bulk exports).
+        Cancelling the returned future drops the job if it has not started;
+        a job already running still finishes, and on_discard(result) is
+        then called since nobody will read the result (e.g. to delete a
+        file it wrote).
+        """
+        self._acquire(block)
+        submitted = time.time()
+        pool = self._get_pool()
+        try:
+            try:
+                inner = pool.submit(_run_timed, fn, args)
+            except BrokenProcessPool:
+                self._drop_pool(pool)
+                pool = self._get_pool()
+                inner = pool.submit(_run_timed, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        outer: Future = Future()
+        outer.add_done_callback(lambda f: inner.cancel() if f.cancelled() else None)
+
+        def finished(f: Future) -> None:
+            self._slots.release()
+            with self._lock:
+                self._in_flight -= 1
+            if f.cancelled():
+                return
+            try:
+                started, ended, result = f.result()
+            except BaseException as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._drop_pool(pool)
+                with self._lock:
+                    self._stats["failed"] += 1
+                try:
+                    outer.set_exception(e)
+                except InvalidStateError:
+                    pass
+                return
+            with self._lock:
+                wait = max(0.0, started - submitted)
+                self._stats["completed"] += 1
+                self._stats["wait_seconds_sum"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+                self._stats["run_seconds_sum"] += max(0.0, ended - started)
+            try:
+                outer.set_result(result)
+            except InvalidStateError:
+                if on_discard is not None:
+                    on_discard(result)
+
+        inner.add_done_callback(finished)
+        return outer
+
+    def shutdown(self) -> None:
+        """
+        Stops the pool's children once running renders finish. Server workers
+        call it on shutdown: a worker that exits without it (uvicorn's spawned
+        workers skip atexit) leaves the children behind.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            in_flight = self._in_flight
+        done = out["completed"]
+        out.update({
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "wait_seconds_avg": out["wait_seconds_sum"] / done if done else 0.0,
+            "run_seconds_avg": out["run_seconds_sum"] / done if done else 0.0,
+        })
+        return out
+
+
+_executor: Optional[RenderExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor() -> RenderExecutor:
+    """
+    One executor per server worker, created on first use.
+    CATALOG_RENDER_WORKERS (default: CPU count) sets the pool size and
+    CATALOG_RENDER_QUEUE (default: 2 x workers) how many jobs may wait.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = _env_int("CATALOG_RENDER_WORKERS", _env_int("CATALOG_BULK_WORKERS", 0))
+            if workers <= 0:
+                workers = os.cpu_count() or 1
+            queue_size = _env_int("CATALOG_RENDER_QUEUE", 2 * workers)
+            _executor = RenderExecutor(workers, max(0, queue_size))
+        return _executor
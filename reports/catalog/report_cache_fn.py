@@ -0,0 +1,211 @@
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+# The disk tier is scanned only when this process's running estimate of its
+# size passes the limit, or every TRIM_INTERVAL seconds for what other
+# workers wrote; a trim goes down to TRIM_TO of the limit
+TRIM_INTERVAL = 60.0
+TRIM_TO = 0.9
+
+
+def _env_mb(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+@lru_cache(maxsize=None)
+def render_fingerprint(assets_dir: Optional[str] = None) -> str:
+    """
+    Changes whenever the rendered output could: the renderer's own source
+    and the assets it embeds (logo, font). Computed once per process.
+    """
+    h = hashlib.sha256()
+    for p in sorted(_PACKAGE_DIR.glob("*.py")):
+        h.update(p.name.encode())
+        h.update(p.read_bytes())
+    if assets_dir and Path(assets_dir).is_dir():
+        for p in sorted(Path(assets_dir).iterdir()):
+            if p.is_file():
+                st = p.stat()
+                h.update(f"{p.name}:{st.st_size}:{int(st.st_mtime)}".encode())
+    return h.hexdigest()[:16]
+
+
+def report_cache_key(*parts: Any, assets_dir: Optional[Path] = None) -> str:
+    """Stable key from the source identifiers/versions plus the render fingerprint."""
+    h = hashlib.sha256(render_fingerprint(str(assets_dir) if assets_dir else None).encode())
+    for part in parts:
+        h.update(b"\x00")
+        h.update(str(part).encode())
+    return h.hexdigest()
+
+
+class ReportCache:
+    """
+    Two tiers of finished .xlsx bytes:
+
+      - memory: per-process LRU bounded by total size in bytes;
+      - disk: one file per key under a directory shared by every worker on
+        the host, written atomically and trimmed oldest-first by total size.
+        Each process keeps a running total of the directory's size (exact
+        after every scan, plus what it wrote since), so a put does not
+        list the directory.
+
+    Keys must already encode the version of everything the report depends
+    on (see report_cache_key), so entries never need invalidating.
+    """
+
+    def __init__(self, directory: Optional[Path], memory_bytes: int, disk_bytes: int):
+        self.directory = Path(directory) if directory and disk_bytes > 0 else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._disk_size: Optional[int] = None  # unknown until the first scan
+        self._scanned_at = 0.0
+        self._trim_lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.xlsx"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_size -= len(old)
+            self._mem[key] = data
+            self._mem_size += len(data)
+            while self._mem_size > self.memory_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_size -= len(evicted)
+                self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+        if self.directory:
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # recently used: trimmed last
+            except OSError:
+                data = None
+            if data is not None:
+                self._count("disk_hits")
+                self._remember(key, data)
+                return data
+        self._count("misses")
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        self._count("stores")
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # readers in other workers never see half a file
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data) - replaced
+            due = (self._disk_size is None or self._disk_size > self.disk_bytes
+                   or time.monotonic() - self._scanned_at >= TRIM_INTERVAL)
+        if due:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        # One scan at a time per process; a put that finds one running skips
+        if not self._trim_lock.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            total = 0
+            for p in self.directory.glob("*/*.xlsx"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+            if total > self.disk_bytes:
+                target = int(self.disk_bytes * TRIM_TO)
+                for _mtime, size, p in sorted(entries):
+                    try:
+                        p.unlink()
+                    except OSError:
+                        continue
+                    total -= size
+                    self._count("evictions")
+                    if total <= target:
+                        break
+            with self._lock:
+                self._disk_size = total
+                self._scanned_at = time.monotonic()
+        finally:
+            self._trim_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["memory_entries"] = len(self._mem)
+            out["memory_bytes"] = self._mem_size
+            out["disk_bytes_estimate"] = self._disk_size
+        return out
+
+
+_cache: Optional[ReportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """
+    Process-wide cache. CATALOG_CACHE_DIR (default: <tmp>/catalog-report-cache),
+    CATALOG_CACHE_MEMORY_MB (default 64) and CATALOG_CACHE_DISK_MB (default
+    1024; 0 turns the disk tier off) configure it.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            directory = os.environ.get("CATALOG_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "catalog-report-cache")
+            _cache = ReportCache(
+                Path(directory),
+                memory_bytes=_env_mb("CATALOG_CACHE_MEMORY_MB", 64) * 1024 * 1024,
+                disk_bytes=_env_mb("CATALOG_CACHE_DISK_MB", 1024) * 1024 * 1024,
+            )
+        return _cache
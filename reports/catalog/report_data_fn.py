@@ -0,0 +1,539 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import re
+from datetime import date
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from .attendance_fn import load_attendance_summary
+from .demographics_fn import demographic_counts
+from .report_metrics_fn import count_reads, count_replica_reads, timed_async, timed_stage
+
+
+# Marathi mappings for Front Page labeling
+CLASS_MAP_MR = {
+    "1": "१ ली", "2": "२ री", "3": "३ री", "4": "४ थी", "5": "५ वी",
+    "6": "६ वी", "7": "७ वी", "8": "८ वी", "9": "९ वी", "10": "१० वी"
+}
+DIVISION_MAP_MR = {"A": "अ", "B": "ब", "C": "क", "D": "ड"}
+
+# Fields of a student record that end up in the workbook.
+STUDENT_FIELDS = (
+    'regNo', 'concession', 'caste', 'categoryMr', 'categoryEn',
+    'dob', 'rollNo', 'fullNameMr', 'motherName', 'gender',
+)
+
+CLASS_DIVISION_RE = re.compile(r"^(\d+)-([A-Z]+)$")
+
+# Schools in Maharashtra start the academic year in June
+ACADEMIC_YEAR_START_MONTH = 6
+
+
+def _coerce_timestamp_to_datetime(v: Any):
+    """
+    Firestore Admin returns a Timestamp for 'dob' in studentsData.
+    Convert to Python datetime if possible; otherwise return as-is.
+    """
+    try:
+        # Firestore Timestamp has .to_datetime()
+        if hasattr(v, "to_datetime"):
+            return v.to_datetime()
+        return v
+    except Exception:
+        return v
+
+
+def _student_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    # Keep only what the workbook prints so rosters stay small and picklable
+    s = {k: item[k] for k in STUDENT_FIELDS if k in item}
+    if "dob" in s:
+        s["dob"] = _coerce_timestamp_to_datetime(s["dob"])
+    return s
+
+
+def is_historical(selected_month: Optional[int], selected_year: Optional[int]) -> bool:
+    return (isinstance(selected_month, int) and 1 <= selected_month <= 12
+            and isinstance(selected_year, int) and selected_year > 0)
+
+
+def roster_record_id(class_division_str: str, selected_year: int, selected_month: int) -> str:
+    return f"{class_division_str}_{selected_year}-{str(selected_month).zfill(2)}"
+
+
+def split_class_division(class_division_str: str) -> Optional[Tuple[str, str]]:
+    m = CLASS_DIVISION_RE.match((class_division_str or "").strip().upper())
+    if not m:
+        return None
+    return m.group(1), m.group(2)
+
+
+def class_division_sort_key(class_division_str: str):
+    parts = split_class_division(class_division_str)
+    if not parts:
+        return (10_000, class_division_str)
+    return (int(parts[0]), parts[1])
+
+
+def _error(msg: str) -> Dict[str, Any]:
+    return {"ok": False, "error": msg}
+
+
+def attendance_month(selected_month: Optional[int], selected_year: Optional[int]) -> Tuple[int, int]:
+    """(year, month) whose attendance a report prints: the selected month, else the current one."""
+    if is_historical(selected_month, selected_year):
+        return selected_year, selected_month
+    today = date.today()
+    return today.year, today.month
+
+
+def attach_attendance(inputs: Dict[str, Any], snap, year: int, month: int) -> Dict[str, Any]:
+    """
+    Adds the month's attendance (attendance_fn summary, or None when there is
+    no attendance doc) to report inputs, with the doc's version for cache keys.
+    """
+    if not inputs.get("ok"):
+        return inputs
+    summary = load_attendance_summary(inputs["students"], snap, year, month)
+    inputs["attendance"] = summary
+    inputs["attendance_version"] = doc_version(snap)
+    inputs["report_data"]["average_attendance"] = summary["average"] if summary else None
+    return inputs
+
+
+def assemble_report_inputs(
+    class_no: str | int,
+    division: str,
+    doc_data: Optional[Dict[str, Any]],
+    students: List[Dict[str, Any]],
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Build the plain-data bundle the renderer needs from the catalog meta doc
+    and an already ordered roster. Everything in it is picklable.
+    """
+    class_division_str = f"{class_no}-{division.upper()}"
+    teacher_name = "N/A"; month = 1; year = 2025
+    subjects: List[Dict[str, Any]] = []
+    doc_data = doc_data or {}
+    if doc_data:
+        teacher_name = doc_data.get('classTeacher', 'N/A')
+        month = doc_data.get('month', 1)
+        year = doc_data.get('year', 2025)
+        subjects = doc_data.get('subjects', []) or []
+
+    report_data = {
+        "teacher_name": teacher_name,
+        "month": month,
+        "year": year,
+        "class_name_mr": CLASS_MAP_MR.get(str(class_no), str(class_no)),
+        "division_name_mr": DIVISION_MAP_MR.get(division.upper(), division.upper()),
+        "division": division.upper(),
+        "selected_month": selected_month,
+        "selected_year": selected_year,
+        "demographics": demographic_counts(students),
+    }
+    return {
+        "ok": True,
+        "error": None,
+        "class_no": class_no,
+        "division": division.upper(),
+        "class_division": class_division_str,
+        "report_data": report_data,
+        "students": students,
+        "subjects": subjects,
+        "catalog_doc": doc_data,
+    }
+
+
+def _students_from_record(record_id: str, rec_doc) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    if rec_doc is None or not rec_doc.exists:
+        return None, f"No historical roster found: roster_records/{record_id}"
+    rec = rec_doc.to_dict() or {}
+    data_list = rec.get("studentsData", [])
+    if not isinstance(data_list, list) or not data_list:
+        return None, f"Historical roster for {record_id} has no studentsData."
+    # Preserve array order and coerce timestamps
+    return [_student_row(item) for item in data_list if isinstance(item, dict)], None
+
+
+def live_roster_query(db, class_division_str: Optional[str] = None):
+    """
+    Active students with only the printed fields. Not ordered on the
+    server: Firestore would leave documents without a rollNo out of an
+    ordered query, so callers sort with roll_no_key instead.
+    """
+    query = db.collection('catalog/global/students').where('status', '==', 'active')
+    fields = list(STUDENT_FIELDS)
+    if class_division_str is None:
+        fields.append('classDivision')  # needed to group the whole-school roster
+    else:
+        query = query.where('classDivision', '==', class_division_str)
+    return query.select(fields)
+
+
+# Firestore accepts at most 30 values in one 'in' filter
+MAX_IN_VALUES = 30
+
+
+def live_roster_queries(db, class_divisions: Optional[List[str]] = None) -> List[Any]:
+    """
+    live_roster_query for the whole school, or when class_divisions are
+    given, one "classDivision in [...]" query per MAX_IN_VALUES classes so
+    only their students are read.
+    """
+    if not class_divisions:
+        return [live_roster_query(db)]
+    wanted = sorted({cd.strip().upper() for cd in class_divisions})
+    return [live_roster_query(db).where('classDivision', 'in', wanted[i:i + MAX_IN_VALUES])
+            for i in range(0, len(wanted), MAX_IN_VALUES)]
+
+
+def roll_no_key(row: Dict[str, Any]):
+    # Roll-number order; students without a rollNo go last
+    roll_no = row.get('rollNo')
+    return 10_000_000 if roll_no is None else roll_no
+
+
+def _live_students(docs: Iterable[Any]) -> List[Dict[str, Any]]:
+    # One to_dict() per snapshot, sorted once
+    rows = [_student_row(d.to_dict() or {}) for d in docs]
+    rows.sort(key=roll_no_key)
+    return rows
+
+
+def load_report_inputs_fn(
+    db,
+    class_no: str | int,
+    division: str,
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+    with_attendance: bool = False,
+) -> Dict[str, Any]:
+    """
+    Reads everything one catalog report needs from Firestore.
+
+    Historical mode:
+      - If selected_month/year are provided, load historical snapshot from:
+          roster_records/{classNo}-{DIV}_{YYYY}-{MM}
+        and use studentsData array as the roster in that stored order.
+
+    Live mode:
+      - Otherwise, read active students for the classDivision.
+
+    with_attendance also reads attendance/{classNo}-{DIV}_{YYYY}-{MM} for
+    the report's month into inputs["attendance"].
+    """
+    class_division_str = f"{class_no}-{division.upper()}"
+
+    if is_historical(selected_month, selected_year):
+        # Historical mode: read frozen snapshot
+        sources = load_historical_sources_fn(db, class_division_str, selected_month, selected_year, with_attendance)
+        return historical_inputs_from_sources(class_no, division, sources, selected_month, selected_year)
+
+    # Catalog meta for front/back pages (class teacher, subjects)
+    with timed_stage("meta_read"):
+        doc = db.collection('catalog').document(class_division_str).get()
+    count_snapshot_reads("catalog", [doc])
+    doc_data = (doc.to_dict() or {}) if doc.exists else {}
+
+    # Live mode: query active students for this classDivision
+    with timed_stage("roster_read"):
+        student_docs = list(live_roster_query(db, class_division_str).stream())
+    count_snapshot_reads("students", student_docs, query=True)
+    students = _live_students(student_docs)
+
+    if not students:
+        return _error(f"No students to print for {class_division_str}.")
+
+    inputs = assemble_report_inputs(class_no, division, doc_data, students, selected_month, selected_year)
+    inputs["source_version"] = roster_version(doc, student_docs)
+    if with_attendance:
+        year, month = attendance_month(selected_month, selected_year)
+        with timed_stage("attendance_read"):
+            att = db.collection('attendance').document(roster_record_id(class_division_str, year, month)).get()
+        count_snapshot_reads("attendance", [att])
+        attach_attendance(inputs, att, year, month)
+    return inputs
+
+
+def count_snapshot_reads(collection: str, snaps: List[Any], query: bool = False) -> None:
+    """
+    count_reads for the snapshots a load returned. Those served by the local
+    replica (roster_replica_fn) are counted apart; an empty query result
+    from Firestore still costs one read.
+    """
+    local = sum(1 for s in snaps if getattr(s, "from_replica", False))
+    if local:
+        count_replica_reads(collection, local)
+    remote = len(snaps) - local
+    if query and not local:
+        remote = max(1, remote)
+    if remote:
+        count_reads(collection, remote)
+
+
+def doc_version(snap) -> str:
+    """update_time of a document snapshot as text; '-' if it does not exist."""
+    if snap is None or not snap.exists:
+        return "-"
+    ut = getattr(snap, "update_time", None)
+    return ut.isoformat() if hasattr(ut, "isoformat") else str(ut)
+
+
+def roster_version(meta_snap, student_docs: Iterable[Any]) -> str:
+    """
+    Digest of the update_times of the catalog meta doc and of every live
+    roster doc: changes whenever one of them is edited, added or removed.
+    """
+    h = hashlib.blake2b(doc_version(meta_snap).encode(), digest_size=16)
+    for d in student_docs:
+        h.update(f"\x00{d.id}\x00{doc_version(d)}".encode())
+    return h.hexdigest()
+
+
+def load_historical_sources_fn(
+    db,
+    class_division_str: str,
+    selected_month: int,
+    selected_year: int,
+    with_attendance: bool = False,
+) -> Dict[str, Any]:
+    """
+    Catalog meta doc and roster_records snapshot of one historical report in
+    a single batched read. Their update_times identify the report version.
+    with_attendance adds the month's attendance doc to the same read, as
+    sources["attendance"].
+    """
+    record_id = roster_record_id(class_division_str, selected_year, selected_month)
+    refs = [db.collection('catalog').document(class_division_str), db.collection('roster_records').document(record_id)]
+    if with_attendance:
+        refs.append(db.collection('attendance').document(record_id))
+    # One round trip for all docs, so the meta read is timed with the roster
+    with timed_stage("roster_read"):
+        snaps = {d.reference.path: d for d in db.get_all(refs)}
+    sources = {"record_id": record_id, "catalog": snaps.get(refs[0].path), "roster": snaps.get(refs[1].path)}
+    count_snapshot_reads("catalog", [sources["catalog"]])
+    count_snapshot_reads("roster_records", [sources["roster"]])
+    if with_attendance:
+        sources["attendance"] = snaps.get(refs[2].path)
+        count_snapshot_reads("attendance", [sources["attendance"]])
+    return sources
+
+
+def historical_inputs_from_sources(
+    class_no: str | int,
+    division: str,
+    sources: Dict[str, Any],
+    selected_month: int,
+    selected_year: int,
+) -> Dict[str, Any]:
+    students, err = _students_from_record(sources["record_id"], sources["roster"])
+    if err:
+        return _error(err)
+    if not students:
+        return _error(f"No students to print for {class_no}-{division.upper()}.")
+    meta = sources["catalog"]
+    doc_data = (meta.to_dict() or {}) if meta is not None and meta.exists else {}
+    inputs = assemble_report_inputs(class_no, division, doc_data, students, selected_month, selected_year)
+    if "attendance" in sources:
+        attach_attendance(inputs, sources["attendance"], selected_year, selected_month)
+    return inputs
+
+
+async def _collect(stream) -> List[Any]:
+    return [d async for d in stream]
+
+
+async def load_historical_sources_async_fn(
+    adb,
+    class_division_str: str,
+    selected_month: int,
+    selected_year: int,
+    with_attendance: bool = False,
+) -> Dict[str, Any]:
+    """load_historical_sources_fn on the AsyncClient; the docs are fetched concurrently."""
+    record_id = roster_record_id(class_division_str, selected_year, selected_month)
+    reads = [
+        timed_async("meta_read", adb.collection('catalog').document(class_division_str).get()),
+        timed_async("roster_read", adb.collection('roster_records').document(record_id).get()),
+    ]
+    if with_attendance:
+        reads.append(timed_async("attendance_read", adb.collection('attendance').document(record_id).get()))
+    meta, rec, *att = await asyncio.gather(*reads)
+    count_snapshot_reads("catalog", [meta])
+    count_snapshot_reads("roster_records", [rec])
+    sources = {"record_id": record_id, "catalog": meta, "roster": rec}
+    if with_attendance:
+        count_snapshot_reads("attendance", att)
+        sources["attendance"] = att[0]
+    return sources
+
+
+async def load_report_inputs_async_fn(
+    adb,
+    class_no: str | int,
+    division: str,
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+    with_attendance: bool = False,
+) -> Dict[str, Any]:
+    """
+    load_report_inputs_fn on the AsyncClient. The catalog meta read, the
+    roster read and the attendance read run concurrently, so latency is
+    that of the slowest one.
+    """
+    class_division_str = f"{class_no}-{division.upper()}"
+
+    if is_historical(selected_month, selected_year):
+        sources = await load_historical_sources_async_fn(
+            adb, class_division_str, selected_month, selected_year, with_attendance,
+        )
+        return historical_inputs_from_sources(class_no, division, sources, selected_month, selected_year)
+
+    year, month = attendance_month(selected_month, selected_year)
+    reads = [
+        timed_async("meta_read", adb.collection('catalog').document(class_division_str).get()),
+        timed_async("roster_read", _collect(live_roster_query(adb, class_division_str).stream())),
+    ]
+    if with_attendance:
+        att_ref = adb.collection('attendance').document(roster_record_id(class_division_str, year, month))
+        reads.append(timed_async("attendance_read", att_ref.get()))
+    doc, student_docs, *att = await asyncio.gather(*reads)
+    count_snapshot_reads("catalog", [doc])
+    count_snapshot_reads("students", student_docs, query=True)
+    doc_data = (doc.to_dict() or {}) if doc.exists else {}
+    students = _live_students(student_docs)
+
+    if not students:
+        return _error(f"No students to print for {class_division_str}.")
+
+    inputs = assemble_report_inputs(class_no, division, doc_data, students, selected_month, selected_year)
+    inputs["source_version"] = roster_version(doc, student_docs)
+    if with_attendance:
+        count_snapshot_reads("attendance", att)
+        attach_attendance(inputs, att[0], year, month)
+    return inputs
+
+
+def academic_year_months(start_year: int) -> List[Tuple[int, int]]:
+    """(year, month) of the twelve months of the academic year starting in start_year."""
+    out = []
+    for i in range(12):
+        m = ACADEMIC_YEAR_START_MONTH - 1 + i
+        out.append((start_year + m // 12, m % 12 + 1))
+    return out
+
+
+async def load_academic_year_sources_async_fn(adb, class_division_str: str, start_year: int) -> Dict[str, Any]:
+    """
+    Catalog meta doc plus the twelve monthly roster_records snapshots of one
+    academic year, fetched in a single batched read. Months without a
+    snapshot map to None.
+    """
+    months = academic_year_months(start_year)
+    ids = {roster_record_id(class_division_str, y, m): (y, m) for y, m in months}
+    refs = [adb.collection('catalog').document(class_division_str)]
+    refs += [adb.collection('roster_records').document(i) for i in ids]
+    with timed_stage("roster_read"):
+        snaps = {d.id: d for d in await _collect(adb.get_all(refs))}
+    count_reads("catalog", 1)
+    count_reads("roster_records", len(ids))
+    return {
+        "catalog": snaps.get(class_division_str),
+        "months": [(y, m, rid, snaps.get(rid)) for rid, (y, m) in ids.items()],
+    }
+
+
+def academic_year_inputs_from_sources(
+    class_no: str | int,
+    division: str,
+    sources: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+    """Report inputs for every month that has a usable snapshot, and the (year, month)s that do not."""
+    meta = sources["catalog"]
+    doc_data = (meta.to_dict() or {}) if meta is not None and meta.exists else {}
+    inputs, missing = [], []
+    for y, m, record_id, snap in sources["months"]:
+        students, err = _students_from_record(record_id, snap)
+        if err or not students:
+            missing.append((y, m))
+            continue
+        inputs.append(assemble_report_inputs(class_no, division, doc_data, students, m, y))
+    return inputs, missing
+
+
+def load_bulk_report_inputs_fn(
+    db,
+    class_divisions: Optional[List[str]] = None,
+    selected_month: Optional[int] = None,
+    selected_year: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Reads the inputs for many class-divisions with as few round trips as
+    possible: one batched read for the catalog meta docs, then either one
+    batched read for the roster_records snapshots or one query over the
+    active students (of the whole school, or "in" queries over just the
+    named classes) grouped by classDivision.
+
+    Returns one entry per class-division, in class order. Entries that
+    cannot be printed carry ok=False and an error, plus 'class_division'.
+    """
+    historical = is_historical(selected_month, selected_year)
+    catalog_ref = db.collection('catalog')
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    if not historical:
+        # One pass over the school (or the named classes), then each class
+        # in roll-number order
+        n = 0
+        for query in live_roster_queries(db, class_divisions):
+            for d in query.stream():
+                n += 1
+                row = d.to_dict() or {}
+                cd = str(row.get('classDivision') or '').strip().upper()
+                if cd:
+                    grouped.setdefault(cd, []).append(_student_row(row))
+        count_reads("students", max(1, n))
+        for rows in grouped.values():
+            rows.sort(key=roll_no_key)
+
+    if class_divisions:
+        wanted = [cd.strip().upper() for cd in class_divisions]
+        meta_docs = {d.id: d for d in db.get_all([catalog_ref.document(cd) for cd in wanted])}
+        count_reads("catalog", len(set(wanted)))
+    else:
+        all_meta = list(catalog_ref.stream())
+        count_reads("catalog", max(1, len(all_meta)))
+        meta_docs = {d.id: d for d in all_meta if split_class_division(d.id)}
+        wanted = set(meta_docs)
+        wanted.update(cd for cd in grouped if split_class_division(cd))
+    wanted = sorted(set(wanted), key=class_division_sort_key)
+
+    if historical:
+        ids = {cd: roster_record_id(cd, selected_year, selected_month) for cd in wanted}
+        rec_ref = db.collection('roster_records')
+        rec_docs = {d.id: d for d in db.get_all([rec_ref.document(i) for i in ids.values()])}
+        count_reads("roster_records", len(ids))
+
+    results: List[Dict[str, Any]] = []
+    for cd in wanted:
+        parts = split_class_division(cd)
+        if not parts:
+            results.append({**_error(f"Invalid class-division: {cd}"), "class_division": cd})
+            continue
+        class_no, division = parts
+        if historical:
+            students, err = _students_from_record(ids[cd], rec_docs.get(ids[cd]))
+            if err:
+                results.append({**_error(err), "class_division": cd})
+                continue
+        else:
+            students = grouped.get(cd, [])
+        if not students:
+            results.append({**_error(f"No students to print for {cd}."), "class_division": cd})
+            continue
+        meta = meta_docs.get(cd)
+        doc_data = (meta.to_dict() or {}) if meta is not None and meta.exists else {}
+        results.append(assemble_report_inputs(class_no, division, doc_data, students, selected_month, selected_year))
+    return results
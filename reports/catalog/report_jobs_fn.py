@@ -0,0 +1,218 @@
+from __future__ import annotations
+import asyncio
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Dict, Any, Set
+
+from .generate_full_report_fn import generate_catalog_report_async
+from .academic_year_fn import generate_academic_year_report_async, academic_year_label
+from .bulk_report_fn import iter_bulk_catalog_zip, report_filename
+from .report_data_fn import load_bulk_report_inputs_fn
+from .firestore_clients_fn import get_db
+from .render_executor_fn import RenderQueueFull
+from .result_store_fn import ResultStore, get_result_store
+
+JOB_KINDS = ("catalog", "academic_year", "bulk")
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_TYPE = "application/zip"
+
+# Progress reported for each phase of a job; bulk jobs also move within "rendering"
+_PROGRESS = {"queued": 0.0, "rendering": 0.1, "storing": 0.9, "succeeded": 1.0}
+
+# A running job's worker stamps heartbeat_at this often; status reads treat
+# a job whose heartbeat is older than CATALOG_JOB_STALE_SECONDS as failed
+HEARTBEAT_SECONDS = 10.0
+_ACTIVE = ("queued", "rendering", "storing")
+
+_tasks: Set[asyncio.Task] = set()  # running jobs; keeps the tasks from being collected
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> float:
+    return round(time.time(), 3)
+
+
+def _stale_seconds() -> float:
+    try:
+        return max(HEARTBEAT_SECONDS, float(os.environ.get("CATALOG_JOB_STALE_SECONDS", "60")))
+    except ValueError:
+        return 60.0
+
+
+class _Job:
+    """Status of one job, written through to the store on every change."""
+
+    def __init__(self, store: ResultStore, status: Dict[str, Any]):
+        self.store = store
+        self.status = status
+        self._lock = threading.Lock()  # bulk progress and heartbeats come from other threads
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            now = _now()
+            self.status.update(fields, updated_at=now, heartbeat_at=now)
+            if "status" in fields and fields["status"] in _PROGRESS:
+                self.status["progress"] = max(self.status.get("progress", 0.0), _PROGRESS[fields["status"]])
+            self.store.put_status(self.status["id"], dict(self.status))
+
+    def beat(self) -> None:
+        with self._lock:
+            self.status["heartbeat_at"] = _now()
+            self.store.put_status(self.status["id"], dict(self.status))
+
+
+def valid_job_id(job_id: str) -> bool:
+    return bool(JOB_ID_RE.match(job_id or ""))
+
+
+async def submit_report_job(kind: str, params: Dict[str, Any], assets_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Records a queued job and starts it on this worker's event loop; returns
+    its status. The job outlives the request that created it. params are the
+    generate arguments for kind: class_no/division (+ selected_month/year)
+    for "catalog", class_no/division/start_year for "academic_year" and
+    selected_month/selected_year/classes for "bulk".
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    store = get_result_store()
+    job = _Job(store, {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "params": params,
+        "status": "queued",
+        "progress": 0.0,
+        "created_at": _now(),
+        "updated_at": _now(),
+        "owner": _owner,
+        "heartbeat_at": _now(),
+        "error": None,
+        "filename": None,
+        "size": None,
+        "content_type": None,
+    })
+    await asyncio.to_thread(store.put_status, job.status["id"], dict(job.status))
+    task = asyncio.get_running_loop().create_task(_run_job(job, assets_dir))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return dict(job.status)
+
+
+def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The job's stored status. A job still queued, rendering or storing whose
+    worker has not sent a heartbeat for CATALOG_JOB_STALE_SECONDS died with
+    it: it is marked failed (and stored so) here.
+    """
+    if not valid_job_id(job_id):
+        return None
+    store = get_result_store()
+    status = store.get_status(job_id)
+    if status is None or status.get("status") not in _ACTIVE:
+        return status
+    heartbeat = status.get("heartbeat_at") or status.get("updated_at") or 0.0
+    if time.time() - heartbeat <= _stale_seconds():
+        return status
+    status.update(status="failed", updated_at=_now(),
+                  error=f"Job worker {status.get('owner') or 'unknown'} stopped responding")
+    store.put_status(job_id, status)
+    return status
+
+
+def open_job_result(job_id: str):
+    """(file object, size) of a finished job's result, or None."""
+    return get_result_store().open_result(job_id) if valid_job_id(job_id) else None
+
+
+async def _until_accepted(render):
+    # Jobs are the patient path: wait out a full render queue instead of failing
+    while True:
+        try:
+            return await render()
+        except RenderQueueFull as e:
+            await asyncio.sleep(e.retry_after)
+
+
+async def _heartbeat(job: _Job) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            await asyncio.to_thread(job.beat)
+        except Exception:
+            pass  # the next beat tries again
+
+
+async def _run_job(job: _Job, assets_dir: Optional[Path]) -> None:
+    store = job.store
+    fd, path = tempfile.mkstemp(prefix="catalog-job-", suffix=".tmp")
+    os.close(fd)
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        await asyncio.to_thread(job.update, status="rendering")
+        kind, p = job.status["kind"], job.status["params"]
+        if kind == "bulk":
+            filename = await asyncio.to_thread(_write_bulk_zip, job, p, assets_dir, path)
+            content_type = ZIP_TYPE
+        else:
+            if kind == "catalog":
+                out = await _until_accepted(lambda: generate_catalog_report_async(
+                    p["class_no"], p["division"], save_path=path, return_bytes=False, assets_dir=assets_dir,
+                    selected_month=p.get("selected_month"), selected_year=p.get("selected_year"),
+                ))
+                filename = report_filename(f"{p['class_no']}-{p['division']}", p.get("selected_month"),
+                                           p.get("selected_year"))
+            else:
+                out = await _until_accepted(lambda: generate_academic_year_report_async(
+                    p["class_no"], p["division"], p["start_year"], save_path=path, return_bytes=False,
+                    assets_dir=assets_dir,
+                ))
+                filename = f"catalog_{p['class_no']}-{p['division']}_{academic_year_label(p['start_year'])}.xlsx"
+            if not out.get("ok"):
+                raise RuntimeError(out.get("error") or "Unknown error")
+            content_type = XLSX_TYPE
+
+        await asyncio.to_thread(job.update, status="storing")
+        size = await asyncio.to_thread(store.put_result, job.status["id"], path, content_type)
+        await asyncio.to_thread(job.update, status="succeeded", filename=filename, size=size,
+                                content_type=content_type)
+    except Exception as e:
+        try:
+            await asyncio.to_thread(job.update, status="failed", error=str(e))
+        except Exception:
+            pass
+    finally:
+        heartbeat.cancel()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _write_bulk_zip(job: _Job, p: Dict[str, Any], assets_dir: Optional[Path], path: str) -> str:
+    # Runs in a thread: the bulk ZIP is produced by a blocking generator
+    month, year = p.get("selected_month"), p.get("selected_year")
+    inputs_list = load_bulk_report_inputs_fn(get_db(), p.get("classes"), selected_month=month, selected_year=year)
+    if not any(i.get("ok") for i in inputs_list):
+        detail = "; ".join(f"{i['class_division']}: {i['error']}" for i in inputs_list) or "No classes found"
+        raise RuntimeError(detail)
+
+    total = sum(1 for i in inputs_list if i.get("ok"))
+    done = 0
+    last_update = time.monotonic()
+    with open(path, "wb") as f:
+        for chunk in iter_bulk_catalog_zip(inputs_list, assets_dir, month, year):
+            f.write(chunk)
+            done += 1  # one chunk per finished class, plus the closing one
+            if time.monotonic() - last_update >= 1.0:
+                progress = _PROGRESS["rendering"] + (_PROGRESS["storing"] - _PROGRESS["rendering"]) * min(done, total) / total
+                job.update(progress=round(progress, 3))
+                last_update = time.monotonic()
+    suffix = f"_{year}-{str(month).zfill(2)}" if isinstance(year, int) and isinstance(month, int) else ""
+    return f"catalogs{suffix}.zip"
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+STAGE_SECONDS = Histogram(
+    "catalog_report_stage_seconds",
+    "Time spent in one stage of generating a catalog report.",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REPORT_SECONDS = Histogram(
+    "catalog_report_seconds",
+    "Wall time of one report request, by mode (live/historical/academic_year).",
+    ["mode"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REPORTS = Counter("catalog_reports", "Reports generated, by mode and result (ok/error).", ["mode", "result"])
+REPORTS_COALESCED = Counter(
+    "catalog_reports_coalesced",
+    "Report requests answered by an identical request already in flight.",
+)
+FIRESTORE_READS = Counter(
+    "catalog_firestore_document_reads",
+    "Firestore documents read (billed reads), by collection.",
+    ["collection"],
+)
+REPLICA_READS = Counter(
+    "catalog_replica_document_reads",
+    "Documents served by the local roster replica instead of Firestore, by collection.",
+    ["collection"],
+)
+
+
+class StageTimer:
+    """Per-request stage durations (seconds, in the order they finished) and read counts."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.reads = 0
+        self.replica_reads = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def add_reads(self, n: int) -> None:
+        with self._lock:
+            self.reads += n
+
+    def add_replica_reads(self, n: int) -> None:
+        with self._lock:
+            self.replica_reads += n
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per stage plus total, Firestore and replica reads."""
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+            reads, replica_reads = self.reads, self.replica_reads
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        parts.append(f'firestore;desc="{reads} reads"')
+        if replica_reads:
+            parts.append(f'replica;desc="{replica_reads} docs"')
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("catalog_stage_timer", default=None)
+
+
+@contextmanager
+def stage_timer() -> Iterator[StageTimer]:
+    """Collect the stages timed below this point (threads started via asyncio.to_thread included)."""
+    timer = StageTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    # No-op outside stage_timer(), e.g. in benchmarks or bulk exports
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+async def timed_async(name: str, awaitable: Awaitable[Any]) -> Any:
+    """Await under timed_stage; lets concurrent reads in a gather be timed separately."""
+    with timed_stage(name):
+        return await awaitable
+
+
+def count_reads(collection: str, n: int) -> None:
+    """Record n billed document reads (Firestore bills at least one per query)."""
+    FIRESTORE_READS.labels(collection).inc(n)
+    timer = _current.get()
+    if timer is not None:
+        timer.add_reads(n)
+
+
+def count_replica_reads(collection: str, n: int) -> None:
+    """Record n documents served by the local replica (not billed)."""
+    REPLICA_READS.labels(collection).inc(n)
+    timer = _current.get()
+    if timer is not None:
+        timer.add_replica_reads(n)
+
+
+def add_stages(stages: List[Tuple[str, float]]) -> None:
+    """Merge stages timed elsewhere (a render pool child) into the current timer."""
+    timer = _current.get()
+    if timer is not None:
+        for name, seconds in stages:
+            timer.add(name, seconds)
+
+
+def finish_report_metrics(timer: StageTimer, out: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """Observe the request's stages and attach 'server_timing' to the result dict."""
+    for name, seconds in timer.stages:
+        STAGE_SECONDS.labels(name).observe(seconds)
+    REPORT_SECONDS.labels(mode).observe(timer.elapsed())
+    REPORTS.labels(mode, "ok" if out.get("ok") else "error").inc()
+    out["server_timing"] = timer.server_timing()
+    return out
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """
+    Prometheus exposition of this process, or of every server worker when
+    PROMETHEUS_MULTIPROC_DIR is set (gunicorn with several workers).
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import asyncio
+import cProfile
+import os
+import pstats
+import secrets
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from io import StringIO
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from .generate_full_report_fn import generate_catalog_report, generate_catalog_report_async
+from .render_executor_fn import get_render_executor
+from .report_jobs_fn import valid_job_id
+from .result_store_fn import ResultStore, store_from_env
+
+PROFILE_TYPE = "application/octet-stream"  # pstats dump: python -m pstats <file>, snakeviz
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TRACE_FRAMES = 8
+
+# One profile at a time per process: tracemalloc is process-wide and two
+# profiled requests would see each other's allocations
+_profile_lock = threading.Lock()
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ResultStore:
+    """Where profiles are kept: CATALOG_PROFILE_DIR or CATALOG_PROFILE_PREFIX, on the job store's backend."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = store_from_env(
+                os.environ.get("CATALOG_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "catalog-report-profiles"),
+                os.environ.get("CATALOG_PROFILE_PREFIX", "catalog-profiles/"),
+            )
+        return _store
+
+
+def set_profile_store(store: Optional[ResultStore]) -> None:
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def admin_token_ok(token: Optional[str]) -> bool:
+    """True when token is CATALOG_ADMIN_TOKEN; always False while that is unset."""
+    expected = os.environ.get("CATALOG_ADMIN_TOKEN", "")
+    return bool(expected and token) and secrets.compare_digest(token.encode(), expected.encode())
+
+
+def profiling_requested(profile_header: Optional[str]) -> bool:
+    """
+    A request is profiled when it carries the admin token in X-Catalog-Profile,
+    or for every request while CATALOG_PROFILE_REQUESTS=1 (debug instances).
+    """
+    if os.environ.get("CATALOG_PROFILE_REQUESTS", "0").strip() == "1":
+        return True
+    return admin_token_ok(profile_header)
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profiler, stream=StringIO())
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [{
+        "function": f"{path}:{line}({name})",
+        "calls": nc,
+        "tottime_ms": round(tt * 1000, 3),
+        "cumtime_ms": round(ct * 1000, 3),
+    } for (path, line, name), (_cc, nc, tt, ct, _callers) in rows]
+
+
+def _top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    # Net growth per line while the call ran, largest first
+    diffs = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+    return [{
+        "site": str(d.traceback),
+        "size_kib": round(d.size_diff / 1024, 1),
+        "count": d.count_diff,
+    } for d in diffs]
+
+
+def profile_call(label: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Optional[str]]:
+    """
+    (fn(*args, **kwargs), profile id). The call runs under cProfile and
+    tracemalloc; the pstats dump and a summary (top functions by cumulative
+    time, net allocation growth by line, traced peak) go to the profile
+    store. Only the calling thread is profiled. If another profile is
+    running, fn runs unprofiled and the id is None.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return fn(*args, **kwargs), None
+    try:
+        return _profiled(label, fn, *args, **kwargs)
+    finally:
+        _profile_lock.release()
+
+
+def _profiled(label: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, str]:
+    # profile_call with _profile_lock already held
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        _current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+    profile_id = uuid.uuid4().hex
+    summary = {
+        "id": profile_id,
+        "label": label,
+        "created_at": round(time.time(), 3),
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+        "ok": result.get("ok") if isinstance(result, dict) else None,
+        "server_timing": result.get("server_timing") if isinstance(result, dict) else None,
+        "top_functions": _top_functions(profiler),
+        "top_allocations": _top_allocations(before, after),
+    }
+    store = get_profile_store()
+    fd, path = tempfile.mkstemp(prefix="catalog-profile-", suffix=".prof")
+    os.close(fd)
+    try:
+        profiler.dump_stats(path)
+        store.put_result(profile_id, path, PROFILE_TYPE)
+    finally:
+        os.unlink(path)
+    store.put_status(profile_id, summary)
+    return result, profile_id
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    return get_profile_store().get_status(profile_id) if valid_job_id(profile_id) else None
+
+
+def open_profile(profile_id: str):
+    """(file, size) of the stored pstats dump, or None."""
+    return get_profile_store().open_result(profile_id) if valid_job_id(profile_id) else None
+
+
+async def profile_report_async(label: str, **kwargs: Any) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    generate_catalog_report(**kwargs) profiled on a thread of its own. The
+    render runs in-process (not in the render pool, which cProfile cannot
+    see) and bypasses the report cache and incremental patching, so the
+    profile shows the full render of the real data. It still takes one of
+    the render pool's slots while it runs, so profiling cannot push the
+    server past its render capacity: raises RenderQueueFull like an
+    unprofiled request. While another profile is running the request is
+    served as usual (generate_catalog_report_async) and the id is None.
+    """
+    executor = get_render_executor()
+
+    def run() -> Optional[Tuple[Dict[str, Any], str]]:
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        try:
+            with executor.slot():
+                return _profiled(label, generate_catalog_report, **{**kwargs, "use_cache": False, "incremental": False})
+        finally:
+            _profile_lock.release()
+
+    out = await asyncio.to_thread(run)
+    if out is None:
+        return await generate_catalog_report_async(**kwargs), None
+    return out
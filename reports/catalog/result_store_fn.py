@@ -0,0 +1,186 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional, Dict, Any, IO, Tuple
+
+RESULT_NAME = "result"
+STATUS_NAME = "status.json"
+
+
+class ResultStore(ABC):
+    """
+    Where report jobs keep their status and finished file, keyed by job id.
+    Every server worker must see the same store, so a job can be polled and
+    downloaded through any of them. A store missing a method fails when it
+    is created, not halfway through a job.
+    """
+
+    @abstractmethod
+    def put_status(self, job_id: str, status: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put_result(self, job_id: str, path: str, content_type: str) -> int:
+        """Store the finished file at path (left in place for the caller); returns its size."""
+
+    @abstractmethod
+    def open_result(self, job_id: str) -> Optional[Tuple[IO[bytes], int]]:
+        """Readable file object and size of the stored result, or None."""
+
+
+class LocalResultStore(ResultStore):
+    """
+    Directory per job on the local filesystem: enough for one host. Jobs
+    older than ttl_seconds are removed when new ones are stored.
+    """
+
+    def __init__(self, directory: Path, ttl_seconds: float):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _job_dir(self, job_id: str) -> Path:
+        return self.directory / job_id
+
+    def put_status(self, job_id: str, status: Dict[str, Any]) -> None:
+        d = self._job_dir(job_id)
+        d.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(status, f, ensure_ascii=False)
+        os.replace(tmp, d / STATUS_NAME)  # pollers never see half a file
+        self._sweep()
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self._job_dir(job_id) / STATUS_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put_result(self, job_id: str, path: str, content_type: str) -> int:
+        d = self._job_dir(job_id)
+        d.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f, open(path, "rb") as src:
+            shutil.copyfileobj(src, f)
+        os.replace(tmp, d / RESULT_NAME)
+        return (d / RESULT_NAME).stat().st_size
+
+    def open_result(self, job_id: str) -> Optional[Tuple[IO[bytes], int]]:
+        try:
+            f = open(self._job_dir(job_id) / RESULT_NAME, "rb")
+        except OSError:
+            return None
+        return f, os.fstat(f.fileno()).st_size
+
+    def _sweep(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < 60:
+                return
+            self._last_sweep = now
+        for d in self.directory.iterdir():
+            try:
+                if d.is_dir() and now - d.stat().st_mtime > self.ttl_seconds:
+                    shutil.rmtree(d, ignore_errors=True)
+            except OSError:
+                continue
+
+
+class GCSResultStore(ResultStore):
+    """
+    Objects under gs://bucket/prefix<job_id>/ in Cloud Storage, shared by
+    every instance. Expire old jobs with a bucket lifecycle rule.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "catalog-jobs/"):
+        from google.cloud import storage  # only needed with this backend
+
+        self._bucket = storage.Client().bucket(bucket)
+        self.prefix = prefix
+
+    def _blob(self, job_id: str, name: str):
+        return self._bucket.blob(f"{self.prefix}{job_id}/{name}")
+
+    def put_status(self, job_id: str, status: Dict[str, Any]) -> None:
+        self._blob(job_id, STATUS_NAME).upload_from_string(
+            json.dumps(status, ensure_ascii=False), content_type="application/json",
+        )
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return json.loads(self._blob(job_id, STATUS_NAME).download_as_bytes())
+        except (NotFound, ValueError):
+            return None
+
+    def put_result(self, job_id: str, path: str, content_type: str) -> int:
+        blob = self._blob(job_id, RESULT_NAME)
+        blob.upload_from_filename(path, content_type=content_type)
+        return os.path.getsize(path)
+
+    def open_result(self, job_id: str) -> Optional[Tuple[IO[bytes], int]]:
+        blob = self._bucket.get_blob(f"{self.prefix}{job_id}/{RESULT_NAME}")
+        if blob is None:
+            return None
+        return blob.open("rb"), blob.size
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def store_from_env(local_dir: str, gcs_prefix: str) -> ResultStore:
+    """
+    ResultStore on the backend CATALOG_JOB_STORE picks: "local" (default)
+    keeps files under local_dir for CATALOG_JOB_TTL_HOURS (default 24);
+    "gcs" keeps them in CATALOG_JOB_BUCKET under gcs_prefix.
+    """
+    backend = os.environ.get("CATALOG_JOB_STORE", "local").strip().lower()
+    if backend == "gcs":
+        bucket = os.environ.get("CATALOG_JOB_BUCKET")
+        if not bucket:
+            raise RuntimeError("CATALOG_JOB_STORE=gcs needs CATALOG_JOB_BUCKET")
+        return GCSResultStore(bucket, gcs_prefix)
+    if backend == "local":
+        try:
+            ttl_hours = float(os.environ.get("CATALOG_JOB_TTL_HOURS", "24"))
+        except ValueError:
+            ttl_hours = 24.0
+        return LocalResultStore(Path(local_dir), ttl_hours * 3600)
+    raise RuntimeError(f"Unknown CATALOG_JOB_STORE: {backend}")
+
+
+def get_result_store() -> ResultStore:
+    """
+    Process-wide job store (store_from_env): CATALOG_JOB_DIR, default
+    <tmp>/catalog-report-jobs, or CATALOG_JOB_PREFIX in the bucket.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = store_from_env(
+                os.environ.get("CATALOG_JOB_DIR") or os.path.join(tempfile.gettempdir(), "catalog-report-jobs"),
+                os.environ.get("CATALOG_JOB_PREFIX", "catalog-jobs/"),
+            )
+        return _store
+
+
+def set_result_store(store: Optional[ResultStore]) -> None:
+    """Swap in another store (tests, benchmarks); None goes back to the configured one."""
+    global _store
+    with _store_lock:
+        _store = store
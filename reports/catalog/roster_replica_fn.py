@@ -0,0 +1,697 @@
+from __future__ import annotations
+import asyncio
+import base64
+import datetime
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Set, Tuple
+
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+# Collections kept in the replica -> filters of their listener. A query is
+# served locally only if it repeats those filters (the replica holds nothing else).
+REPLICATED: Dict[str, Tuple[Tuple[str, str, Any], ...]] = {
+    "catalog": (),
+    "catalog/global/students": (("status", "==", "active"),),
+    "roster_records": (),
+}
+LEASE_SECONDS = 30.0
+HEARTBEAT_SECONDS = 5.0
+SCHEMA_VERSION = 2  # 2: documents stored as JSON (1 pickled them)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    class_division TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_by_class ON docs (collection, class_division);
+CREATE TABLE IF NOT EXISTS sync_state (collection TEXT PRIMARY KEY, synced_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS lease (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+"""
+
+
+def replica_path() -> Optional[str]:
+    return os.environ.get("CATALOG_REPLICA_PATH", "").strip() or None
+
+
+def default_max_staleness() -> float:
+    """CATALOG_REPLICA_MAX_STALENESS: seconds a request accepts by default (30)."""
+    try:
+        return float(os.environ.get("CATALOG_REPLICA_MAX_STALENESS", "30"))
+    except ValueError:
+        return 30.0
+
+
+def _replicated_collections() -> List[str]:
+    raw = os.environ.get("CATALOG_REPLICA_COLLECTIONS", "").strip()
+    if not raw:
+        return list(REPLICATED)
+    return [c.strip() for c in raw.split(",") if c.strip() in REPLICATED]
+
+
+def _timestamp(ut: Any) -> float:
+    return ut.timestamp() if hasattr(ut, "timestamp") else 0.0
+
+
+# Documents are stored as JSON; Firestore values JSON has no type for are
+# tagged objects. Timestamps keep their nanoseconds (RFC 3339), so
+# update_time and doc_version() read back exactly as Firestore gave them.
+_TAGS = ("$ts", "$bytes", "$geo", "$ref", "$map")
+
+
+def _encode_value(v: Any) -> Any:
+    if hasattr(v, "rfc3339"):
+        return {"$ts": v.rfc3339()}
+    if isinstance(v, datetime.datetime):
+        return {"$ts": v.isoformat()}
+    if hasattr(v, "to_datetime"):
+        return _encode_value(v.to_datetime())
+    if isinstance(v, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(v).decode("ascii")}
+    if hasattr(v, "latitude") and hasattr(v, "longitude"):
+        return {"$geo": [v.latitude, v.longitude]}
+    if hasattr(v, "path") and hasattr(v, "id"):
+        return {"$ref": v.path}
+    raise TypeError(f"Cannot store {type(v).__name__} in the replica")
+
+
+def _escape(v: Any) -> Any:
+    # A document map that looks like a tag is wrapped so it reads back as a map
+    if isinstance(v, dict):
+        v = {k: _escape(x) for k, x in v.items()}
+        if len(v) == 1 and next(iter(v)) in _TAGS:
+            return {"$map": [list(item) for item in v.items()]}  # pairs: not decoded as a tag
+        return v
+    if isinstance(v, (list, tuple)):
+        return [_escape(x) for x in v]
+    return v
+
+
+def _decode_tag(obj: Dict[str, Any]) -> Any:
+    if len(obj) != 1:
+        return obj
+    tag, v = next(iter(obj.items()))
+    if tag == "$ts":
+        if v.endswith("Z"):
+            return DatetimeWithNanoseconds.from_rfc3339(v)
+        return datetime.datetime.fromisoformat(v)
+    if tag == "$bytes":
+        return base64.b64decode(v)
+    if tag == "$geo":
+        from google.cloud.firestore_v1 import GeoPoint
+
+        return GeoPoint(*v)
+    if tag == "$ref":
+        return _Ref(v)
+    if tag == "$map":
+        return dict(v)
+    return obj
+
+
+def dump_document(data: Dict[str, Any], update_time: Any) -> str:
+    return json.dumps({"data": _escape(data), "update_time": update_time},
+                      default=_encode_value, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_document(text: str) -> Tuple[Dict[str, Any], Any]:
+    doc = json.loads(text, object_hook=_decode_tag)
+    return doc["data"], doc["update_time"]
+
+
+class _Ref:
+    def __init__(self, path: str):
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+
+class ReplicaSnapshot:
+    """Document read from the replica; looks like a Firestore DocumentSnapshot to the loaders."""
+
+    exists = True
+    from_replica = True
+
+    def __init__(self, path: str, data: Dict[str, Any], update_time: Any):
+        self.reference = _Ref(path)
+        self.id = self.reference.id
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._data
+
+    def get(self, field_path: str) -> Any:
+        return _field(self._data, field_path)
+
+
+_MISSING = object()
+
+
+def _field(data: Dict[str, Any], path: str) -> Any:
+    cur: Any = data
+    for part in path.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return _MISSING
+        cur = cur[part]
+    return cur
+
+
+class RosterReplica:
+    """
+    Local SQLite copy of the replicated collections (one file per host,
+    shared by every server worker; WAL lets them read while the syncer
+    writes). Documents are stored whole, with their update_time, so a
+    replica read gives the same report and ETag as a Firestore read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Older layout: start over, the syncer reloads everything
+            conn.executescript("DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS sync_state;")
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- reads -----------------------------------------------------------
+    def fresh_collections(self, max_staleness: float) -> Set[str]:
+        """Collections the syncer vouched for within the last max_staleness seconds."""
+        if max_staleness <= 0:
+            return set()
+        cutoff = time.time() - max_staleness
+        rows = self._conn().execute("SELECT collection FROM sync_state WHERE synced_at >= ?", (cutoff,))
+        return {c for (c,) in rows}
+
+    def get(self, path: str) -> Optional[ReplicaSnapshot]:
+        row = self._conn().execute("SELECT data FROM docs WHERE path = ?", (path,)).fetchone()
+        return _snapshot(path, row[0]) if row else None
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, ReplicaSnapshot]:
+        """The documents of paths that the replica has, by path."""
+        paths = list(dict.fromkeys(paths))
+        found: Dict[str, ReplicaSnapshot] = {}
+        for i in range(0, len(paths), 500):  # below SQLite's bound-parameter limit
+            chunk = paths[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT path, data FROM docs WHERE path IN ({', '.join('?' * len(chunk))})", chunk,
+            )
+            found.update((path, _snapshot(path, data)) for path, data in rows)
+        return found
+
+    def scan(self, collection: str, class_division: Optional[str] = None) -> List[ReplicaSnapshot]:
+        if class_division is None:
+            rows = self._conn().execute("SELECT path, data FROM docs WHERE collection = ?", (collection,))
+        else:
+            rows = self._conn().execute(
+                "SELECT path, data FROM docs WHERE collection = ? AND class_division = ?", (collection, class_division),
+            )
+        return [_snapshot(path, data) for path, data in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT collection, COUNT(*) FROM docs GROUP BY collection"))
+        synced = dict(conn.execute("SELECT collection, synced_at FROM sync_state"))
+        lease = conn.execute("SELECT owner, expires FROM lease WHERE name = 'sync'").fetchone()
+        now = time.time()
+        return {
+            "path": self.path,
+            "syncer": lease[0] if lease and lease[1] > now else None,
+            "collections": {
+                c: {"docs": counts.get(c, 0),
+                    "staleness_s": round(now - synced[c], 1) if c in synced else None}
+                for c in REPLICATED
+            },
+        }
+
+    # -- writes (syncer only) ----------------------------------------------
+    def apply(self, collection: str, upserts: Iterable[Any], removed: Iterable[str] = (), reset: bool = False) -> None:
+        """
+        Store Firestore snapshots and drop removed paths in one transaction.
+        A snapshot older than the stored copy is ignored. reset replaces the
+        whole collection (a listener's first snapshot).
+        """
+        rows = [(
+            s.reference.path, collection, s.id, _timestamp(s.update_time),
+            str((s.to_dict() or {}).get("classDivision") or "").strip().upper() or None,
+            dump_document(s.to_dict() or {}, s.update_time),
+        ) for s in upserts]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if reset:
+                conn.execute("DELETE FROM docs WHERE collection = ?", (collection,))
+            conn.executemany(
+                "INSERT INTO docs (path, collection, id, update_time, class_division, data) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET update_time = excluded.update_time, "
+                "class_division = excluded.class_division, data = excluded.data "
+                "WHERE excluded.update_time >= docs.update_time",
+                rows,
+            )
+            conn.executemany("DELETE FROM docs WHERE path = ?", [(p,) for p in removed])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def mark_synced(self, collections: Iterable[str], synced_at: Optional[float] = None) -> None:
+        """Record that collections are in step with Firestore as of synced_at (default now)."""
+        at = time.time() if synced_at is None else synced_at
+        self._conn().executemany(
+            "INSERT INTO sync_state (collection, synced_at) VALUES (?, ?) "
+            "ON CONFLICT(collection) DO UPDATE SET synced_at = MAX(synced_at, excluded.synced_at)",
+            [(c, at) for c in collections],
+        )
+
+    def expire(self, collections: Iterable[str]) -> None:
+        """Stop serving collections until they are marked synced again."""
+        self._conn().executemany("DELETE FROM sync_state WHERE collection = ?", [(c,) for c in collections])
+
+    def take_lease(self, owner: str) -> bool:
+        """Take or renew the syncer lease; False while another process holds it."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO lease (name, owner, expires) VALUES ('sync', ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE lease.owner = excluded.owner OR lease.expires < ?",
+            (owner, now + LEASE_SECONDS, now),
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, owner: str) -> None:
+        self._conn().execute("DELETE FROM lease WHERE name = 'sync' AND owner = ?", (owner,))
+
+
+def _snapshot(path: str, text: str) -> ReplicaSnapshot:
+    data, update_time = load_document(text)
+    return ReplicaSnapshot(path, data, update_time)
+
+
+# -- sync ---------------------------------------------------------------------
+class ReplicaSync(threading.Thread):
+    """
+    Keeps the replica in step with Firestore through one snapshot listener
+    per replicated collection: the first snapshot loads the collection,
+    later ones carry only the documents whose update_time changed (and
+    removals). Firestore cannot query by update_time directly; the
+    listener's resume token does that bookkeeping.
+
+    One process per replica file syncs, the holder of the lease row; the
+    others only read. It stamps sync_state, which readers compare with
+    their freshness bound: with the read time of every snapshot it applies,
+    and every HEARTBEAT_SECONDS with the current time for each collection
+    whose listener is still active and has loaded it. A collection that
+    sees no writes is thus served locally as long as its listener lives.
+    A listener that fails (it stops being active) or a snapshot that cannot
+    be applied expires the collection at once, until a new listener has
+    reloaded it. If the holder dies or hangs, its stamps stop and age past
+    the readers' bound, and another process takes over when the lease
+    expires (renewed every HEARTBEAT_SECONDS).
+    """
+
+    def __init__(self, replica: RosterReplica, db, collections: Optional[List[str]] = None):
+        super().__init__(name="catalog-replica-sync", daemon=True)
+        self.replica = replica
+        self.db = db
+        self.collections = collections if collections is not None else _replicated_collections()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.last_error: Optional[str] = None
+        self._watches: Dict[str, Any] = {}
+        self._loaded: Set[str] = set()
+        self._state_lock = threading.Lock()  # _loaded and the stamps, across listener threads
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.is_set():
+            try:
+                if self.replica.take_lease(self.owner):
+                    self._ensure_watches()
+                    self._mark_live()
+                else:
+                    self._close_watches()
+            except Exception as e:  # keep syncing; readers fall back to Firestore meanwhile
+                self.last_error = f"{type(e).__name__}: {e}"
+            self._done.wait(HEARTBEAT_SECONDS)
+        self._close_watches()
+        try:
+            self.replica.release_lease(self.owner)
+        except sqlite3.Error:
+            pass
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._done.set()
+        self.join(timeout)
+
+    def _ensure_watches(self) -> None:
+        for collection in self.collections:
+            watch = self._watches.get(collection)
+            if watch is not None and watch.is_active:
+                continue
+            with self._state_lock:
+                self._loaded.discard(collection)
+            if watch is not None:  # the listener failed: not served until reloaded
+                self.replica.expire([collection])
+            query = self.db.collection(collection)
+            for field, op, value in REPLICATED[collection]:
+                query = query.where(field, op, value)
+            self._watches[collection] = query.on_snapshot(self._callback(collection))
+
+    def _close_watches(self) -> None:
+        for watch in self._watches.values():
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        self._watches.clear()
+        with self._state_lock:
+            self._loaded.clear()
+
+    def _mark_live(self) -> None:
+        # Snapshots only come with changes; a live listener that has loaded
+        # its collection vouches for it between them
+        with self._state_lock:
+            live = [c for c in self._loaded if self._watches.get(c) is not None and self._watches[c].is_active]
+            if live:
+                self.replica.mark_synced(live)
+
+    def _callback(self, collection: str):
+        def on_snapshot(docs, changes, read_time) -> None:
+            with self._state_lock:
+                try:
+                    if collection not in self._loaded:
+                        self.replica.apply(collection, docs, reset=True)
+                        self._loaded.add(collection)
+                    else:
+                        changed = [c.document for c in changes if c.type.name != "REMOVED"]
+                        removed = [c.document.reference.path for c in changes if c.type.name == "REMOVED"]
+                        self.replica.apply(collection, changed, removed)
+                    self.replica.mark_synced([collection], _timestamp(read_time) or None)
+                except Exception as e:
+                    # The replica may have missed this change: reload from the
+                    # next snapshot (it lists every document) and serve nothing until then
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    self._loaded.discard(collection)
+                    try:
+                        self.replica.expire([collection])
+                    except sqlite3.Error:
+                        pass
+        return on_snapshot
+
+
+# -- client facades ---------------------------------------------------------------
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Firestore's cross-type order: null, booleans, numbers, timestamps, strings
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if hasattr(value, "timestamp"):
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    return (5, repr(value))
+
+
+class _LocalQuery:
+    """Filters, projection and order of one query, replayable locally or on Firestore."""
+
+    def __init__(self, path: str, filters=(), fields=None, orders=()):
+        self.path = path
+        self.filters: Tuple = tuple(filters)
+        self.fields = fields
+        self.orders: Tuple = tuple(orders)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None) -> "_LocalQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return _LocalQuery(self.path, self.filters + ((field_path, op_string, value),), self.fields, self.orders)
+
+    def select(self, field_paths) -> "_LocalQuery":
+        return _LocalQuery(self.path, self.filters, list(field_paths), self.orders)
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "_LocalQuery":
+        return _LocalQuery(self.path, self.filters, self.fields, self.orders + ((field_path, direction),))
+
+    def servable(self) -> bool:
+        # Equality filters only, and at least the listener's own
+        return (all(op == "==" for _f, op, _v in self.filters)
+                and set(REPLICATED[self.path]) <= set(self.filters))
+
+    def run(self, replica: RosterReplica) -> List[ReplicaSnapshot]:
+        cd = next((v for f, op, v in self.filters if f == "classDivision"), None)
+        docs = replica.scan(self.path, str(cd).strip().upper() if cd is not None else None)
+        docs = [d for d in docs if all(_field(d._data, f) == v for f, _op, v in self.filters)]
+        # Ordered queries leave out documents without the order field; ties go by document ID
+        docs = [d for d in docs if all(_field(d._data, f) is not _MISSING for f, _d in self.orders)]
+        docs.sort(key=lambda d: d.id)
+        for field, direction in reversed(self.orders):
+            docs.sort(key=lambda d: _sort_key(_field(d._data, field)), reverse=direction == "DESCENDING")
+        if self.fields is not None:
+            for d in docs:
+                d._data = {f: v for f in self.fields if (v := _field(d._data, f)) is not _MISSING}
+        return docs
+
+    def on(self, db):
+        query = db.collection(self.path)
+        for field, op, value in self.filters:
+            query = query.where(field, op, value)
+        if self.fields is not None:
+            query = query.select(self.fields)
+        for field, direction in self.orders:
+            query = query.order_by(field, direction=direction)
+        return query
+
+
+class _Query(_LocalQuery):
+    def __init__(self, client: "ReplicaClient", path: str, filters=(), fields=None, orders=()):
+        super().__init__(path, filters, fields, orders)
+        self._client = client
+
+    def _wrap(self, q: _LocalQuery):
+        return type(self)(self._client, q.path, q.filters, q.fields, q.orders)
+
+    def where(self, *args, **kw):
+        return self._wrap(super().where(*args, **kw))
+
+    def select(self, field_paths):
+        return self._wrap(super().select(field_paths))
+
+    def order_by(self, *args, **kw):
+        return self._wrap(super().order_by(*args, **kw))
+
+    def document(self, document_id: str):
+        return _DocumentRef(self._client, f"{self.path}/{document_id}")
+
+
+class _DocumentRef:
+    def __init__(self, client: "ReplicaClient", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self, field_paths=None, **kw):
+        snap = self._client.replica.get(self.path)
+        if snap is not None:
+            return snap
+        return self._client.db.document(self.path).get(field_paths, **kw)
+
+
+class _Collection(_Query):
+    def stream(self, **kw) -> Iterator[Any]:
+        if self.servable():
+            return iter(self.run(self._client.replica))
+        return self.on(self._client.db).stream(**kw)
+
+    def get(self, **kw) -> List[Any]:
+        return list(self.stream(**kw))
+
+
+class ReplicaClient:
+    """
+    Sync Firestore client facade for one request: documents and queries of
+    the collections in `fresh` come from the replica, everything else (and
+    documents the replica does not have) from db.
+    """
+
+    def __init__(self, replica: RosterReplica, db, fresh: Set[str]):
+        self.replica = replica
+        self.db = db
+        self.fresh = fresh
+
+    def collection(self, path: str):
+        path = path.strip("/")
+        return _Collection(self, path) if path in self.fresh else self.db.collection(path)
+
+    def document(self, path: str):
+        path = path.strip("/")
+        if path.rsplit("/", 1)[0] in self.fresh:
+            return _DocumentRef(self, path)
+        return self.db.document(path)
+
+    def _split(self, refs: List[Any], local: Dict[str, ReplicaSnapshot]) -> List[Any]:
+        # References get_all must still read from Firestore
+        return [self.db.document(r.path) if isinstance(r, _DocumentRef) else r
+                for r in refs if r.path not in local]
+
+    def get_all(self, references, field_paths=None, **kw) -> Iterator[Any]:
+        refs = list(references)
+        local = self.replica.get_many(r.path for r in refs if isinstance(r, _DocumentRef))
+        missing = self._split(refs, local)
+        yield from local.values()
+        if missing:
+            yield from self.db.get_all(missing, field_paths, **kw)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.db, name)
+
+
+class _AsyncDocumentRef(_DocumentRef):
+    async def get(self, field_paths=None, **kw):
+        snap = await asyncio.to_thread(self._client.replica.get, self.path)
+        if snap is not None:
+            return snap
+        return await self._client.db.document(self.path).get(field_paths, **kw)
+
+
+class _AsyncCollection(_Query):
+    def document(self, document_id: str):
+        return _AsyncDocumentRef(self._client, f"{self.path}/{document_id}")
+
+    async def stream(self, **kw):
+        if self.servable():
+            for d in await asyncio.to_thread(self.run, self._client.replica):
+                yield d
+            return
+        async for d in self.on(self._client.db).stream(**kw):
+            yield d
+
+
+class AsyncReplicaClient(ReplicaClient):
+    """
+    ReplicaClient over the AsyncClient. Replica lookups (SQLite reads and
+    JSON decoding) run in a thread, off the event loop.
+    """
+
+    def collection(self, path: str):
+        path = path.strip("/")
+        return _AsyncCollection(self, path) if path in self.fresh else self.db.collection(path)
+
+    def document(self, path: str):
+        path = path.strip("/")
+        if path.rsplit("/", 1)[0] in self.fresh:
+            return _AsyncDocumentRef(self, path)
+        return self.db.document(path)
+
+    async def get_all(self, references, field_paths=None, **kw):
+        refs = list(references)
+        local = await asyncio.to_thread(self.replica.get_many,
+                                        [r.path for r in refs if isinstance(r, _DocumentRef)])
+        missing = self._split(refs, local)
+        for s in local.values():
+            yield s
+        if missing:
+            async for s in self.db.get_all(missing, field_paths, **kw):
+                yield s
+
+
+# -- process-wide -------------------------------------------------------------
+_replica: Optional[RosterReplica] = None
+_sync: Optional[ReplicaSync] = None
+_lock = threading.Lock()
+
+
+def get_replica() -> Optional[RosterReplica]:
+    """The replica at CATALOG_REPLICA_PATH, or None when that is unset."""
+    global _replica
+    path = replica_path()
+    if path is None:
+        return None
+    with _lock:
+        if _replica is None or _replica.path != path:
+            _replica = RosterReplica(path)
+        return _replica
+
+
+def _fresh(max_staleness: Optional[float]) -> Tuple[Optional[RosterReplica], Set[str]]:
+    replica = get_replica()
+    if replica is None:
+        return None, set()
+    bound = default_max_staleness() if max_staleness is None else max_staleness
+    try:
+        return replica, replica.fresh_collections(bound)
+    except sqlite3.Error:
+        return None, set()  # Firestore is the source of truth; a broken replica only costs reads
+
+
+def replica_db(db, max_staleness: Optional[float] = None):
+    """
+    db, or a ReplicaClient over it serving the collections synced within
+    max_staleness seconds (default CATALOG_REPLICA_MAX_STALENESS; 0 reads
+    Firestore only).
+    """
+    replica, fresh = _fresh(max_staleness)
+    return ReplicaClient(replica, db, fresh) if fresh else db
+
+
+async def replica_async_db(adb, max_staleness: Optional[float] = None):
+    """replica_db for the AsyncClient; the freshness check runs in a thread."""
+    if replica_path() is None:
+        return adb
+    replica, fresh = await asyncio.to_thread(_fresh, max_staleness)
+    return AsyncReplicaClient(replica, adb, fresh) if fresh else adb
+
+
+def replica_sync_enabled() -> bool:
+    return replica_path() is not None and os.environ.get("CATALOG_REPLICA_SYNC", "1").strip() != "0"
+
+
+def start_replica_sync(db) -> Optional[ReplicaSync]:
+    """
+    Start this process's syncer (CATALOG_REPLICA_SYNC=0 makes a process a
+    pure reader). Every server worker may call it; one holds the lease.
+    """
+    global _sync
+    replica = get_replica()
+    if replica is None or not replica_sync_enabled():
+        return None
+    with _lock:
+        if _sync is None or not _sync.is_alive():
+            _sync = ReplicaSync(replica, db)
+            _sync.start()
+        return _sync
+
+
+def stop_replica_sync() -> None:
+    global _sync
+    with _lock:
+        sync, _sync = _sync, None
+    if sync is not None:
+        sync.stop(timeout=10)
+
+
+def replica_stats() -> Optional[Dict[str, Any]]:
+    replica = get_replica()
+    if replica is None:
+        return None
+    out = replica.stats()
+    if _sync is not None:
+        out["last_error"] = _sync.last_error
+    return out
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import threading
+import weakref
+from copy import copy
+from typing import Callable, Dict, Any, Hashable, List, Optional, Tuple
+from openpyxl import Workbook
+from openpyxl.cell import Cell, MergedCell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.worksheet.worksheet import Worksheet
+
+
+class SheetTemplate:
+    """
+    Frozen copy of a built worksheet: cell values and styles, merges,
+    row/column sizes, page setup and images. Building the sheet the normal
+    way re-computes every border and merge; stamping a template only copies
+    the finished result into another workbook.
+    """
+
+    def __init__(self, ws: Worksheet):
+        wb = ws.parent
+        # Style objects are per-workbook indexes; keep the objects themselves
+        # so they can be re-registered in whatever workbook gets stamped.
+        self._styles: List[Tuple[Any, ...]] = []
+        style_keys: Dict[Tuple[int, ...], int] = {}
+        self._cells: List[Tuple[int, int, Any, str, bool, Optional[int]]] = []
+        for (row, col), cell in sorted(ws._cells.items()):
+            style_idx = None
+            if cell.has_style:
+                key = tuple(cell._style)
+                style_idx = style_keys.get(key)
+                if style_idx is None:
+                    arr = cell._style
+                    style_idx = style_keys[key] = len(self._styles)
+                    self._styles.append((
+                        wb._fonts[arr.fontId], wb._fills[arr.fillId], wb._borders[arr.borderId],
+                        wb._alignments[arr.alignmentId], wb._protections[arr.protectionId],
+                        arr.numFmtId, arr.pivotButton, arr.quotePrefix, arr.xfId,
+                    ))
+            self._cells.append((row, col, cell._value, cell.data_type, isinstance(cell, MergedCell), style_idx))
+
+        self._merged = list(ws.merged_cells.ranges)
+        self._row_heights = {i: d.ht for i, d in ws.row_dimensions.items() if d.ht is not None}
+        self._col_widths = {k: d.width for k, d in ws.column_dimensions.items()}
+        self._paper_size = ws.page_setup.paperSize
+        m = ws.page_margins
+        self._margins = (m.left, m.right, m.top, m.bottom)
+        self._images = [(img, img.anchor) for img in ws._images]
+        self._last_arrays: Optional[Tuple[Any, List[StyleArray]]] = None
+
+    def _style_arrays(self, wb: Workbook) -> List[StyleArray]:
+        # Workbooks holding several copies (one per month) register the
+        # styles once; callers copy an array before changing it
+        last = self._last_arrays
+        if last is not None and last[0]() is wb:
+            return last[1]
+
+        # Style objects hash recursively, so register each shared one only once
+        ids: Dict[int, int] = {}
+
+        def add(registry, obj) -> int:
+            idx = ids.get(id(obj))
+            if idx is None:
+                idx = ids[id(obj)] = registry.add(obj)
+            return idx
+
+        arrays = []
+        for font, fill, border, alignment, protection, num_fmt_id, pivot, quote, xf_id in self._styles:
+            arr = StyleArray()
+            arr.fontId = add(wb._fonts, font)
+            arr.fillId = add(wb._fills, fill)
+            arr.borderId = add(wb._borders, border)
+            arr.alignmentId = add(wb._alignments, alignment)
+            arr.protectionId = add(wb._protections, protection)
+            arr.numFmtId = num_fmt_id  # templates only use built-in number formats
+            arr.pivotButton = pivot
+            arr.quotePrefix = quote
+            arr.xfId = xf_id
+            arrays.append(arr)
+        self._last_arrays = (weakref.ref(wb), arrays)
+        return arrays
+
+    def _apply_sheet_setup(self, ws) -> None:
+        ws.page_setup.paperSize = self._paper_size
+        m = ws.page_margins
+        m.left, m.right, m.top, m.bottom = self._margins
+        for key, width in self._col_widths.items():
+            ws.column_dimensions[key].width = width
+        for img, anchor in self._images:
+            # Shallow copy: shares the image source, avoids re-reading it
+            ws.add_image(copy(img), anchor)
+
+    def stamp(self, wb: Workbook, title: str, index: Optional[int] = None) -> Worksheet:
+        """Create a new sheet in wb that is a copy of the template."""
+        ws = wb.create_sheet(title, index)
+        self._apply_sheet_setup(ws)
+
+        arrays = self._style_arrays(wb)
+        cells = ws._cells
+        for row, col, value, data_type, merged, style_idx in self._cells:
+            if merged:
+                cell = MergedCell(ws, row, col)
+            else:
+                cell = Cell(ws, row=row, column=col)
+                cell._value = value
+                cell.data_type = data_type
+            if style_idx is not None:
+                cell._style = copy(arrays[style_idx])
+            cells[(row, col)] = cell
+
+        for mcr in self._merged:
+            # MergedCellRange() would re-derive edge borders the cells already carry
+            new = MergedCellRange.__new__(MergedCellRange)
+            new.__dict__.update(mcr.__dict__)
+            new.ws = ws
+            new.start_cell = cells[(new.min_row, new.min_col)]
+            ws.merged_cells.ranges.add(new)
+        for idx, ht in self._row_heights.items():
+            ws.row_dimensions[idx].height = ht
+        return ws
+
+    def stream_into(self, ws, values: Optional[Dict[Tuple[int, int], Tuple[Any, Any, Any]]] = None) -> None:
+        """
+        Write the template into an empty write-only worksheet, row by row.
+        values maps (row, col) to (value, font, alignment); a font or
+        alignment of None keeps the template's.
+        """
+        wb = ws.parent
+        self._apply_sheet_setup(ws)
+        for mcr in self._merged:
+            ws.merged_cells.add(CellRange(mcr.coord))
+
+        arrays = self._style_arrays(wb)
+        rows: Dict[int, Dict[int, Tuple[Any, Optional[StyleArray]]]] = {}
+        for row, col, value, _data_type, _merged, style_idx in self._cells:
+            rows.setdefault(row, {})[col] = (value, arrays[style_idx] if style_idx is not None else None)
+
+        for (row, col), (value, font, alignment) in (values or {}).items():
+            _old_value, arr = rows.setdefault(row, {}).get(col, (None, None))
+            if font is not None or alignment is not None:
+                arr = copy(arr) if arr is not None else StyleArray()
+                if font is not None:
+                    arr.fontId = wb._fonts.add(font)
+                if alignment is not None:
+                    arr.alignmentId = wb._alignments.add(alignment)
+            rows[row][col] = (value, arr)
+
+        last_row = max([*rows, *self._row_heights], default=0)
+        for r in range(1, last_row + 1):
+            if r in self._row_heights:
+                ws.row_dimensions[r].height = self._row_heights[r]
+            cols = rows.get(r, {})
+            out: List[Any] = [None] * max(cols, default=0)
+            for col, (value, arr) in cols.items():
+                cell = WriteOnlyCell(ws, value)
+                if arr is not None:
+                    cell._style = arr
+                out[col - 1] = cell
+            ws.append(out)
+
+
+_templates: Dict[Hashable, SheetTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_sheet_template_fn(key: Hashable, build: Callable[[Worksheet], None]) -> SheetTemplate:
+    """
+    Returns the template cached under key, building it on first use by
+    calling build(ws) on a scratch worksheet. Templates live for the
+    lifetime of the process.
+    """
+    tpl = _templates.get(key)
+    if tpl is not None:
+        return tpl
+    with _templates_lock:
+        tpl = _templates.get(key)
+        if tpl is None:
+            scratch = Workbook()
+            ws = scratch.active
+            build(ws)
+            tpl = _templates[key] = SheetTemplate(ws)
+        return tpl
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Concurrent callers with the same key share one run of a coroutine: the
+    first starts it, later ones wait for its result (or exception) instead
+    of running their own. The key is forgotten as soon as the run ends, so
+    this never serves stale results; caching is report_cache_fn's job.
+
+    The run is a task of its own and callers wait through asyncio.shield,
+    so a caller that goes away (client disconnect) does not cancel it for
+    the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Any, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()  # stats are read from other threads
+        self._stats = {"runs": 0, "joined": 0}
+
+    async def do(self, key: Hashable, run: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(result, joined): joined is True when another caller's run was shared."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(loop_key)
+        joined = task is not None
+        if task is None:
+            task = asyncio.ensure_future(run())
+            self._calls[loop_key] = task
+            task.add_done_callback(lambda t: self._finished(loop_key, t))
+        with self._lock:
+            self._stats["joined" if joined else "runs"] += 1
+        return await asyncio.shield(task), joined
+
+    def _finished(self, loop_key, task: asyncio.Task) -> None:
+        if self._calls.get(loop_key) is task:
+            del self._calls[loop_key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        out["in_flight"] = len(self._calls)
+        return out
@@ -0,0 +1,218 @@
+from __future__ import annotations
+import json
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+from .demographics_fn import demographic_counts, merge_demographics
+from .report_data_fn import (
+    STUDENT_FIELDS, is_historical, live_roster_query, roll_no_key, roster_record_id,
+    split_class_division, class_division_sort_key,
+)
+from .report_metrics_fn import count_reads
+
+# Firestore limits: 500 writes per batch, 10 MiB per request, 1 MiB per document
+MAX_BATCH_WRITES = 500
+MAX_BATCH_BYTES = 9 * 1024 * 1024
+MAX_DOC_BYTES = 1024 * 1024 - 16 * 1024  # headroom for field names and indexes
+
+# roster_summaries/{YYYY}-{MM}: {"classes": {classDiv: demographics}}, kept
+# up to date by every freeze so a whole-school summary is one document read
+SUMMARY_COLLECTION = 'roster_summaries'
+
+
+def _frozen_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Same fields the report prints; dob stays a Firestore Timestamp
+    return {k: row[k] for k in STUDENT_FIELDS if k in row}
+
+
+def _approx_size(data: Dict[str, Any]) -> int:
+    return len(json.dumps(data, default=str, ensure_ascii=False).encode())
+
+
+def snapshot_record(class_division_str: str, rows: List[Dict[str, Any]], year: int, month: int) -> Dict[str, Any]:
+    """roster_records document for one class-month; studentsData is what historical reports read."""
+    return {
+        "classDivision": class_division_str,
+        "year": year,
+        "month": month,
+        "studentCount": len(rows),
+        "frozenAt": datetime.now(timezone.utc),
+        "demographics": demographic_counts(rows),
+        "studentsData": rows,
+    }
+
+
+def summary_record_id(year: int, month: int) -> str:
+    return f"{year}-{str(month).zfill(2)}"
+
+
+def group_live_rosters(db, class_divisions: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Every active student in one unordered query (an ordered one would skip
+    students without a rollNo), grouped by classDivision and sorted in
+    roll-number order, missing rollNo last.
+    """
+    wanted = {cd.strip().upper() for cd in class_divisions} if class_divisions else None
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    n = 0
+    for d in live_roster_query(db).stream():
+        n += 1
+        row = d.to_dict() or {}
+        cd = str(row.get('classDivision') or '').strip().upper()
+        if not split_class_division(cd) or (wanted is not None and cd not in wanted):
+            continue
+        grouped.setdefault(cd, []).append(_frozen_row(row))
+    count_reads("students", max(1, n))
+    for rows in grouped.values():
+        rows.sort(key=roll_no_key)
+    return grouped
+
+
+def freeze_month_snapshots_fn(
+    db,
+    year: int,
+    month: int,
+    class_divisions: Optional[List[str]] = None,
+    overwrite: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Freezes the live roster of every active class-division (or just
+    class_divisions) into roster_records/{classDiv}_{YYYY}-{MM}.
+
+    One query reads the whole school, one batched read finds snapshots that
+    already exist (kept unless overwrite), and the new documents go out in
+    as few batched writes as Firestore's limits allow. Without overwrite,
+    documents are created rather than set, so a concurrent freeze of the
+    same month fails its batch instead of replacing history.
+
+    Each batch also merges its classes' demographics into
+    roster_summaries/{YYYY}-{MM}, so the index moves with the snapshots.
+    """
+    grouped = group_live_rosters(db, class_divisions)
+    order = sorted(grouped, key=class_division_sort_key)
+    rec_ref = db.collection('roster_records')
+    refs = {cd: rec_ref.document(roster_record_id(cd, year, month)) for cd in order}
+    summary_ref = db.collection(SUMMARY_COLLECTION).document(summary_record_id(year, month))
+
+    existing = set()
+    if refs and not overwrite:
+        existing = {d.id for d in db.get_all(list(refs.values())) if d.exists}
+        count_reads("roster_records", len(refs))
+
+    summary: Dict[str, Any] = {
+        "ok": True, "year": year, "month": month, "dry_run": dry_run,
+        "frozen": [], "skipped_existing": [], "errors": [], "students": 0, "batches": 0,
+    }
+    pending: List[Tuple[str, Any, Dict[str, Any], int]] = []
+    for cd in order:
+        ref = refs[cd]
+        if ref.id in existing:
+            summary["skipped_existing"].append(cd)
+            continue
+        record = snapshot_record(cd, grouped[cd], year, month)
+        size = _approx_size(record)
+        if size > MAX_DOC_BYTES:
+            summary["errors"].append(f"{cd}: roster too large for one document ({size} bytes)")
+            continue
+        pending.append((cd, ref, record, size))
+
+    for chunk in _batches(pending):
+        if dry_run:
+            summary["frozen"] += [cd for cd, *_ in chunk]
+            continue
+        batch = db.batch()
+        for _cd, ref, record, _size in chunk:
+            if overwrite:
+                batch.set(ref, record)
+            else:
+                batch.create(ref, record)
+        batch.set(summary_ref, {"classes": {cd: record["demographics"] for cd, _ref, record, _size in chunk}},
+                  merge=True)
+        try:
+            batch.commit()
+        except Exception as e:
+            summary["errors"] += [f"{cd}: {e}" for cd, *_ in chunk]
+            continue
+        summary["batches"] += 1
+        summary["frozen"] += [cd for cd, *_ in chunk]
+        summary["students"] += sum(len(record["studentsData"]) for _cd, _ref, record, _size in chunk)
+
+    if dry_run:
+        summary["students"] = sum(len(record["studentsData"]) for _cd, _ref, record, _size in pending)
+    summary["ok"] = not summary["errors"]
+    return summary
+
+
+def _batches(pending):
+    # Split by Firestore's per-batch write count and request size limits,
+    # leaving room for the roster_summaries write
+    chunk, chunk_bytes = [], 0
+    for item in pending:
+        size = item[3]
+        if chunk and (len(chunk) >= MAX_BATCH_WRITES - 1 or chunk_bytes + size > MAX_BATCH_BYTES):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(item)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def load_school_summary_fn(db, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Demographics of every class and of the whole school. For a past month
+    they come from the roster_summaries index (one read), or from the
+    month's roster_records snapshots if it was frozen before the index
+    existed; without year/month, from one query over the live roster.
+    """
+    classes: Dict[str, Dict[str, Any]] = {}
+    if not is_historical(month, year):
+        source = "live"
+        for cd, rows in group_live_rosters(db).items():
+            classes[cd] = demographic_counts(rows)
+    else:
+        snap = db.collection(SUMMARY_COLLECTION).document(summary_record_id(year, month)).get()
+        count_reads(SUMMARY_COLLECTION, 1)
+        if snap.exists:
+            source = "index"
+            classes = dict((snap.to_dict() or {}).get("classes") or {})
+        else:
+            source = "snapshots"
+            classes = _summaries_from_snapshots(db, year, month)
+
+    order = sorted(classes, key=class_division_sort_key)
+    return {
+        "ok": bool(classes),
+        "error": None if classes else "No students found",
+        "year": year,
+        "month": month,
+        "source": source,
+        "classes": {cd: classes[cd] for cd in order},
+        "school": merge_demographics(classes[cd] for cd in order),
+    }
+
+
+def _summaries_from_snapshots(db, year: int, month: int) -> Dict[str, Dict[str, Any]]:
+    # Older snapshots carry no demographics (or year/month fields): find the
+    # classes from the catalog docs and count their frozen rosters
+    class_divisions = [d.id for d in db.collection('catalog').select([]).stream() if split_class_division(d.id)]
+    count_reads("catalog", max(1, len(class_divisions)))
+    if not class_divisions:
+        return {}
+    rec_ref = db.collection('roster_records')
+    ids = {roster_record_id(cd, year, month): cd for cd in class_divisions}
+    classes: Dict[str, Dict[str, Any]] = {}
+    for d in db.get_all([rec_ref.document(i) for i in ids]):
+        if not d.exists or d.id not in ids:
+            continue
+        rec = d.to_dict() or {}
+        counts = rec.get('demographics')
+        if not isinstance(counts, dict):
+            rows = rec.get('studentsData')
+            if not isinstance(rows, list) or not rows:
+                continue
+            counts = demographic_counts(r for r in rows if isinstance(r, dict))
+        classes[ids[d.id]] = counts
+    count_reads("roster_records", len(ids))
+    return classes
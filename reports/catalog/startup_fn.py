@@ -0,0 +1,111 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator
+
+from .assets_fn import get_report_assets
+
+# Milliseconds a cold worker may spend per phase; CATALOG_STARTUP_BUDGET
+# overrides them as "import=1500,warmup=4000,first_request=500"
+DEFAULT_BUDGET_MS = {"import": 1500.0, "warmup": 4000.0, "first_request": 500.0}
+
+_stages: Dict[str, float] = {}
+_first_request: Optional[float] = None
+_loaded_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def record_startup(name: str, seconds: float) -> None:
+    with _lock:
+        _stages[name] = seconds
+
+
+@contextmanager
+def startup_stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup(name, time.perf_counter() - start)
+
+
+def note_first_request(seconds: float) -> None:
+    """Wall time of this worker's first report request; later calls are ignored."""
+    global _first_request
+    with _lock:
+        if _first_request is None:
+            _first_request = seconds
+
+
+def startup_budget() -> Dict[str, float]:
+    budget = dict(DEFAULT_BUDGET_MS)
+    for item in os.environ.get("CATALOG_STARTUP_BUDGET", "").split(","):
+        name, _, value = item.partition("=")
+        try:
+            budget[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return budget
+
+
+def warmup_enabled() -> bool:
+    return os.environ.get("CATALOG_WARMUP", "1").strip() != "0"
+
+
+def _warm_render_child(assets_dir: Optional[Path]) -> None:
+    # Pool initializer: the child checks the assets and builds its package
+    # template before it takes a request
+    from .package_template_fn import get_package_template, package_template_enabled
+
+    try:
+        get_report_assets(assets_dir)
+        if package_template_enabled():
+            get_package_template(assets_dir)
+    except Exception:
+        pass  # a child that cannot warm up still renders, only slower
+
+
+def warm_up(assets_dir: Optional[Path]) -> None:
+    """
+    Everything a worker's first request would otherwise wait for: assets
+    read and checked, Firestore clients created, render pool children
+    started with their templates built. Each step is timed into the
+    startup stats.
+    """
+    from .firestore_clients_fn import get_async_db, get_db
+    from .render_executor_fn import get_render_executor
+
+    started = time.perf_counter()
+    with startup_stage("assets"):
+        get_report_assets(assets_dir)
+    with startup_stage("firestore_clients"):
+        get_db()
+        get_async_db()
+    with startup_stage("render_pool"):
+        get_render_executor().warm_up(_warm_render_child, assets_dir)
+    record_startup("warmup", time.perf_counter() - started)
+
+
+def startup_stats(assets_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    This worker's startup phases in ms, its first report request, the
+    budget and which phases went over it. preloaded is True when the app
+    was imported before the worker forked (gunicorn preload_app).
+    """
+    with _lock:
+        stages = {name: round(s * 1000, 1) for name, s in _stages.items()}
+        first = round(_first_request * 1000, 1) if _first_request is not None else None
+    budget = startup_budget()
+    measured = dict(stages, first_request=first)
+    return {
+        "pid": os.getpid(),
+        "preloaded": _loaded_pid != os.getpid(),
+        "stages_ms": stages,
+        "first_request_ms": first,
+        "budget_ms": budget,
+        "over_budget": sorted(n for n, limit in budget.items() if (measured.get(n) or 0) > limit),
+        "assets": get_report_assets(assets_dir).as_dict(),
+    }
@@ -0,0 +1,65 @@
+"""
+The service over the in-memory Firestore stand-in (bench/fake_firestore.py):
+no FIREBASE_KEY, emulator or network needed.
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("CATALOG_RENDER_WORKERS", "2")
+os.environ.setdefault("CATALOG_WARMUP", "0")
+os.environ["CATALOG_CACHE_DISK_MB"] = "0"
+os.environ["CATALOG_CACHE_DIR"] = tempfile.mkdtemp(prefix="catalog-test-cache-")
+os.environ.pop("CATALOG_REPLICA_PATH", None)
+os.environ.pop("CATALOG_DETERMINISTIC", None)
+os.environ.pop("SOURCE_DATE_EPOCH", None)
+
+import pytest  # noqa: E402
+
+from bench.fake_firestore import FakeFirestore  # noqa: E402
+from reports.catalog import firestore_clients_fn  # noqa: E402
+
+
+def _use(db: FakeFirestore) -> FakeFirestore:
+    firestore_clients_fn.set_clients(db=db, async_db=db.async_client(0.0))
+    return db
+
+
+_use(FakeFirestore())  # main skips Firebase initialization once clients are set
+
+
+@pytest.fixture
+def db() -> FakeFirestore:
+    """A fresh, empty Firestore stand-in behind get_db()/get_async_db()."""
+    return _use(FakeFirestore())
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+
+    return main.app
+
+
+@pytest.fixture
+def client(app, db):
+    # No lifespan: tests need neither the warm-up nor the replica syncer
+    from fastapi.testclient import TestClient
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _render_pool():
+    yield
+    from reports.catalog.render_executor_fn import get_render_executor
+
+    get_render_executor().shutdown()
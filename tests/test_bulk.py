@@ -0,0 +1,94 @@
+from __future__ import annotations
+import glob
+import io
+import os
+import tempfile
+import time
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.bulk_report_fn import iter_bulk_catalog_zip
+from reports.catalog.render_executor_fn import get_render_executor
+from reports.catalog.report_data_fn import load_bulk_report_inputs_fn
+
+CLASSES = ["1-A", "1-B", "2-A", "2-B", "3-A", "3-B"]
+
+
+@pytest.fixture
+def school(db):
+    for i, cd in enumerate(CLASSES):
+        seed_firestore(db, cd, 25, 2025, 11, seed=i)
+    return db
+
+
+def _render_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "catalog-*.xlsx")))
+
+
+def _wait_idle(timeout=60.0):
+    executor = get_render_executor()
+    deadline = time.monotonic() + timeout
+    while executor.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_bulk_zip_is_complete_and_valid(school):
+    inputs = load_bulk_report_inputs_fn(school, CLASSES + ["9-Z"], 11, 2025)
+    data = b"".join(iter_bulk_catalog_zip(inputs, None, 11, 2025))
+
+    z = zipfile.ZipFile(io.BytesIO(data))
+    assert z.testzip() is None
+    assert sorted(z.namelist()) == sorted([f"catalog_{cd}_2025-11.xlsx" for cd in CLASSES] + ["errors.txt"])
+    assert "9-Z" in z.read("errors.txt").decode()
+    for cd in CLASSES:
+        wb = load_workbook(io.BytesIO(z.read(f"catalog_{cd}_2025-11.xlsx")), read_only=True)
+        assert wb.sheetnames == ["Front Page", "Catalog", "Back Page"]
+        wb.close()
+
+
+def test_bulk_reads_only_named_classes(school):
+    reads = school.reads
+    inputs = load_bulk_report_inputs_fn(school, ["1-a", "3-B"])
+    assert sorted(i["class_division"] for i in inputs) == ["1-A", "3-B"]
+    assert school.reads - reads < 25 * 3  # the other four classes' students were not read
+
+
+def test_bulk_keeps_renders_in_flight_bounded(school, monkeypatch):
+    monkeypatch.setenv("CATALOG_BULK_IN_FLIGHT", "2")
+    executor = get_render_executor()
+    seen = []
+    submit = executor.submit
+
+    def counting_submit(*args, **kwargs):
+        seen.append(executor.stats()["in_flight"])
+        return submit(*args, **kwargs)
+
+    monkeypatch.setattr(executor, "submit", counting_submit)
+    inputs = load_bulk_report_inputs_fn(school, None)
+    chunks = iter_bulk_catalog_zip(inputs)
+    next(chunks)
+    assert len(seen) <= 3  # two submitted up front, one more per finished class
+    b"".join(chunks)
+    assert len(seen) == len(CLASSES)
+    assert max(seen) < 2
+
+
+def test_cancelled_bulk_export_leaves_no_files(school, monkeypatch):
+    monkeypatch.setenv("CATALOG_BULK_IN_FLIGHT", "2")
+    _wait_idle()
+    before = _render_files()
+    inputs = load_bulk_report_inputs_fn(school, None)
+
+    chunks = iter_bulk_catalog_zip(inputs)
+    next(chunks)  # first class in, the next ones rendering
+    chunks.close()  # client went away
+
+    _wait_idle()
+    deadline = time.monotonic() + 10
+    while _render_files() - before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _render_files() - before == set()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import datetime
+import io
+import zipfile
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.deterministic_output_fn import ZIP_EPOCH, output_timestamp, report_timestamp
+from reports.catalog.generate_full_report_fn import generate_catalog_report
+from reports.catalog.report_data_fn import load_report_inputs_fn
+
+
+def _entry_dates(data):
+    return {info.date_time for info in zipfile.ZipFile(io.BytesIO(data)).infolist()}
+
+
+def test_live_report_is_dated_by_the_month_it_prints(db, monkeypatch):
+    monkeypatch.setenv("CATALOG_DETERMINISTIC", "1")
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    today = datetime.date.today()
+
+    inputs = load_report_inputs_fn(db, 5, "A")
+    assert report_timestamp(inputs) == datetime.datetime(today.year, today.month, 1)
+
+    first = generate_catalog_report(5, "A", incremental=False)["bytes"]
+    assert _entry_dates(first) == {(today.year, today.month, 1, 0, 0, 0)}
+    assert generate_catalog_report(5, "A", incremental=False)["bytes"] == first
+
+
+def test_historical_report_is_dated_by_its_month(db, monkeypatch):
+    monkeypatch.setenv("CATALOG_DETERMINISTIC", "1")
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    out = generate_catalog_report(5, "A", selected_month=11, selected_year=2025, use_cache=False)
+    assert _entry_dates(out["bytes"]) == {(2025, 11, 1, 0, 0, 0)}
+
+
+def test_source_date_epoch_wins(db, monkeypatch):
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    inputs = load_report_inputs_fn(db, 5, "A")
+    assert report_timestamp(inputs) == datetime.datetime(2023, 11, 14, 22, 13, 20)
+
+
+def test_deterministic_output_is_opt_in(db, monkeypatch):
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    inputs = load_report_inputs_fn(db, 5, "A")
+    assert output_timestamp([inputs]) is None
+    monkeypatch.setenv("CATALOG_DETERMINISTIC", "1")
+    assert output_timestamp([inputs]) > ZIP_EPOCH
+    assert output_timestamp([inputs], deterministic=False) is None
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import io
+import zipfile
+
+from bench.synthetic_roster import seed_firestore
+
+STUDENTS = "catalog/global/students"
+
+
+def _generate(client, headers=None):
+    return client.post("/generate", json={"class_no": 5, "division": "A"}, headers=headers or {})
+
+
+def _historical(client, headers=None):
+    body = {"class_no": 5, "division": "A", "selected_year": 2025, "selected_month": 11}
+    return client.post("/generate-historical-report", json=body, headers=headers or {})
+
+
+def test_live_report_not_modified_until_roster_changes(client, db):
+    seed_firestore(db, "5-A", 20, 2025, 11)
+    first = _generate(client)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert zipfile.ZipFile(io.BytesIO(first.content)).testzip() is None
+
+    again = _generate(client, {"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    # Listed validators match too
+    assert _generate(client, {"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    db.collection(STUDENTS).document("5-A-10003").update({"fullNameMr": "बदललेले नाव"})
+    changed = _generate(client, {"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_historical_report_etag(client, db):
+    seed_firestore(db, "5-A", 20, 2025, 11)
+    first = _historical(client)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert _historical(client, {"If-None-Match": etag}).status_code == 304
+    assert _historical(client, {"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_etag_is_weak_unless_output_is_deterministic(client, db, monkeypatch):
+    seed_firestore(db, "5-A", 20, 2025, 11)
+    weak = _generate(client).headers["etag"]
+    assert weak.startswith('W/"')
+
+    monkeypatch.setenv("CATALOG_DETERMINISTIC", "1")
+    first = _generate(client)
+    strong = first.headers["etag"]
+    assert strong == weak.removeprefix("W/")
+    assert _generate(client).content == first.content  # same bytes for a strong validator
+
+    # Weak comparison: either form is a match in either mode
+    assert _generate(client, {"If-None-Match": weak}).status_code == 304
+    monkeypatch.delenv("CATALOG_DETERMINISTIC")
+    assert _generate(client, {"If-None-Match": strong}).status_code == 304
+
+
+def test_missing_class_has_no_etag(client, db):
+    seed_firestore(db, "5-A", 5, 2025, 11)
+    r = client.post("/generate", json={"class_no": 9, "division": "Z"}, headers={"If-None-Match": "*"})
+    assert r.status_code == 400
+    assert "etag" not in r.headers
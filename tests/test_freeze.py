@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.snapshot_freeze_fn import group_live_rosters
+
+STUDENTS = "catalog/global/students"
+
+
+def test_freeze_keeps_students_without_roll_no(db):
+    seed_firestore(db, "5-A", 6, 2025, 11)
+    seed_firestore(db, "6-A", 3, 2025, 11)
+    students = db.collection(STUDENTS)
+    # Sorts before every seeded id, and has no rollNo
+    students.document("0-no-roll").set({
+        "status": "active", "classDivision": "5-A", "regNo": 1, "fullNameMr": "नवीन", "gender": "मुलगा",
+    })
+    students.document("5-A-10002").update({"rollNo": 9})
+
+    grouped = group_live_rosters(db)
+    assert [s.get("rollNo") for s in grouped["5-A"]] == [1, 2, 4, 5, 6, 9, None]
+    assert [s.get("rollNo") for s in grouped["6-A"]] == [1, 2, 3]
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.generate_full_report_fn import generate_catalog_report
+from reports.catalog.incremental_render_fn import incremental_stats
+
+STUDENTS = "catalog/global/students"
+
+
+@pytest.fixture(autouse=True)
+def _deterministic(monkeypatch):
+    # Byte comparisons need output that does not depend on the clock
+    monkeypatch.setenv("CATALOG_DETERMINISTIC", "1")
+
+
+def _report(class_no, division, incremental):
+    out = generate_catalog_report(class_no, division, incremental=incremental)
+    assert out["ok"], out["error"]
+    return out["bytes"]
+
+
+@pytest.mark.parametrize("edit", [
+    {"fullNameMr": "नवीन नाव"},
+    {"motherName": "सीता", "caste": "मराठा"},
+    {"dob": None},
+])
+def test_patched_report_matches_full_render(db, edit):
+    seed_firestore(db, "6-B", 40, 2025, 11)
+    _report(6, "B", incremental=True)  # remembered for the class
+    before = incremental_stats()["patched"]
+
+    db.collection(STUDENTS).document("6-B-10007").update(edit)
+    patched = _report(6, "B", incremental=True)
+    assert incremental_stats()["patched"] == before + 1
+    assert patched == _report(6, "B", incremental=False)
+
+
+def test_roster_change_falls_back_to_full_render(db):
+    seed_firestore(db, "7-C", 30, 2025, 11)
+    _report(7, "C", incremental=True)
+    before = incremental_stats()["patched"]
+
+    db.collection(STUDENTS).document("7-C-10002").update({"status": "left"})
+    shorter = _report(7, "C", incremental=True)
+    assert incremental_stats()["patched"] == before
+    assert shorter == _report(7, "C", incremental=False)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import datetime
+import io
+import zipfile
+
+from openpyxl import load_workbook
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.package_template_fn import get_package_template, write_report_package
+from reports.catalog.report_data_fn import load_report_inputs_fn
+
+
+def test_only_per_request_parts_are_compressed(db, monkeypatch):
+    seed_firestore(db, "5-A", 30, 2025, 11)
+    inputs = load_report_inputs_fn(db, 5, "A")
+    get_package_template()  # built, and its static parts compressed, up front
+
+    compressed = []
+    get_compressor = zipfile._get_compressor
+
+    def counting(compress_type, compresslevel=None):
+        compressor = get_compressor(compress_type, compresslevel)
+        if compressor is not None:
+            compressed.append(compress_type)
+        return compressor
+
+    monkeypatch.setattr(zipfile, "_get_compressor", counting)
+    buf = io.BytesIO()
+    write_report_package(inputs, buf)
+    # Front Page, Catalog, Back Page and core.xml
+    assert len(compressed) == 4
+
+    z = zipfile.ZipFile(buf)
+    assert z.testzip() is None
+    assert load_workbook(buf).sheetnames == ["Front Page", "Catalog", "Back Page"]
+
+
+def test_copied_parts_keep_the_package_date(db):
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    inputs = load_report_inputs_fn(db, 5, "A")
+    first, second = io.BytesIO(), io.BytesIO()
+    when = datetime.datetime(2025, 11, 1)
+    write_report_package(inputs, first, when=when)
+    write_report_package(inputs, second, when=when)
+    assert first.getvalue() == second.getvalue()
+    assert {i.date_time for i in zipfile.ZipFile(first).infolist()} == {(2025, 11, 1, 0, 0, 0)}
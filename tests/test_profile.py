@@ -0,0 +1,49 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog import report_profile_fn
+from reports.catalog.report_cache_fn import get_report_cache
+from reports.catalog.result_store_fn import LocalResultStore
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    report_profile_fn.set_profile_store(LocalResultStore(tmp_path / "profiles", 3600))
+    yield
+    report_profile_fn.set_profile_store(None)
+
+
+def _profile(**kwargs):
+    return asyncio.run(report_profile_fn.profile_report_async("5-A", class_no=5, division="A", **kwargs))
+
+
+def test_profiled_request_renders_in_full(db, profiles, monkeypatch):
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    seen = []
+    generate = report_profile_fn.generate_catalog_report
+    monkeypatch.setattr(report_profile_fn, "generate_catalog_report", lambda **kw: seen.append(kw) or generate(**kw))
+
+    out, profile_id = _profile()
+    assert out["ok"] and profile_id
+    assert seen[0]["use_cache"] is False and seen[0]["incremental"] is False
+    assert report_profile_fn.get_profile(profile_id)["label"] == "5-A"
+
+
+def test_request_behind_another_profile_takes_the_normal_path(db, profiles):
+    seed_firestore(db, "5-A", 10, 2025, 11)
+    body = dict(selected_month=11, selected_year=2025)
+    _profile(**body)  # profiled: not cached
+    first = asyncio.run(report_profile_fn.generate_catalog_report_async(class_no=5, division="A", **body))
+    hits = get_report_cache().stats()["memory_hits"]
+
+    assert report_profile_fn._profile_lock.acquire(blocking=False)
+    try:
+        out, profile_id = _profile(**body)
+    finally:
+        report_profile_fn._profile_lock.release()
+    assert profile_id is None
+    assert out["bytes"] == first["bytes"]
+    assert get_report_cache().stats()["memory_hits"] == hits + 1  # served from the report cache
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import time
+
+import pytest
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog import roster_replica_fn
+from reports.catalog.report_data_fn import load_report_inputs_fn
+from reports.catalog.roster_replica_fn import ReplicaClient, get_replica, replica_db
+
+REPLICATED = set(roster_replica_fn.REPLICATED)
+STALENESS = 0.5
+
+
+@pytest.fixture
+def sync(db, tmp_path, monkeypatch):
+    monkeypatch.setenv("CATALOG_REPLICA_PATH", str(tmp_path / "replica.sqlite"))
+    monkeypatch.setattr(roster_replica_fn, "HEARTBEAT_SECONDS", 0.05)
+    seed_firestore(db, "5-A", 20, 2025, 11)
+    syncer = roster_replica_fn.start_replica_sync(db)
+    _wait_for(lambda: get_replica().fresh_collections(STALENESS) == REPLICATED)
+    yield syncer
+    roster_replica_fn.stop_replica_sync()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_idle_collections_stay_served_from_the_replica(db, sync):
+    time.sleep(STALENESS * 3)  # no writes for longer than the freshness bound
+    assert get_replica().fresh_collections(STALENESS) == REPLICATED
+
+    local = replica_db(db, STALENESS)
+    assert isinstance(local, ReplicaClient)
+    reads = db.reads
+    assert load_report_inputs_fn(local, 5, "A", 11, 2025)["ok"]
+    assert load_report_inputs_fn(local, 5, "A")["ok"]
+    assert db.reads - reads <= 1  # attendance is not replicated
+
+
+def test_stopped_syncer_ages_out(db, sync):
+    roster_replica_fn.stop_replica_sync()
+    time.sleep(STALENESS * 2)
+    assert get_replica().fresh_collections(STALENESS) == set()
+    assert replica_db(db, STALENESS) is db
+
+
+def test_failed_snapshot_expires_until_reloaded(db, sync, monkeypatch):
+    replica = get_replica()
+    apply = replica.apply
+
+    def failing(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(replica, "apply", failing)
+    db.collection("catalog").document("5-A").update({"classTeacher": "नवीन"})
+    assert "catalog" not in replica.fresh_collections(STALENESS)
+    time.sleep(0.2)  # heartbeats do not vouch for a collection that missed a change
+    assert "catalog" not in replica.fresh_collections(STALENESS)
+
+    monkeypatch.setattr(replica, "apply", apply)
+    db.collection("catalog").document("5-A").update({"division": "A"})
+    assert "catalog" in replica.fresh_collections(STALENESS)
+    assert replica.get("catalog/5-A").get("classTeacher") == "नवीन"
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from reports.catalog.result_store_fn import LocalResultStore, ResultStore
+
+
+def test_incomplete_store_fails_when_created():
+    class StatusOnly(ResultStore):
+        def put_status(self, job_id, status):
+            pass
+
+        def get_status(self, job_id):
+            return None
+
+    with pytest.raises(TypeError, match="open_result"):
+        StatusOnly()
+
+
+def test_local_store_round_trip(tmp_path):
+    store = LocalResultStore(tmp_path / "jobs", ttl_seconds=3600)
+    store.put_status("job1", {"status": "running"})
+    assert store.get_status("job1") == {"status": "running"}
+    assert store.get_status("missing") is None
+
+    src = tmp_path / "report.xlsx"
+    src.write_bytes(b"PK" + b"x" * 100)
+    assert store.put_result("job1", str(src), "application/octet-stream") == 102
+    f, size = store.open_result("job1")
+    with f:
+        assert size == 102 and f.read() == src.read_bytes()
+    assert store.open_result("missing") is None
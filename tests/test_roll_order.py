@@ -0,0 +1,44 @@
+from __future__ import annotations
+import asyncio
+
+from bench.synthetic_roster import seed_firestore
+from reports.catalog.report_data_fn import (
+    load_bulk_report_inputs_fn, load_report_inputs_async_fn, load_report_inputs_fn,
+)
+
+STUDENTS = "catalog/global/students"
+
+
+def _seed(db):
+    seed_firestore(db, "5-A", 6, 2025, 11)
+    seed_firestore(db, "6-A", 3, 2025, 11)
+    students = db.collection(STUDENTS)
+    # Sorts before every seeded id, and has no rollNo
+    students.document("0-no-roll").set({
+        "status": "active", "classDivision": "5-A", "regNo": 1, "fullNameMr": "नवीन", "gender": "मुलगा",
+    })
+    students.document("5-A-10002").update({"rollNo": 9})
+
+
+def _roll_numbers(rows):
+    return [s.get("rollNo") for s in rows]
+
+
+def test_live_report_orders_missing_roll_no_last(db):
+    _seed(db)
+    inputs = load_report_inputs_fn(db, 5, "A")
+    assert _roll_numbers(inputs["students"]) == [1, 2, 4, 5, 6, 9, None]
+
+
+def test_async_live_report_orders_missing_roll_no_last(db):
+    _seed(db)
+    inputs = asyncio.run(load_report_inputs_async_fn(db.async_client(0.0), 5, "A"))
+    assert _roll_numbers(inputs["students"]) == [1, 2, 4, 5, 6, 9, None]
+
+
+def test_bulk_inputs_order_missing_roll_no_last(db):
+    _seed(db)
+    for named in (None, ["5-a"]):
+        by_class = {i["class_division"]: i for i in load_bulk_report_inputs_fn(db, named)}
+        assert _roll_numbers(by_class["5-A"]["students"]) == [1, 2, 4, 5, 6, 9, None]
+